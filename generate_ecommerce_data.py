@@ -1,15 +1,23 @@
 import json
 import random
+import textwrap
 from faker import Faker
 
 fake = Faker()
 
+LEAF_CATEGORY_IDS = [
+    category_id * 10 + child_id
+    for category_id in range(1, 11)
+    for child_id in range(1, 4)
+]
+
 # Function to generate a random product
 def generate_product(product_id):
     product_name = fake.sentence(nb_words=3).strip(".")
     product_sku = product_name.replace(" ", "_").lower()
     description = fake.paragraph(nb_sentences=5)
-    category_ids = random.sample(range(1, 30), random.randint(1, 3))
+    # Only the subcategories generated below exist (ids 11-13 ... 101-103)
+    category_ids = random.sample(LEAF_CATEGORY_IDS, random.randint(1, 3))
     price = random.randint(10, 1000) * 1000
     special_price = random.choice([0, price - random.randint(1000, 5000)])
     image_url = f"https://via.placeholder.com/300?text={product_name.replace(' ', '+')}"
@@ -67,19 +75,21 @@ def generate_categories():
         )
     return categories
 
-# Generate the products and categories
-def generate_data():
-    products = [generate_product(product_id) for product_id in range(1, 101)]
+# Generate the products and categories, streaming products to disk
+def generate_data(num_products=100, path="ecommerce_data.json"):
     categories = generate_categories()
 
-    data = {
-        "products": products,
-        "categories": categories,
-    }
-
-    with open("ecommerce_data.json", "w") as f:
-        json.dump(data, f, indent=4)
-    print("Data saved to ecommerce_data.json")
+    with open(path, "w") as f:
+        f.write('{\n    "categories": ')
+        f.write(textwrap.indent(json.dumps(categories, indent=4), "    ").lstrip())
+        f.write(',\n    "products": [')
+        for product_id in range(1, num_products + 1):
+            if product_id > 1:
+                f.write(",")
+            product = generate_product(product_id)
+            f.write("\n" + textwrap.indent(json.dumps(product, indent=4), " " * 8))
+        f.write("\n    ]\n}\n" if num_products else "]\n}\n")
+    print(f"Data saved to {path}")
 
 if __name__ == "__main__":
     generate_data()
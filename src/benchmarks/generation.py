@@ -0,0 +1,440 @@
+"""Throughput benchmark suite for the generation pipeline.
+
+Measures product and category generation, JSON/NDJSON serialization,
+image encode and write cost, and ``main.generate_data`` end to end. Images
+come from the deterministic ``stub`` backend, so no model or network is
+involved and results are comparable across machines and commits.
+
+Every (benchmark, catalog size) pair runs in a fresh interpreter and
+reports throughput, p50/p99 per-record latency and peak RSS. Results go to
+a JSON file; pass an earlier results file to ``--compare`` to fail on
+throughput regressions.
+
+The ``serialize_*`` benchmarks cover pretty-printed and compact output and
+gzip/zstd compression with one and with several threads. Their MB/s is
+measured on the uncompressed JSON text and they report the compression
+ratio, so settings can be compared directly:
+
+    python -m benchmarks.generation --sizes 100000 \\
+        --benchmarks $(python -m benchmarks.generation --list serialize)
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.generation --sizes 1000 10000 \\
+        --output bench.json --compare baseline.json
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Benchmarks that write one image per record are capped at this many
+DEFAULT_MAX_IMAGE_RECORDS = 10_000
+
+# Distinct records cycled through by the serialization benchmarks
+_SERIALIZATION_POOL = 10_000
+
+# Threads of the multi-threaded compression benchmarks
+_COMPRESSION_THREADS = 4
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak /= 1024
+    return peak / 1024
+
+
+def _timed(items) -> tuple:
+    """Exhaust ``items`` and return ``(count, seconds, latencies)``."""
+    latencies = []
+    start = last = time.perf_counter()
+    for _ in items:
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+    return len(latencies), last - start, latencies
+
+
+def bench_products(size: int, workdir: str, vectorized: bool = False):
+    from generators.product_generator import ProductGenerator
+
+    generator = ProductGenerator(
+        seed=0,
+        vectorized=vectorized,
+        text_pool_size=10_000 if vectorized else 0,
+        image_backend="none",
+    )
+    return _timed(generator.iter_records(range(1, size + 1)))
+
+
+def bench_products_vectorized(size: int, workdir: str):
+    return bench_products(size, workdir, vectorized=True)
+
+
+def bench_categories(size: int, workdir: str):
+    from generators.category_generator import CategoryGenerator
+
+    latencies = []
+    count = 0
+    start = time.perf_counter()
+    for seed in itertools.count():
+        if count >= size:
+            break
+        call_start = time.perf_counter()
+        categories = CategoryGenerator.generate_categories(seed)
+        elapsed = time.perf_counter() - call_start
+        latencies.extend([elapsed / len(categories)] * len(categories))
+        count += len(categories)
+    return count, time.perf_counter() - start, latencies
+
+
+def _bench_serialization(
+    size: int,
+    workdir: str,
+    output_format: str,
+    compact: bool = False,
+    compression: str = "none",
+    compression_threads: int = 1,
+):
+    from generators.product_generator import ProductGenerator
+    from writers.compression import open_input
+    from writers.json_writer import create_writer
+
+    generator = ProductGenerator(seed=0, image_backend="none")
+    pool = generator.generate_records(
+        range(1, min(size, _SERIALIZATION_POOL) + 1)
+    )
+    path = os.path.join(workdir, f"products.{output_format}")
+
+    def write_all(writer):
+        for index in range(size):
+            writer.write_product(pool[index % len(pool)])
+            yield
+
+    start = time.perf_counter()
+    with create_writer(
+        path,
+        output_format,
+        compact=compact,
+        compression=compression,
+        compression_threads=compression_threads,
+    ) as writer:
+        writer.write_categories([])
+        count, _, latencies = _timed(write_all(writer))
+    # Compressed output is only complete once the writer is closed
+    seconds = time.perf_counter() - start
+
+    bytes_written = os.path.getsize(path)
+    raw_bytes = bytes_written
+    if compression != "none":
+        raw_bytes = 0
+        with open_input(path, compression) as f:
+            for chunk in iter(functools.partial(f.read, 1 << 20), b""):
+                raw_bytes += len(chunk)
+    return (
+        count,
+        seconds,
+        latencies,
+        {
+            "bytes_written": bytes_written,
+            "raw_bytes": raw_bytes,
+            "compression_ratio": raw_bytes / bytes_written,
+        },
+    )
+
+
+# Benchmark name -> (output format, writer options)
+SERIALIZATION_SETTINGS = {
+    "serialize_json": ("json", {}),
+    "serialize_ndjson": ("ndjson", {}),
+    "serialize_json_compact": ("json", {"compact": True}),
+    "serialize_ndjson_compact": ("ndjson", {"compact": True}),
+    "serialize_json_gzip": ("json", {"compression": "gzip"}),
+    "serialize_ndjson_compact_gzip": (
+        "ndjson",
+        {"compact": True, "compression": "gzip"},
+    ),
+    "serialize_ndjson_compact_gzip_threads": (
+        "ndjson",
+        {
+            "compact": True,
+            "compression": "gzip",
+            "compression_threads": _COMPRESSION_THREADS,
+        },
+    ),
+    "serialize_json_zstd": ("json", {"compression": "zstd"}),
+    "serialize_ndjson_compact_zstd": (
+        "ndjson",
+        {"compact": True, "compression": "zstd"},
+    ),
+    "serialize_ndjson_compact_zstd_threads": (
+        "ndjson",
+        {
+            "compact": True,
+            "compression": "zstd",
+            "compression_threads": _COMPRESSION_THREADS,
+        },
+    ),
+}
+
+
+def bench_images(size: int, workdir: str):
+    from generators.image.placeholder_image_generator import (
+        StubImageGenerator,
+    )
+    from generators.image.sinks import ImageSink
+
+    generator = StubImageGenerator(
+        sink=ImageSink("both", output_dir=os.path.join(workdir, "products"))
+    )
+    return _timed(
+        generator.generate_product_image(f"Product {index}", "Benchmark")
+        for index in range(size)
+    )
+
+
+def bench_generate_data(size: int, workdir: str):
+    import main
+
+    # The sink writes image files relative to the working directory
+    os.chdir(workdir)
+    start = time.perf_counter()
+    main.generate_data(
+        size,
+        os.path.join(workdir, "catalog.json"),
+        seed=0,
+        image_backend="stub",
+    )
+    # Per-record latency is not observable from outside generate_data
+    return size, time.perf_counter() - start, []
+
+
+BENCHMARKS = {
+    "products": (bench_products, False),
+    "products_vectorized": (bench_products_vectorized, False),
+    "categories": (bench_categories, False),
+    **{
+        name: (
+            functools.partial(
+                _bench_serialization, output_format=output_format, **options
+            ),
+            False,
+        )
+        for name, (output_format, options) in SERIALIZATION_SETTINGS.items()
+    },
+    "images": (bench_images, True),
+    "generate_data": (bench_generate_data, True),
+}
+
+
+def run_benchmark(name: str, size: int, workdir: str) -> dict:
+    """Run one benchmark in the current process and summarize it."""
+    import numpy as np
+
+    logging.disable(logging.INFO)
+    result = BENCHMARKS[name][0](size, workdir)
+    count, seconds, latencies = result[:3]
+    summary = {
+        "benchmark": name,
+        "size": size,
+        "records": count,
+        "seconds": seconds,
+        "records_per_second": count / seconds if seconds else None,
+        "p50_latency_us": None,
+        "p99_latency_us": None,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if latencies:
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+        summary.update(p50_latency_us=p50, p99_latency_us=p99)
+    if len(result) > 3:
+        summary.update(result[3])
+    if "bytes_written" in summary and seconds:
+        # Throughput of the uncompressed text, comparable across settings
+        nbytes = summary.get("raw_bytes", summary["bytes_written"])
+        summary["mb_per_second"] = nbytes / seconds / 2**20
+    return summary
+
+
+def _child_env() -> dict:
+    pythonpath = [SRC_DIR] + [p for p in [os.getenv("PYTHONPATH")] if p]
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(pythonpath))
+
+
+def measure(names, sizes, max_image_records: int) -> list:
+    """Run each benchmark at each size in a fresh interpreter."""
+    results = []
+    for name in names:
+        for size in sizes:
+            if BENCHMARKS[name][1]:
+                size = min(size, max_image_records)
+            if any(
+                r["benchmark"] == name and r["size"] == size for r in results
+            ):
+                continue  # Capped to a size that already ran
+            with tempfile.TemporaryDirectory() as workdir:
+                completed = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.generation",
+                        "--child",
+                        name,
+                        str(size),
+                        workdir,
+                    ],
+                    cwd=SRC_DIR,
+                    env=_child_env(),
+                    capture_output=True,
+                    text=True,
+                )
+            if completed.returncode:
+                result = {
+                    "benchmark": name,
+                    "size": size,
+                    "error": completed.stderr.strip(),
+                }
+            else:
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """Return throughput regressions against a baseline results file.
+
+    Returns:
+        list: ``(benchmark, size, baseline, current)`` tuples whose
+            throughput dropped by more than ``tolerance``.
+    """
+    with open(baseline_path) as f:
+        baseline = {
+            (r["benchmark"], r["size"]): r.get("records_per_second")
+            for r in json.load(f)["results"]
+        }
+
+    regressions = []
+    for result in results:
+        before = baseline.get((result["benchmark"], result["size"]))
+        after = result.get("records_per_second")
+        if not before or not after:
+            continue
+        print(
+            f"{result['benchmark']:>20} {result['size']:>9}: "
+            f"{after / before:6.2f}x ({before:,.0f} -> {after:,.0f}/s)",
+            file=sys.stderr,
+        )
+        if after < before * (1 - tolerance):
+            regressions.append(
+                (result["benchmark"], result["size"], before, after)
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--benchmarks",
+        nargs="+",
+        default=list(BENCHMARKS),
+        choices=list(BENCHMARKS),
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES)
+    )
+    parser.add_argument(
+        "--max-image-records",
+        type=int,
+        default=DEFAULT_MAX_IMAGE_RECORDS,
+        help="Cap for benchmarks that write one image per record",
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmark_results.json",
+        help="JSON results file",
+    )
+    parser.add_argument(
+        "--compare", help="Earlier results file to check for regressions"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed relative throughput drop when comparing",
+    )
+    parser.add_argument(
+        "--list",
+        nargs="?",
+        const="",
+        metavar="PREFIX",
+        help="Print the benchmark names starting with PREFIX and exit",
+    )
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.list is not None:
+        names = [name for name in BENCHMARKS if name.startswith(args.list)]
+        print(" ".join(names))
+        return 0
+    if args.child:
+        name, size, workdir = args.child
+        print(json.dumps(run_benchmark(name, int(size), workdir)))
+        return 0
+
+    results = measure(args.benchmarks, args.sizes, args.max_image_records)
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    failed = any("error" in result for result in results)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for name, size, before, after in regressions:
+            print(
+                f"REGRESSION: {name} at {size}: "
+                f"{before:,.0f} -> {after:,.0f} records/s",
+                file=sys.stderr,
+            )
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Per-profile benchmark for the diffusion image backends.
+
+Renders a few product prompts with each performance profile (see
+``generators.image.profiles``) and reports pipeline load time, seconds per
+image and peak resident memory. Every profile runs in a fresh interpreter
+so peak memory is not inherited from the previous profile. A warm-up
+batch is rendered first and excluded from the timings, which matters for
+profiles that use ``torch.compile``. The images are rendered once with the
+prompt embedding cache and once without it, and the per-image saving is
+reported.
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.image_profiles --backend local --images 4 \\
+        --profiles draft standard hero --output profiles.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROMPTS = (
+    ("Ceramic Coffee Mug", "Glazed stoneware mug with a wide handle."),
+    ("Leather Wallet", "Slim bifold wallet in full-grain leather."),
+    ("Running Shoes", "Lightweight trainers with a breathable mesh upper."),
+    ("Desk Lamp", "Adjustable aluminium lamp with a warm LED."),
+)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak /= 1024
+    return peak / 1024
+
+
+def run_profile(backend: str, profile: str, images: int) -> dict:
+    """Benchmark one profile in the current process.
+
+    Returns:
+        dict: Profile settings and measurements.
+    """
+    from generators.image.base_image_generator import BaseImageGenerator
+    from generators.image.image_generator_factory import (
+        create_image_generator,
+    )
+
+    generator = create_image_generator(
+        backend, profile=profile, use_cache=False
+    )
+    products = [PROMPTS[i % len(PROMPTS)] for i in range(images)]
+    prompts = [
+        BaseImageGenerator._build_prompts(name, description)
+        for name, description in products
+    ]
+    positives = [prompt for prompt, _ in prompts]
+    negatives = [negative for _, negative in prompts]
+
+    start = time.perf_counter()
+    if hasattr(generator, "_get_pipeline"):
+        generator._get_pipeline()
+    load_seconds = time.perf_counter() - start
+
+    batch = generator.batch_size
+    start = time.perf_counter()
+    generator.generate_images(positives[:batch], negatives[:batch])
+    warmup_seconds = time.perf_counter() - start
+
+    embedding_cache = getattr(generator, "embedding_cache", None)
+    uncached_seconds = None
+    if embedding_cache is not None:
+        generator.embedding_cache = None
+        start = time.perf_counter()
+        generator.generate_images(positives, negatives)
+        uncached_seconds = (time.perf_counter() - start) / images
+        # Start cold so only repeats within the timed run are hits
+        embedding_cache.clear()
+        generator.embedding_cache = embedding_cache
+
+    start = time.perf_counter()
+    generator.generate_images(positives, negatives)
+    elapsed = time.perf_counter() - start
+
+    threads = None
+    if "torch" in sys.modules:
+        threads = sys.modules["torch"].get_num_threads()
+
+    return {
+        "profile": profile,
+        "backend": backend,
+        "settings": generator.profile,
+        "generation_params": generator.generation_params(),
+        "images": images,
+        "batch_size": batch,
+        "torch_threads": threads,
+        "load_seconds": load_seconds,
+        "warmup_seconds": warmup_seconds,
+        "seconds_per_image": elapsed / images,
+        "images_per_minute": 60 * images / elapsed if elapsed else None,
+        "seconds_per_image_without_embedding_cache": uncached_seconds,
+        "embedding_cache_savings_per_image": (
+            uncached_seconds - elapsed / images
+            if uncached_seconds is not None
+            else None
+        ),
+        "embedding_cache": (
+            embedding_cache.stats() if embedding_cache is not None else None
+        ),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def measure(backend: str, profiles, images: int) -> list:
+    """Benchmark each profile in a fresh interpreter."""
+    results = []
+    pythonpath = [SRC_DIR] + [p for p in [os.getenv("PYTHONPATH")] if p]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(pythonpath))
+    for profile in profiles:
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.image_profiles",
+                "--backend",
+                backend,
+                "--images",
+                str(images),
+                "--child",
+                profile,
+            ],
+            cwd=SRC_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode:
+            results.append(
+                {"profile": profile, "error": completed.stderr.strip()}
+            )
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main(argv=None) -> int:
+    from generators.image.profiles import PERFORMANCE_PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backend",
+        default="local",
+        help="Image backend that accepts a profile (local or huggingface)",
+    )
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=list(PERFORMANCE_PROFILES),
+        choices=list(PERFORMANCE_PROFILES),
+    )
+    parser.add_argument(
+        "--images", type=int, default=4, help="Images timed per profile"
+    )
+    parser.add_argument("--output", help="Write results to a JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        result = run_profile(args.backend, args.child, max(1, args.images))
+        print(json.dumps(result))
+        return 0
+
+    results = measure(args.backend, args.profiles, max(1, args.images))
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
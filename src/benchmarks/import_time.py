@@ -0,0 +1,146 @@
+"""Import-time benchmark for the generator modules.
+
+Text-only jobs must not pay for ``torch``/``diffusers`` at import time.
+This benchmark imports the given modules in a fresh interpreter, reports
+the wall time of the import and the heaviest modules from
+``python -X importtime``, and fails if a heavy backend dependency was
+loaded or the import exceeds a time budget.
+
+Run from the ``src`` directory:
+
+    python -m benchmarks.import_time --max-seconds 1.5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = (
+    "generators.product_generator",
+    "generators.category_generator",
+    "generators.image.image_generator_factory",
+)
+
+# Modules that must only be imported when a backend is instantiated
+HEAVY_MODULES = ("torch", "diffusers", "transformers", "replicate")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def _parse_importtime(stderr: str, top: int) -> list:
+    """Return the ``top`` modules by cumulative import time."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:") :].split("|")
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue  # Header line
+        rows.append((cumulative, parts[2].strip()))
+    rows.sort(reverse=True)
+    return [
+        {"module": name, "cumulative_us": cumulative}
+        for cumulative, name in rows[:top]
+    ]
+
+
+def measure(modules=DEFAULT_MODULES, repeat: int = 3, top: int = 10) -> dict:
+    """Measure import time of ``modules`` in fresh interpreters.
+
+    Args:
+        modules: Module names to import.
+        repeat: Number of fresh interpreters; the best run is reported.
+        top: Number of heaviest modules to include.
+
+    Returns:
+        dict: Best and all wall times, heavy modules that were loaded and
+            the heaviest imports by cumulative time.
+    """
+    probe = _PROBE.format(modules=tuple(modules), heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    runs = []
+    heavy = set()
+    stderr = ""
+    for _ in range(max(1, repeat)):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe],
+            cwd=SRC_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        runs.append(result["seconds"])
+        heavy.update(result["heavy"])
+        stderr = completed.stderr
+
+    return {
+        "modules": list(modules),
+        "best_seconds": min(runs),
+        "runs_seconds": runs,
+        "heavy_modules_loaded": sorted(heavy),
+        "slowest_imports": _parse_importtime(stderr, top),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=list(DEFAULT_MODULES),
+        help="Modules to import",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Fail if the best import time exceeds this budget",
+    )
+    parser.add_argument("--output", help="Write results to a JSON file")
+    args = parser.parse_args(argv)
+
+    results = measure(args.modules, args.repeat)
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    failed = False
+    if results["heavy_modules_loaded"]:
+        print(
+            "FAIL: heavy modules imported eagerly: "
+            + ", ".join(results["heavy_modules_loaded"]),
+            file=sys.stderr,
+        )
+        failed = True
+    if args.max_seconds and results["best_seconds"] > args.max_seconds:
+        print(
+            f"FAIL: import took {results['best_seconds']:.3f}s, "
+            f"budget is {args.max_seconds:.3f}s",
+            file=sys.stderr,
+        )
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,14 @@
 
 This module provides functionality to generate fake category data
 for an e-commerce system, including parent categories and their children.
+The shape of the tree comes from a ``taxonomy.Taxonomy`` index.
 """
 
+import random
+from typing import Iterator, Optional
 from faker import Faker
+from .taxonomy import Taxonomy, get_taxonomy
+from .text_pool import TextPool
 
 fake = Faker()
 
@@ -17,34 +22,108 @@ class CategoryGenerator:
     """
 
     @staticmethod
-    def generate_categories() -> list:
+    def iter_categories(
+        seed: Optional[int] = None,
+        text_pool: Optional[TextPool] = None,
+        taxonomy: Optional[Taxonomy] = None,
+    ) -> Iterator[dict]:
+        """Yield every category of the taxonomy as a flat record.
+
+        Categories are produced in id order, one level after another, so
+        arbitrarily large trees can be streamed to a writer without
+        holding them in memory.
+
+        Args:
+            seed: Optional seed for reproducible names and URLs.
+            text_pool: Optional text pool to draw names and URLs from
+                instead of calling Faker.
+            taxonomy: Tree shape. Defaults to ``taxonomy.DEFAULT_FANOUT``.
+
+        Yields:
+            dict: Category with keys:
+                - id: Unique identifier
+                - parent_id: Id of the parent category, None for roots
+                - depth: Level in the tree, roots are 0
+                - name: Category name
+                - url: Category URL
+        """
+        faker = fake
+        if text_pool is not None:
+            faker = _PooledText(text_pool, random.Random(seed))
+        elif seed is not None:
+            faker = Faker()
+            faker.seed_instance(seed)
+
+        taxonomy = taxonomy or get_taxonomy()
+        category_id = 1
+        for depth, level_size in enumerate(taxonomy.level_sizes):
+            parents = taxonomy.parent[
+                category_id - 1 : category_id - 1 + level_size
+            ].tolist()
+            for parent_id in parents:
+                yield {
+                    "id": category_id,
+                    "parent_id": parent_id or None,
+                    "depth": depth,
+                    "name": faker.word().capitalize(),
+                    "url": faker.url(),
+                }
+                category_id += 1
+
+    @staticmethod
+    def generate_categories(
+        seed: Optional[int] = None,
+        text_pool: Optional[TextPool] = None,
+        taxonomy: Optional[Taxonomy] = None,
+    ) -> list:
         """Generate a list of categories with child subcategories.
 
+        This builds the whole tree in memory; use ``iter_categories`` for
+        large taxonomies.
+
+        Args:
+            seed: Optional seed for a reproducible category tree.
+            text_pool: Optional text pool to draw names and URLs from
+                instead of calling Faker.
+            taxonomy: Tree shape. Defaults to ``taxonomy.DEFAULT_FANOUT``.
+
         Returns:
-            list: A list of dictionaries containing category data.
+            list: A list of dictionaries containing the root categories.
                 Each category has:
                 - id: Unique identifier
                 - name: Category name
                 - url: Category URL
-                - children: List of child subcategories
+                - children: List of child subcategories, omitted on leaves
         """
-        categories = []
-        for category_id in range(1, 11):
-            children = [
-                {
-                    "id": category_id * 10 + child_id,
-                    "name": fake.word().capitalize(),
-                    "url": fake.url(),
-                }
-                for child_id in range(1, 4)
-            ]
+        nodes = {}
+        roots = []
+        for record in CategoryGenerator.iter_categories(
+            seed, text_pool, taxonomy
+        ):
+            node = {
+                "id": record["id"],
+                "name": record["name"],
+                "url": record["url"],
+            }
+            nodes[record["id"]] = node
+            if record["parent_id"] is None:
+                roots.append(node)
+            else:
+                nodes[record["parent_id"]].setdefault("children", []).append(
+                    node
+                )
+        return roots
 
-            categories.append(
-                {
-                    "id": category_id,
-                    "name": fake.word().capitalize(),
-                    "url": fake.url(),
-                    "children": children,
-                }
-            )
-        return categories
+
+class _PooledText:
+    """Adapter exposing the Faker methods used here on top of a TextPool."""
+
+    def __init__(self, text_pool: TextPool, rng: random.Random):
+        self._pool = text_pool
+        self._rng = rng
+
+    def word(self) -> str:
+        return self._pool.word(self._rng)
+
+    def url(self) -> str:
+        return self._pool.url(self._rng)
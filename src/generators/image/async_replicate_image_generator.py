@@ -0,0 +1,327 @@
+"""Module for generating images concurrently through the Replicate HTTP API.
+
+Remote generation is latency-bound, so instead of waiting out one
+prediction at a time this backend keeps up to ``max_in_flight``
+predictions running, polls them with asyncio and downloads the outputs
+over a pooled keep-alive ``requests`` session. The API base URL is
+configurable, which also allows running against a local stand-in server.
+
+Predictions run on one event loop that lives on a background thread for
+the lifetime of the generator. ``submit_product_images`` returns as soon
+as a batch's predictions are queued on it, so the next batch tops up the
+in-flight window instead of waiting for the slowest prediction of the
+previous one.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import List, Optional, Union
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from utils import metrics
+from .base_image_generator import BaseImageGenerator
+from .config import IMAGE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+
+class AsyncReplicateImageGenerator(BaseImageGenerator):
+    """Image generator that runs many Replicate predictions concurrently.
+
+    Predictions are created with ``POST /v1/predictions`` and polled via
+    their ``urls.get`` endpoint until they reach a terminal status. Results
+    are returned in prompt order regardless of completion order.
+    """
+
+    NUM_INFERENCE_STEPS = 25
+    GUIDANCE_SCALE = 7.0
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        api_base: Optional[str] = None,
+        api_token: Optional[str] = None,
+        poll_interval: Optional[float] = None,
+        timeout: float = 600.0,
+        **kwargs,
+    ):
+        """Initialize the generator.
+
+        Args:
+            max_in_flight: Maximum number of concurrent predictions.
+                Defaults to ``IMAGE_CONFIG["replicate_max_in_flight"]``.
+            api_base: Base URL of the prediction API.
+            api_token: Replicate API token.
+            poll_interval: Seconds between status polls.
+            timeout: Seconds after which a prediction is abandoned.
+            **kwargs: Passed to ``BaseImageGenerator``. ``batch_size``
+                defaults to ``max_in_flight`` so that every batch keeps
+                all prediction slots busy.
+        """
+        self.max_in_flight = max(
+            1, max_in_flight or IMAGE_CONFIG["replicate_max_in_flight"]
+        )
+        kwargs.setdefault("batch_size", self.max_in_flight)
+        super().__init__(**kwargs)
+
+        api_base = api_base or IMAGE_CONFIG["replicate_api_base"]
+        self.api_base = api_base.rstrip("/")
+        self.api_token = api_token or IMAGE_CONFIG["replicate_api_token"]
+        self.poll_interval = (
+            IMAGE_CONFIG["replicate_poll_interval"]
+            if poll_interval is None
+            else poll_interval
+        )
+        self.timeout = timeout
+        self._session = None
+        self._executor = None
+        self._loop = None
+        self._loop_thread = None
+        self._semaphore = None
+        self._loop_lock = threading.Lock()
+
+    def generation_params(self) -> dict:
+        """Return the settings that determine the rendered image."""
+        return {
+            "model_id": IMAGE_CONFIG["replicate_model"],
+            "num_inference_steps": self.NUM_INFERENCE_STEPS,
+            "guidance_scale": self.GUIDANCE_SCALE,
+            "height": None,  # Model default resolution
+            "width": None,
+            "seed": self.seed,
+        }
+
+    def _get_session(self) -> requests.Session:
+        """Return the pooled HTTP session, creating it on first use."""
+        if self._session is None:
+            adapter = HTTPAdapter(
+                pool_connections=2, pool_maxsize=self.max_in_flight
+            )
+            self._session = requests.Session()
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+            self._session.headers["Authorization"] = f"Bearer {self.api_token}"
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_in_flight,
+                thread_name_prefix="replicate-http",
+            )
+        return self._session
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the background event loop, starting it on first use."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="replicate-loop",
+                    daemon=True,
+                )
+                thread.start()
+                self._loop, self._loop_thread = loop, thread
+            return self._loop
+
+    def _run(self, coroutine) -> Future:
+        """Schedule ``coroutine`` on the background loop."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+
+    def close(self) -> None:
+        """Stop the event loop and release connections and HTTP threads."""
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join()
+                self._loop.close()
+                self._loop = self._loop_thread = self._semaphore = None
+        if self._session is not None:
+            self._session.close()
+            self._executor.shutdown(wait=False)
+            self._session = None
+            self._executor = None
+
+    async def _request(self, method: str, url: str, **kwargs):
+        """Run a blocking session request on the HTTP thread pool."""
+        session = self._get_session()
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self._executor,
+            lambda: session.request(method, url, timeout=60, **kwargs),
+        )
+        response.raise_for_status()
+        return response
+
+    async def _predict(
+        self, prompt: str, negative_prompt: str, seed: Optional[int]
+    ) -> Image.Image:
+        """Create a prediction, wait for it and download its output."""
+        model_input = {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "num_inference_steps": self.NUM_INFERENCE_STEPS,
+            "guidance_scale": self.GUIDANCE_SCALE,
+        }
+        if seed is not None:
+            model_input["seed"] = seed
+
+        version = IMAGE_CONFIG["replicate_model"].split(":")[-1]
+        with metrics.timer("image.remote_predict"):
+            response = await self._request(
+                "POST",
+                f"{self.api_base}/v1/predictions",
+                json={"version": version, "input": model_input},
+            )
+            prediction = response.json()
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.timeout
+            while prediction["status"] not in _TERMINAL_STATUSES:
+                if loop.time() > deadline:
+                    raise TimeoutError(
+                        f"Prediction {prediction.get('id')} timed out"
+                    )
+                await asyncio.sleep(self.poll_interval)
+                poll_url = prediction.get("urls", {}).get("get") or (
+                    f"{self.api_base}/v1/predictions/{prediction['id']}"
+                )
+                prediction = (await self._request("GET", poll_url)).json()
+
+        if prediction["status"] != "succeeded":
+            raise RuntimeError(
+                f"Prediction {prediction.get('id')} {prediction['status']}: "
+                f"{prediction.get('error')}"
+            )
+
+        output = prediction["output"]
+        image_url = output[0] if isinstance(output, list) else output
+        with metrics.timer("image.download"):
+            response = await self._request("GET", image_url)
+        return Image.open(BytesIO(response.content))
+
+    async def _render(
+        self, prompt: str, negative_prompt: str, seed: Optional[int]
+    ) -> Union[Image.Image, Exception]:
+        """Run one prediction in a slot; return its error on failure."""
+        if self._semaphore is None:
+            # Created here so it belongs to the background loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            try:
+                return await self._predict(prompt, negative_prompt, seed)
+            except Exception as e:
+                logger.error(f"Replicate generation error: {e}")
+                return e
+
+    def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
+        """Generate image using the Replicate API.
+
+        Args:
+            prompt: The text prompt describing the desired image.
+            negative_prompt: Text describing what to avoid in the image.
+
+        Returns:
+            PIL.Image: The generated image.
+
+        Raises:
+            Exception: If image generation fails.
+        """
+        result = self.generate_images([prompt], [negative_prompt])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompts: List[str],
+        seeds: Optional[List[Optional[int]]] = None,
+    ) -> List[Union[Image.Image, Exception]]:
+        """Generate images with up to ``max_in_flight`` concurrent requests.
+
+        A failed prediction does not fail the whole batch: its slot holds
+        the exception instead, and only that product falls back to a
+        placeholder.
+
+        Args:
+            prompts: Text prompts describing the desired images.
+            negative_prompts: Negative prompts, one per prompt.
+            seeds: Latent seed per prompt. Defaults to ``prompt_seed``.
+
+        Returns:
+            list: Images (or exceptions) in prompt order.
+        """
+        seeds = self._latent_seeds(prompts, negative_prompts, seeds)
+        futures = [
+            self._run(self._render(prompt, negative_prompt, seed))
+            for prompt, negative_prompt, seed in zip(
+                prompts, negative_prompts, seeds
+            )
+        ]
+        return [future.result() for future in futures]
+
+    def submit_product_images(self, products: List[tuple]) -> List[Future]:
+        """Start predictions for several products without waiting for them.
+
+        Each product's image is encoded and stored by the sink as soon as
+        its prediction finishes. Predictions of earlier calls keep running
+        meanwhile, so ``max_in_flight`` slots stay busy across batches.
+
+        Args:
+            products: ``(product_name, description)`` tuples.
+
+        Returns:
+            list: One future per product, in input order, resolving to
+                the same result dict as ``generate_product_image``.
+        """
+        if not self.sink.enabled:
+            return super().submit_product_images(products)
+
+        futures, pending = self._submit_cached(products)
+        for index, key, prompt, negative_prompt in pending:
+            futures[index] = self._submit_prediction(
+                key, prompt, negative_prompt, products[index][0]
+            )
+        return futures
+
+    def _submit_prediction(
+        self, key, prompt: str, negative_prompt: str, product_name: str
+    ) -> Future:
+        result = Future()
+
+        def stored(future: Future) -> None:
+            try:
+                result.set_result(future.result())
+            except BaseException as e:
+                result.set_exception(e)
+
+        def submitted(future: Future) -> None:
+            try:
+                future.result().add_done_callback(stored)
+            except BaseException as e:
+                result.set_exception(e)
+
+        self._run(
+            self._render_and_submit(key, prompt, negative_prompt, product_name)
+        ).add_done_callback(submitted)
+        return result
+
+    async def _render_and_submit(
+        self, key, prompt: str, negative_prompt: str, product_name: str
+    ) -> Future:
+        """Render one product and hand the result to the sink.
+
+        The sink may encode inline or wait for a free worker, so the hand
+        off runs on a worker thread and never stalls the loop's polls.
+        """
+        image = await self._render(
+            prompt, negative_prompt, self.prompt_seed(prompt, negative_prompt)
+        )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self._submit_rendered, key, image, product_name
+        )
@@ -6,12 +6,16 @@ generating product images.
 """
 
 import abc
-import os
-import base64
+import hashlib
 import logging
-import requests
+from concurrent.futures import Future
 from PIL import Image
-from io import BytesIO
+from typing import List, Optional
+from utils import metrics
+from .config import IMAGE_CONFIG, MODEL_CONFIG
+from .image_cache import ImageCache, create_image_cache
+from .placeholder import render_placeholder_jpeg
+from .sinks import ImageSink
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +28,109 @@ class BaseImageGenerator(abc.ABC):
     handling and file management.
     """
 
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        seed: Optional[int] = None,
+        cache: Optional[ImageCache] = None,
+        use_cache: bool = True,
+        sink: Optional[ImageSink] = None,
+    ):
+        """Initialize the generator.
+
+        Args:
+            batch_size: Maximum number of prompts per pipeline call.
+                Defaults to ``MODEL_CONFIG["batch_size"]``.
+            seed: Latent seed passed to the backend. Defaults to
+                ``IMAGE_CONFIG["seed"]``.
+            cache: Image cache to use. Defaults to the cache configured
+                in ``IMAGE_CONFIG``.
+            use_cache: Set to False to bypass the image cache entirely.
+            sink: Output sink for encoded images. Defaults to the sink
+                configured in ``IMAGE_CONFIG``.
+        """
+        self.batch_size = max(1, batch_size or MODEL_CONFIG["batch_size"])
+        self.seed = IMAGE_CONFIG["seed"] if seed is None else seed
+        self.cache = None
+        if use_cache:
+            self.cache = cache if cache is not None else create_image_cache()
+        self.sink = sink if sink is not None else ImageSink.from_config()
+
+    def generation_params(self) -> dict:
+        """Return the settings that determine the rendered image.
+
+        Together with the prompts these form the image cache key, so
+        backends must include everything that changes their output.
+
+        Returns:
+            dict: JSON-serializable generation settings.
+        """
+        return {"backend": type(self).__name__, "seed": self.seed}
+
+    def prompt_seed(self, prompt: str, negative_prompt: str) -> Optional[int]:
+        """Return the latent seed for one prompt.
+
+        The seed is derived from ``seed`` and the prompts, so an image
+        does not depend on the batch, worker or order it is rendered in.
+
+        Returns:
+            int: 63-bit seed, or None when no fixed seed is configured.
+        """
+        if self.seed is None:
+            return None
+        digest = hashlib.blake2b(
+            f"{self.seed}:{prompt}:{negative_prompt}".encode(),
+            digest_size=8,
+        ).digest()
+        return int.from_bytes(digest, "big") >> 1
+
+    def _latent_seeds(
+        self,
+        prompts: List[str],
+        negative_prompts: List[str],
+        seeds: Optional[List[Optional[int]]] = None,
+    ) -> List[Optional[int]]:
+        """Return ``seeds``, or the ``prompt_seed`` of every prompt."""
+        if seeds is not None:
+            return list(seeds)
+        return [
+            self.prompt_seed(prompt, negative_prompt)
+            for prompt, negative_prompt in zip(prompts, negative_prompts)
+        ]
+
+    def _cache_key(self, prompt: str, negative_prompt: str) -> str:
+        return ImageCache.make_key(
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            **self.generation_params(),
+        )
+
+    def _cache_lookup(self, prompt: str, negative_prompt: str) -> tuple:
+        """Look up a rendering in the cache.
+
+        Returns:
+            tuple: ``(key, data)``; both None when caching is disabled and
+                ``data`` None on a miss.
+        """
+        if self.cache is None:
+            return None, None
+        key = self._cache_key(prompt, negative_prompt)
+        with metrics.timer("image.cache_lookup"):
+            data = self.cache.get(key)
+        metrics.count(
+            "image.cache_hits" if data is not None else "image.cache_misses"
+        )
+        return key, data
+
+    def _cache_store(self, key: Optional[str], data: bytes) -> None:
+        """Add freshly encoded image bytes to the cache."""
+        if key is None:
+            return
+        try:
+            self.cache.put(key, data)
+        except OSError as e:
+            logger.warning(f"Could not cache image {key}: {e}")
+
     @abc.abstractmethod
     def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
         """Generate image using the specific implementation.
@@ -40,10 +147,70 @@ class BaseImageGenerator(abc.ABC):
         """
         pass
 
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompts: List[str],
+        seeds: Optional[List[Optional[int]]] = None,
+    ) -> List[Image.Image]:
+        """Generate one image per prompt.
+
+        The default implementation calls ``generate_image`` once per prompt.
+        Backends that can run several prompts through a single pipeline
+        call should override this. A backend may put an exception in place
+        of an image to fail only that prompt.
+
+        Args:
+            prompts: Text prompts describing the desired images.
+            negative_prompts: Negative prompts, one per prompt.
+            seeds: Latent seed per prompt, used instead of ``prompt_seed``
+                (e.g. seeds chosen by a remote client). Backends that
+                cannot seed their output ignore them.
+
+        Returns:
+            list: Generated images in prompt order.
+        """
+        return [
+            self.generate_image(prompt, negative_prompt)
+            for prompt, negative_prompt in zip(prompts, negative_prompts)
+        ]
+
+    @staticmethod
+    def _build_prompts(product_name: str, description: str) -> tuple:
+        """Build the positive and negative prompts for a product.
+
+        Args:
+            product_name: Name of the product.
+            description: Description of the product.
+
+        Returns:
+            tuple: ``(prompt, negative_prompt)``.
+        """
+        # Enhanced prompt for e-commerce products
+        prompt = (
+            f"professional product photography of {product_name}, "
+            f"{description}, centered composition, "
+            "pure white background, studio lighting, "
+            "high resolution, commercial photography, "
+            "product centered, minimalist, clean, sharp focus, "
+            "high-end commercial product photography"
+        )
+
+        # Negative prompt for better results
+        negative_prompt = (
+            "text, watermark, logo, blur, duplicate, "
+            "multiple items, distortion, noise, grain, "
+            "dark, shadows"
+        )
+        return prompt, negative_prompt
+
     def generate_product_image(
         self, product_name: str, description: str
     ) -> dict:
-        """Generate and save a product image.
+        """Generate and store a product image.
+
+        The image is encoded once and delivered to the configured sink.
+        With the ``none`` sink no image is generated at all.
 
         Args:
             product_name: Name of the product.
@@ -52,100 +219,180 @@ class BaseImageGenerator(abc.ABC):
         Returns:
             dict: Contains base64 encoded image and file path.
                 Keys:
-                - base64: Base64 encoded image string
-                - file_path: Path where the image is saved
+                - base64: Base64 encoded image string, or None
+                - file_path: Path where the image is saved, or None
 
         Raises:
             Exception: If image generation or saving fails.
         """
+        if not self.sink.enabled:
+            return self.sink.store(None, product_name)
+
         try:
-            # Create product directory
-            product_dir = os.path.join(
-                "products", product_name.replace(" ", "_").lower()
+            prompt, negative_prompt = self._build_prompts(
+                product_name, description
             )
-            os.makedirs(product_dir, exist_ok=True)
 
-            try:
-                # Enhanced prompt for e-commerce products
-                prompt = (
-                    f"professional product photography of {product_name}, "
-                    f"{description}, centered composition, "
-                    "pure white background, studio lighting, "
-                    "high resolution, commercial photography, "
-                    "product centered, minimalist, clean, sharp focus, "
-                    "high-end commercial product photography"
-                )
+            key, data = self._cache_lookup(prompt, negative_prompt)
+            if data is None:
+                try:
+                    # Generate image using specific implementation
+                    with metrics.timer("image.generate"):
+                        image = self.generate_image(prompt, negative_prompt)
+                    metrics.count("image.generated")
+                except Exception as gen_error:
+                    logger.error(f"Image generation error: {gen_error}")
+                    raise
 
-                # Negative prompt for better results
-                negative_prompt = (
-                    "text, watermark, logo, blur, duplicate, "
-                    "multiple items, distortion, noise, grain, "
-                    "dark, shadows"
-                )
+                data = self.sink.encode(image)
+                self._cache_store(key, data)
+
+            return self.sink.store(data, product_name)
+
+        except Exception as e:
+            return self._handle_error(e, product_name)
+
+    def generate_product_images(self, products: List[tuple]) -> List[dict]:
+        """Generate and store images for several products in batches.
 
-                # Generate image using specific implementation
-                image = self.generate_image(prompt, negative_prompt)
+        Args:
+            products: ``(product_name, description)`` tuples.
+
+        Returns:
+            list: One result dict per product, in input order, with the
+                same keys as ``generate_product_image``.
+        """
+        return [
+            future.result()
+            for future in self.submit_product_images(products)
+        ]
+
+    def submit_product_images(self, products: List[tuple]) -> List[Future]:
+        """Render images for several products and store them in the background.
 
-                # Save image
-                filename = f"{product_name.replace(' ', '_').lower()}_main.jpg"
-                image_path = os.path.join(product_dir, filename)
-                image.save(image_path, "JPEG", quality=95)
+        Cached renderings are served directly; the remaining prompts are
+        sent to ``generate_images`` in chunks of ``batch_size``. If a batch
+        fails, every product in it falls back to a placeholder image.
+        Inference runs on the calling thread; encoding and storing each
+        image is handed to the sink's thread pool, so the next batch can
+        start while the previous one is post-processed.
 
-                logger.info(f"Generated image saved to {image_path}")
+        Args:
+            products: ``(product_name, description)`` tuples.
 
-                # Convert to base64
-                buffered = BytesIO()
-                image.save(buffered, format="JPEG")
-                img_str = base64.b64encode(buffered.getvalue()).decode()
+        Returns:
+            list: One future per product, in input order, resolving to
+                the same result dict as ``generate_product_image``.
+        """
+        if not self.sink.enabled:
+            return [
+                self.sink.submit(self.sink.store, None, name)
+                for name, _ in products
+            ]
 
-                return {
-                    "base64": f"data:image/jpeg;base64,{img_str}",
-                    "file_path": image_path,
-                }
+        futures, pending = self._submit_cached(products)
 
-            except Exception as gen_error:
-                logger.error(f"Image generation error: {gen_error}")
-                raise
+        for offset in range(0, len(pending), self.batch_size):
+            batch = pending[offset : offset + self.batch_size]
 
-        except Exception as e:
-            return self._handle_error(e, product_name, product_dir)
+            try:
+                with metrics.timer("image.generate"):
+                    images = self.generate_images(
+                        [prompt for _, _, prompt, _ in batch],
+                        [negative for _, _, _, negative in batch],
+                    )
+            except Exception as e:
+                logger.error(f"Batch image generation error: {e}")
+                images = [e] * len(batch)
 
-    def _handle_error(
-        self, error: Exception, product_name: str, product_dir: str
+            for image, (index, key, _, _) in zip(images, batch):
+                futures[index] = self._submit_rendered(
+                    key, image, products[index][0]
+                )
+
+        return futures
+
+    def _submit_cached(self, products: List[tuple]) -> tuple:
+        """Serve cache hits and collect what still has to be rendered.
+
+        Returns:
+            tuple: ``(futures, pending)``. ``futures`` has one slot per
+                product, filled for cache hits and failed lookups;
+                ``pending`` holds ``(index, key, prompt, negative_prompt)``
+                for the rest.
+        """
+        futures = [None] * len(products)
+        pending = []
+        for index, (name, description) in enumerate(products):
+            prompt, negative_prompt = self._build_prompts(name, description)
+            try:
+                key, data = self._cache_lookup(prompt, negative_prompt)
+            except Exception as e:
+                # E.g. a remote backend that cannot report its settings
+                logger.error(f"Image cache lookup error: {e}")
+                futures[index] = self.sink.submit(
+                    self._handle_error, e, name
+                )
+                continue
+            if data is not None:
+                futures[index] = self.sink.submit(self.sink.store, data, name)
+            else:
+                pending.append((index, key, prompt, negative_prompt))
+        return futures, pending
+
+    def _submit_rendered(
+        self, key: Optional[str], image, product_name: str
+    ) -> Future:
+        """Hand a rendered image, or the error in its place, to the sink."""
+        if isinstance(image, Exception):
+            # Backends may fail a single prompt of a batch
+            return self.sink.submit(self._handle_error, image, product_name)
+        metrics.count("image.generated")
+        return self.sink.submit(
+            self._encode_and_store, key, image, product_name
+        )
+
+    def _encode_and_store(
+        self, key: Optional[str], image: Image.Image, product_name: str
     ) -> dict:
+        """Encode a rendered image, cache it and deliver it to the sink."""
+        try:
+            data = self.sink.encode(image)
+            self._cache_store(key, data)
+            return self.sink.store(data, product_name)
+        except Exception as e:
+            return self._handle_error(e, product_name)
+
+    def _handle_error(self, error: Exception, product_name: str) -> dict:
         """Handle errors by creating a placeholder image.
 
+        The placeholder is rendered locally, so this path never makes a
+        network request. It is only inlined as base64 when inline is the
+        sink's sole output.
+
         Args:
             error: The exception that occurred.
             product_name: Name of the product.
-            product_dir: Directory for the product files.
 
         Returns:
             dict: Contains placeholder image information.
                 Keys:
-                - base64: None
-                - file_path: Path to placeholder image
+                - base64: None, unless the sink is inline-only
+                - file_path: Path to placeholder image, or None if it
+                  could not be written
         """
         logger.warning(f"Using placeholder due to error: {str(error)}")
-        name = product_name.replace(" ", "+")
-        placeholder_url = (
-            "https://placehold.co/1024x1024/FFFFFF/333333/png?" f"text={name}"
-        )
+        metrics.count("image.placeholders")
 
         try:
-            # Download placeholder
-            response = requests.get(placeholder_url)
-            response.raise_for_status()
-
-            filename = f"{product_name.replace(' ', '_').lower()}_main.jpg"
-            image_path = os.path.join(product_dir, filename)
-
-            img = Image.open(BytesIO(response.content))
-            img.save(image_path, "JPEG", quality=95)
-
-            logger.info(f"Saved placeholder to {image_path}")
-            return {"base64": None, "file_path": image_path}
+            result = self.sink.store(
+                render_placeholder_jpeg(product_name),
+                product_name,
+                inline=False,
+            )
+            logger.info(f"Saved placeholder for {product_name}")
+            return result
 
         except Exception as placeholder_error:
             logger.error(f"Placeholder error: {placeholder_error}")
-            return {"base64": None, "file_path": placeholder_url}
+            return {"base64": None, "file_path": None}
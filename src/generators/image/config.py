@@ -4,10 +4,77 @@ This module contains configuration settings for different image generation
 backends including Stable Diffusion.
 """
 
+import os
+from dotenv import load_dotenv
+
+# Settings in a .env file apply even when this module is imported before
+# utils.config
+load_dotenv()
+
 MODEL_CONFIG = {
     "model_id": "stabilityai/stable-diffusion-3-medium-diffusers",
     "height": 1024,
     "width": 1024,
     "num_inference_steps": 28,
     "guidance_scale": 7.0,
+    # Number of prompts sent through the pipeline in a single call
+    "batch_size": int(os.getenv("IMAGE_BATCH_SIZE", "4")),
+}
+
+IMAGE_CONFIG = {
+    # Backend name, see image_generator_factory.available_backends()
+    "generator_type": os.getenv("IMAGE_GENERATOR_TYPE", "huggingface"),
+    "replicate_model": os.getenv(
+        "REPLICATE_MODEL",
+        "stability-ai/stable-diffusion:"
+        "27b93a2413e7f36cd83da926f3656280b2931564ff050bf9575f1fdf9bcd7478",
+    ),
+    "replicate_api_token": os.getenv("REPLICATE_API_TOKEN", ""),
+    "replicate_api_base": os.getenv(
+        "REPLICATE_API_BASE", "https://api.replicate.com"
+    ),
+    # Concurrent predictions for the async Replicate backend
+    "replicate_max_in_flight": int(
+        os.getenv("REPLICATE_MAX_IN_FLIGHT", "8")
+    ),
+    "replicate_poll_interval": float(
+        os.getenv("REPLICATE_POLL_INTERVAL", "1.0")
+    ),
+    # Fixed latent seed; unset means a fresh random seed per image
+    "seed": (
+        int(os.environ["IMAGE_SEED"]) if os.getenv("IMAGE_SEED") else None
+    ),
+    # Where images go: "file", "inline" (base64), "both" or "none"
+    "output_mode": os.getenv("IMAGE_OUTPUT_MODE", "both"),
+    "jpeg_quality": int(os.getenv("IMAGE_JPEG_QUALITY", "95")),
+    # Image file layout: "directory", "sharded" or "packed" (tar shards)
+    "storage_layout": os.getenv("IMAGE_STORAGE_LAYOUT", "directory"),
+    "shard_max_bytes": int(
+        os.getenv("IMAGE_SHARD_MAX_BYTES", str(1024**3))
+    ),
+    # Threads that encode and store images while inference continues;
+    # 0 does that work on the inference thread
+    "sink_workers": int(os.getenv("IMAGE_SINK_WORKERS", "2")),
+    # Images waiting for those threads before inference blocks
+    "sink_max_pending": int(os.getenv("IMAGE_SINK_MAX_PENDING", "16")),
+    # Unix socket path or host:port of the persistent model server
+    "server_address": os.getenv(
+        "IMAGE_SERVER_ADDRESS", "/tmp/ecommerce_image_server.sock"
+    ),
+    # Content-addressed image cache; set IMAGE_CACHE_DIR="" to disable
+    "cache_dir": os.getenv("IMAGE_CACHE_DIR", ".image_cache"),
+    "cache_max_bytes": int(
+        os.getenv("IMAGE_CACHE_MAX_BYTES", str(2 * 1024**3))
+    ),
+    # Multi-process rendering: wrapped backend, worker processes (0 fits
+    # them to the CPUs) and torch threads per worker
+    "render_backend": os.getenv("IMAGE_RENDER_BACKEND", "local"),
+    "render_workers": int(os.getenv("IMAGE_RENDER_WORKERS", "0")),
+    "render_threads": int(os.getenv("IMAGE_RENDER_THREADS", "4")),
+    # Memory cap for diffusion pipelines shared in a process; 0 is no cap
+    "pipeline_max_bytes": int(os.getenv("IMAGE_PIPELINE_MAX_BYTES", "0")),
+    # In-memory text-encoder outputs of the diffusion backends; 0 disables
+    "embedding_cache_max_bytes": int(
+        os.getenv("IMAGE_EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024**2))
+    ),
 }
@@ -1,10 +1,15 @@
 """Module for generating images using Hugging Face's Diffusers library."""
 
 import logging
+from typing import List, Optional, Union
 import torch
 from PIL import Image
 from diffusers import StableDiffusion3Pipeline
+from utils import metrics
 from .base_image_generator import BaseImageGenerator
+from .prompt_embeddings import create_embedding_cache
+from .config import MODEL_CONFIG
+from . import pipeline_registry, profiles
 
 logger = logging.getLogger(__name__)
 
@@ -16,31 +21,127 @@ class HuggingFaceImageGenerator(BaseImageGenerator):
     running locally through the Hugging Face Diffusers library.
     """
 
-    _pipeline = None
+    def __init__(self, profile: Optional[Union[str, dict]] = None, **kwargs):
+        """Initialize the generator.
+
+        Args:
+            profile: Performance profile name or settings, see
+                ``profiles.resolve_profile``.
+            **kwargs: Passed to ``BaseImageGenerator``.
+        """
+        super().__init__(**kwargs)
+        self.profile = profiles.resolve_profile(profile)
+        self.num_inference_steps = (
+            self.profile["num_inference_steps"]
+            or MODEL_CONFIG["num_inference_steps"]
+        )
+        self.height = profiles.scaled_resolution(
+            MODEL_CONFIG["height"], self.profile
+        )
+        self.width = profiles.scaled_resolution(
+            MODEL_CONFIG["width"], self.profile
+        )
+        self.embedding_cache = create_embedding_cache(self._encode_text)
+        # Registry key, device and dtype, resolved on first use
+        self._pipeline_spec = None
+
+    def generation_params(self) -> dict:
+        """Return the settings that determine the rendered image."""
+        return {
+            "model_id": MODEL_CONFIG["model_id"],
+            "num_inference_steps": self.num_inference_steps,
+            "guidance_scale": MODEL_CONFIG["guidance_scale"],
+            "height": self.height,
+            "width": self.width,
+            "seed": self.seed,
+            **profiles.output_params(self.profile),
+        }
 
     def _get_pipeline(self):
-        """Initialize and return the Stable Diffusion pipeline.
+        """Return the shared pipeline for this model and profile.
+
+        The pipeline is loaded on first use and shared with every other
+        generator in the process through ``pipeline_registry``. Hold
+        ``_inference_lock`` while calling it.
 
         Returns:
             StableDiffusion3Pipeline: Configured pipeline instance.
         """
-        if self._pipeline is None:
-            # Initialize pipeline with better defaults for product images
+        if self._pipeline_spec is None:
             device = "cuda" if torch.cuda.is_available() else "cpu"
-            torch_dtype = torch.float16 if device == "cuda" else torch.float32
-
-            self._pipeline = StableDiffusion3Pipeline.from_pretrained(
-                "stabilityai/stable-diffusion-3-medium-diffusers",
-                torch_dtype=torch_dtype,
-                safety_checker=None,  # Disable safety checker for speed
+            dtype = profiles.torch_dtype(self.profile, device)
+            key = pipeline_registry.pipeline_key(
+                MODEL_CONFIG["model_id"], dtype, device, self.profile
+            )
+            self._pipeline_spec = (key, device, dtype)
+        key, device, dtype = self._pipeline_spec
+        return pipeline_registry.get_pipeline(
+            key, lambda: self._load_pipeline(device, dtype)
+        )
+
+    @property
+    def _inference_lock(self):
+        """Lock serializing calls into the shared pipeline."""
+        if self._pipeline_spec is None:
+            self._get_pipeline()
+        return pipeline_registry.inference_lock(self._pipeline_spec[0])
+
+    def _load_pipeline(self, device: str, dtype):
+        """Load the pipeline with better defaults for product images."""
+        profiles.configure_threads(self.profile)
+
+        pipeline = StableDiffusion3Pipeline.from_pretrained(
+            MODEL_CONFIG["model_id"],
+            torch_dtype=dtype,
+            safety_checker=None,  # Disable safety checker for speed
+        )
+
+        if device == "cuda":
+            pipeline = pipeline.to(device)
+            # For memory efficiency
+            pipeline.enable_attention_slicing()
+
+        profiles.apply_profile(pipeline, self.profile)
+        return pipeline
+
+    def _encode_text(self, text: str) -> tuple:
+        """Run the CLIP and T5 text encoders on a single prompt."""
+        pipeline = self._get_pipeline()
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        with self._inference_lock, profiles.inference_context(
+            device
+        ), torch.no_grad():
+            embeds, _, pooled, _ = pipeline.encode_prompt(
+                prompt=text,
+                prompt_2=None,
+                prompt_3=None,
+                device=device,
+                num_images_per_prompt=1,
+                do_classifier_free_guidance=False,
             )
+        return embeds, pooled
 
-            if device == "cuda":
-                self._pipeline = self._pipeline.to(device)
-                # For memory efficiency
-                self._pipeline.enable_attention_slicing()
+    def _prompt_kwargs(
+        self, pipeline, prompts: List[str], negative_prompts: List[str]
+    ) -> dict:
+        """Return the prompt arguments for a pipeline call.
 
-        return self._pipeline
+        Uses cached embeddings when the pipeline can take them.
+        """
+        if self.embedding_cache is None or not hasattr(
+            pipeline, "encode_prompt"
+        ):
+            return {"prompt": prompts, "negative_prompt": negative_prompts}
+        prompt_embeds, pooled = self.embedding_cache.embed_batch(prompts)
+        negative_embeds, negative_pooled = self.embedding_cache.embed_batch(
+            negative_prompts
+        )
+        return {
+            "prompt_embeds": prompt_embeds,
+            "pooled_prompt_embeds": pooled,
+            "negative_prompt_embeds": negative_embeds,
+            "negative_pooled_prompt_embeds": negative_pooled,
+        }
 
     def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
         """Generate image using local Stable Diffusion 3.
@@ -52,6 +153,27 @@ class HuggingFaceImageGenerator(BaseImageGenerator):
         Returns:
             PIL.Image: The generated image.
 
+        Raises:
+            Exception: If image generation fails.
+        """
+        return self.generate_images([prompt], [negative_prompt])[0]
+
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompts: List[str],
+        seeds: Optional[List[Optional[int]]] = None,
+    ) -> List[Image.Image]:
+        """Generate images for several prompts with batched pipeline calls.
+
+        Args:
+            prompts: Text prompts describing the desired images.
+            negative_prompts: Negative prompts, one per prompt.
+            seeds: Latent seed per prompt. Defaults to ``prompt_seed``.
+
+        Returns:
+            list: Generated images in prompt order.
+
         Raises:
             Exception: If image generation fails.
         """
@@ -59,17 +181,30 @@ class HuggingFaceImageGenerator(BaseImageGenerator):
             pipeline = self._get_pipeline()
             device = "cuda" if torch.cuda.is_available() else "cpu"
 
-            with torch.autocast(device):
-                image = pipeline(
-                    prompt=prompt,
-                    negative_prompt=negative_prompt,
-                    num_inference_steps=28,
-                    height=1024,
-                    width=1024,
-                    guidance_scale=7.0,
-                ).images[0]
-
-            return image
+            seeds = self._latent_seeds(prompts, negative_prompts, seeds)
+            images = []
+            for offset in range(0, len(prompts), self.batch_size):
+                batch = prompts[offset : offset + self.batch_size]
+                negatives = negative_prompts[offset : offset + self.batch_size]
+                prompt_kwargs = self._prompt_kwargs(pipeline, batch, negatives)
+                # One generator per image, so batching does not change images
+                generator = profiles.latent_generators(
+                    device, seeds[offset : offset + self.batch_size]
+                )
+                with self._inference_lock, profiles.inference_context(
+                    device
+                ), metrics.timer("image.diffusion"):
+                    images.extend(
+                        pipeline(
+                            **prompt_kwargs,
+                            num_inference_steps=self.num_inference_steps,
+                            height=self.height,
+                            width=self.width,
+                            guidance_scale=MODEL_CONFIG["guidance_scale"],
+                            generator=generator,
+                        ).images
+                    )
+            return images
 
         except Exception as e:
             logger.error(f"Stable Diffusion generation error: {e}")
@@ -0,0 +1,229 @@
+"""Content-addressed on-disk cache for generated images.
+
+Images are stored as JPEG bytes under a key derived from every parameter
+that influences the rendering (model, prompts, steps, guidance, size and
+seed). Re-running a catalog whose product text did not change therefore
+skips diffusion entirely. The cache is bounded in size and evicts the
+least recently used entries first.
+
+All generators of a process share one ``ImageCache`` per directory (see
+``get_image_cache``). Worker processes sharing a directory each keep
+their own index, so every cache re-reads the directory after writing a
+sixteenth of ``max_bytes``. That way the size cap holds for the directory
+as a whole, overshooting by at most that much per process.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+from .config import IMAGE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Part of max_bytes a cache writes before it re-reads the directory
+_RESCAN_FRACTION = 16
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class ImageCache:
+    """Size-bounded LRU cache of JPEG bytes on disk.
+
+    Entries live in ``<cache_dir>/<key[:2]>/<key>.jpg``. Recency is tracked
+    in memory and persisted through file modification times, so the LRU
+    order survives restarts.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """Initialize the cache and index existing entries.
+
+        Args:
+            cache_dir: Directory holding the cached images.
+            max_bytes: Maximum total size of cached images in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._rescan_bytes = max(1, max_bytes // _RESCAN_FRACTION)
+        self._written_since_scan = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(**params) -> str:
+        """Hash generation parameters into a cache key.
+
+        Args:
+            **params: JSON-serializable generation parameters.
+
+        Returns:
+            str: Hex SHA-256 digest of the canonicalized parameters.
+        """
+        payload = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.jpg")
+
+    def _load_index(self) -> None:
+        """Rebuild the in-memory LRU index from the files on disk.
+
+        Files written by other processes are picked up, and evicting
+        afterwards keeps the whole directory under ``max_bytes``.
+        """
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".jpg"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue  # Evicted by another process meanwhile
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        with self._lock:
+            self._entries = OrderedDict(
+                (key, size) for _, key, size in sorted(entries)
+            )
+            self._size = sum(self._entries.values())
+            self._written_since_scan = 0
+            self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached bytes for ``key`` or None on a miss.
+
+        Args:
+            key: Cache key from ``make_key``.
+
+        Returns:
+            bytes | None: The stored JPEG bytes.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            # Not cached, or evicted by another process
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                # Written by another process since the last scan
+                self._entries[key] = len(data)
+                self._size += len(data)
+            self.hits += 1
+            self.bytes_served += len(data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store bytes under ``key`` and evict old entries if needed.
+
+        Args:
+            key: Cache key from ``make_key``.
+            data: JPEG bytes to store.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write atomically so a crash never leaves a truncated entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._size += len(data)
+            self.bytes_written += len(data)
+            self._written_since_scan += len(data)
+            rescan = self._written_since_scan >= self._rescan_bytes
+            if rescan:
+                # Keeps other threads from starting a scan as well
+                self._written_since_scan = 0
+            else:
+                self._evict()
+        if rescan:
+            self._load_index()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until under ``max_bytes``."""
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Return cache statistics.
+
+        Returns:
+            dict: Hits, misses, hit rate, bytes served and written,
+                evictions, entry count and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "bytes_written": self.bytes_written,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def get_image_cache(cache_dir: str, max_bytes: int) -> ImageCache:
+    """Return this process's shared cache for ``cache_dir``.
+
+    The first call for a directory indexes it; later calls, including
+    ones from other generators and threads, reuse that cache. Forked
+    processes get caches of their own.
+    """
+    key = (os.getpid(), os.path.abspath(cache_dir))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ImageCache(cache_dir, max_bytes)
+    return cache
+
+
+def create_image_cache() -> Optional[ImageCache]:
+    """Return the image cache configured in ``IMAGE_CONFIG``.
+
+    Returns:
+        ImageCache | None: The shared cache instance, or None if caching
+            is disabled.
+    """
+    if not IMAGE_CONFIG["cache_dir"]:
+        return None
+    return get_image_cache(
+        IMAGE_CONFIG["cache_dir"], IMAGE_CONFIG["cache_max_bytes"]
+    )
@@ -1,13 +1,98 @@
-"""Factory module for creating image generators."""
+"""Factory module for creating image generators.
 
-from .huggingface_image_generator import HuggingFaceImageGenerator
+Backends are registered by name and imported lazily, so heavy
+dependencies such as ``torch`` and ``diffusers`` are only loaded when a
+backend that needs them is actually instantiated. Text-only runs never
+pay for them.
+"""
+
+import importlib
+from typing import Optional
 from .base_image_generator import BaseImageGenerator
+from .config import IMAGE_CONFIG
+
+# Backend name -> (module within this package, class name)
+_BACKENDS = {
+    "local": ("local_image_generator", "LocalImageGenerator"),
+    "huggingface": (
+        "huggingface_image_generator",
+        "HuggingFaceImageGenerator",
+    ),
+    "replicate": ("replicate_image_generator", "ReplicateImageGenerator"),
+    "replicate-async": (
+        "async_replicate_image_generator",
+        "AsyncReplicateImageGenerator",
+    ),
+    "placeholder": (
+        "placeholder_image_generator",
+        "PlaceholderImageGenerator",
+    ),
+    "stub": ("placeholder_image_generator", "StubImageGenerator"),
+    "none": ("placeholder_image_generator", "NullImageGenerator"),
+    "server": ("server_image_generator", "ServerImageGenerator"),
+    "multiprocess": (
+        "multiprocess_image_generator",
+        "MultiProcessImageGenerator",
+    ),
+}
+
+
+def register_backend(name: str, module: str, class_name: str) -> None:
+    """Register an image generator backend.
+
+    Args:
+        name: Backend name used in ``IMAGE_GENERATOR_TYPE``.
+        module: Absolute module path, or a module name relative to this
+            package.
+        class_name: Name of the BaseImageGenerator subclass in ``module``.
+    """
+    _BACKENDS[name] = (module, class_name)
+
+
+def available_backends() -> list:
+    """Return the names of all registered backends."""
+    return sorted(_BACKENDS)
+
 
+def get_backend_class(name: str) -> type:
+    """Import and return the generator class registered as ``name``.
 
-def create_image_generator() -> BaseImageGenerator:
+    Args:
+        name: Registered backend name.
+
+    Returns:
+        type: The BaseImageGenerator subclass.
+
+    Raises:
+        ValueError: If no backend is registered under ``name``.
+    """
+    try:
+        module_name, class_name = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown image generator type: {name}. "
+            f"Expected one of {', '.join(available_backends())}"
+        ) from None
+
+    if "." in module_name:
+        module = importlib.import_module(module_name)
+    else:
+        module = importlib.import_module(f".{module_name}", __package__)
+    return getattr(module, class_name)
+
+
+def create_image_generator(
+    generator_type: Optional[str] = None, **kwargs
+) -> BaseImageGenerator:
     """Create and return appropriate image generator instance.
 
+    Args:
+        generator_type: Registered backend name. Defaults to
+            ``IMAGE_CONFIG["generator_type"]``.
+        **kwargs: Passed to the generator's constructor.
+
     Returns:
         BaseImageGenerator: Instance of image generator.
     """
-    return HuggingFaceImageGenerator()
+    name = generator_type or IMAGE_CONFIG["generator_type"]
+    return get_backend_class(name)(**kwargs)
@@ -0,0 +1,272 @@
+"""Long-lived image generation server that keeps a pipeline warm.
+
+Loading diffusion weights takes far longer than rendering a single image,
+so short catalog jobs should not pay for it every time. This daemon loads
+a backend once and serves generation jobs over a Unix socket or a
+localhost TCP port. Jobs from all connected clients go through one queue
+and are grouped into batches for the backend's ``generate_images``.
+Each prompt carries the client's latent seed, and the backend seeds that
+image's own ``torch.Generator`` with it, so an image does not depend on
+which batch it lands in or on the server's own seed.
+
+Messages are length-prefixed: a 4-byte big-endian header length, a JSON
+header, then ``payload_size`` bytes of payload. Images travel as raw
+pixel data described by ``mode`` and ``size``, so neither side spends
+time on lossy re-encoding.
+
+Start it from the ``src`` directory:
+
+    python -m generators.image.model_server --backend huggingface \\
+        --address /tmp/ecommerce_image_server.sock
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from concurrent.futures import Future
+from typing import Optional, Tuple
+from .config import IMAGE_CONFIG
+from .image_generator_factory import create_image_generator
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+
+
+def parse_address(address: str):
+    """Turn ``host:port`` into a tuple; anything else is a socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock: socket.socket, header: dict, payload: bytes = b""):
+    """Send a JSON header followed by an optional binary payload."""
+    header = dict(header, payload_size=len(payload))
+    data = json.dumps(header).encode()
+    sock.sendall(_HEADER.pack(len(data)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock: socket.socket) -> Tuple[dict, bytes]:
+    """Receive a message sent with ``send_message``."""
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    header = json.loads(_recv_exactly(sock, size))
+    payload = _recv_exactly(sock, header.get("payload_size", 0))
+    return header, payload
+
+
+class _BatchingWorker(threading.Thread):
+    """Render queued jobs in batches on a single thread.
+
+    Only this thread touches the pipeline, which is not thread-safe. It
+    waits up to ``batch_window`` seconds for more jobs once the first one
+    arrives, so concurrent clients share pipeline calls.
+    """
+
+    def __init__(self, generator, max_batch_size: int, batch_window: float):
+        super().__init__(name="image-batcher", daemon=True)
+        self.generator = generator
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = batch_window
+        self.jobs = queue.Queue()
+
+    def submit(
+        self, prompt: str, negative_prompt: str, seed: Optional[int]
+    ) -> Future:
+        future = Future()
+        self.jobs.put((prompt, negative_prompt, seed, future))
+        return future
+
+    def _collect(self) -> list:
+        batch = [self.jobs.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.jobs.get(timeout=self.batch_window))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self._collect()
+            try:
+                # Jobs keep their client's seed whatever batch they are in
+                images = self.generator.generate_images(
+                    [prompt for prompt, _, _, _ in batch],
+                    [negative for _, negative, _, _ in batch],
+                    [seed for _, _, seed, _ in batch],
+                )
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed: {e}")
+                images = [e] * len(batch)
+            for (_, _, _, future), image in zip(batch, images):
+                if isinstance(image, Exception):
+                    future.set_exception(image)
+                else:
+                    future.set_result(image)
+            logger.info(f"Rendered batch of {len(batch)}")
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, struct.error):
+                return
+
+            op = header.get("op")
+            if op == "ping":
+                send_message(self.request, {"ok": True})
+            elif op == "info":
+                send_message(self.request, self.server.info())
+            elif op == "generate":
+                self._generate(header)
+            else:
+                send_message(
+                    self.request, {"ok": False, "error": f"Unknown op {op}"}
+                )
+
+    def _generate(self, header: dict):
+        prompts = header["prompts"]
+        # Clients that send no seeds get unseeded images
+        seeds = header.get("seeds") or [None] * len(prompts)
+        futures = [
+            self.server.worker.submit(prompt, negative_prompt, seed)
+            for prompt, negative_prompt, seed in zip(
+                prompts, header["negative_prompts"], seeds
+            )
+        ]
+
+        results = []
+        payload = []
+        for future in futures:
+            try:
+                image = future.result()
+            except Exception as e:
+                results.append({"error": str(e)})
+                continue
+            data = image.tobytes()
+            results.append(
+                {"mode": image.mode, "size": image.size, "length": len(data)}
+            )
+            payload.append(data)
+
+        send_message(
+            self.request, {"ok": True, "images": results}, b"".join(payload)
+        )
+
+
+class _ServerMixin:
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def info(self) -> dict:
+        return {
+            "ok": True,
+            "backend": self.backend,
+            "generation_params": self.worker.generator.generation_params(),
+            "max_batch_size": self.worker.max_batch_size,
+        }
+
+
+class _UnixServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+    pass
+
+
+class _TCPServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    pass
+
+
+def create_server(
+    backend: str,
+    address: str,
+    max_batch_size: Optional[int] = None,
+    batch_window: float = 0.05,
+    warm: bool = True,
+):
+    """Create a model server; call ``serve_forever()`` to run it.
+
+    Args:
+        backend: Registered image backend that does the rendering.
+        address: Unix socket path or ``host:port``.
+        max_batch_size: Maximum prompts per pipeline call. Defaults to
+            the backend's batch size.
+        batch_window: Seconds to wait for more jobs to fill a batch.
+        warm: Load the pipeline before accepting connections.
+
+    Returns:
+        socketserver.BaseServer: The bound server.
+    """
+    # The server caches nothing itself; clients own the image cache
+    generator = create_image_generator(backend, use_cache=False)
+    if warm and hasattr(generator, "_get_pipeline"):
+        logger.info(f"Loading {backend} pipeline")
+        generator._get_pipeline()
+
+    worker = _BatchingWorker(
+        generator, max_batch_size or generator.batch_size, batch_window
+    )
+    worker.start()
+
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        server = _TCPServer(address, _Handler)
+    else:
+        if os.path.exists(address):
+            os.remove(address)
+        server = _UnixServer(address, _Handler)
+    server.backend = backend
+    server.worker = worker
+    return server
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backend",
+        default=IMAGE_CONFIG["generator_type"],
+        help="Image backend to serve",
+    )
+    parser.add_argument(
+        "--address",
+        default=IMAGE_CONFIG["server_address"],
+        help="Unix socket path or host:port to listen on",
+    )
+    parser.add_argument("--max-batch-size", type=int, default=None)
+    parser.add_argument("--batch-window", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = create_server(
+        args.backend, args.address, args.max_batch_size, args.batch_window
+    )
+    logger.info(f"Serving {args.backend} images on {args.address}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Multi-process CPU rendering with model weights shared between workers.
+
+A single diffusion pipeline cannot use a large CPU host efficiently, yet
+every extra worker that loads its own pipeline holds another full copy of
+the UNet, VAE and text encoder weights, so memory runs out long before the
+cores do. ``MultiProcessImageGenerator`` loads the wrapped backend's
+pipeline once in the parent and then forks its render workers. The
+workers inherit the weights copy-on-write: tensor storage is only ever
+read during inference, so its pages stay shared and each extra worker
+costs little more than its activations. ``gc.freeze`` is called before
+forking so the garbage collector does not touch, and thereby copy, the
+inherited objects.
+
+Each worker gets a torch thread budget and, on Linux, is pinned to its
+own slice of the available CPUs so workers do not oversubscribe cores.
+Prompts are split into per-worker batches and placed on a shared task
+queue; idle workers pull the next batch, which balances load when some
+prompts take longer than others.
+
+Fork is required, so this backend runs on Linux and macOS only. Do not
+run inference in the parent before the workers are started.
+"""
+
+import gc
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import weakref
+from typing import List, Optional
+from PIL import Image
+from utils import metrics
+from .base_image_generator import BaseImageGenerator
+from .config import IMAGE_CONFIG
+from .image_generator_factory import create_image_generator
+from .sinks import ImageSink
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks that all workers are still alive
+_POLL_INTERVAL = 1.0
+
+
+def cpu_slices(workers: int, threads: int) -> list:
+    """Split the CPUs this process may use into one slice per worker.
+
+    Returns:
+        list: A list of CPU ids per worker, or None entries when pinning
+            is unsupported or there are fewer CPUs than threads asked for.
+    """
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return [None] * workers
+    if workers * threads > len(cpus):
+        return [None] * workers
+    return [cpus[i * threads : (i + 1) * threads] for i in range(workers)]
+
+
+def _pack(image) -> tuple:
+    """Turn a rendered image or per-prompt error into picklable data."""
+    if isinstance(image, Exception):
+        return ("error", str(image))
+    return (image.mode, image.size, image.tobytes())
+
+
+def _unpack(item: tuple):
+    if item[0] == "error":
+        return RuntimeError(item[1])
+    mode, size, data = item
+    return Image.frombytes(mode, size, data)
+
+
+def _worker_main(backend, cpus, threads, tasks, results) -> None:
+    """Render batches from ``tasks`` until a None task arrives.
+
+    Every result carries a ``metrics.snapshot``, which clears what it
+    returns, so the parent receives each worker's metrics exactly once.
+    """
+    # Metrics inherited through fork were already counted in the parent
+    metrics.reset()
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, prompts, negative_prompts, seeds = task
+        try:
+            with metrics.timer("image.worker_render"):
+                images = backend.generate_images(
+                    prompts, negative_prompts, seeds
+                )
+            payload = [_pack(image) for image in images]
+            results.put((task_id, payload, None, metrics.snapshot()))
+        except Exception as e:
+            results.put((task_id, None, str(e), metrics.snapshot()))
+
+
+def _shutdown(processes: list, tasks) -> None:
+    for _ in processes:
+        tasks.put(None)
+    for process in processes:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+
+
+class MultiProcessImageGenerator(BaseImageGenerator):
+    """Render with forked worker processes that share one set of weights."""
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        workers: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        worker_batch_size: Optional[int] = None,
+        profile=None,
+        **kwargs,
+    ):
+        """Load the wrapped backend's pipeline and start the workers.
+
+        Args:
+            backend: Backend that renders in the workers, e.g. ``local``.
+                Defaults to ``IMAGE_CONFIG["render_backend"]``.
+            workers: Number of worker processes. Defaults to
+                ``IMAGE_CONFIG["render_workers"]``, or as many as fit the
+                CPUs at ``threads_per_worker`` threads each.
+            threads_per_worker: Torch threads per worker. Defaults to
+                ``IMAGE_CONFIG["render_threads"]``.
+            worker_batch_size: Prompts per pipeline call in a worker.
+                Defaults to ``MODEL_CONFIG["batch_size"]``.
+            profile: Performance profile passed to the wrapped backend.
+            **kwargs: Passed to ``BaseImageGenerator``. ``batch_size``
+                is ignored; one batch spans all workers.
+        """
+        kwargs.pop("batch_size", None)
+        super().__init__(batch_size=worker_batch_size, **kwargs)
+        self.threads_per_worker = max(
+            1, threads_per_worker or IMAGE_CONFIG["render_threads"]
+        )
+        self.workers = max(
+            1,
+            workers
+            or IMAGE_CONFIG["render_workers"]
+            or (os.cpu_count() or 1) // self.threads_per_worker,
+        )
+        self.worker_batch_size = self.batch_size
+        # Enough prompts per call to keep every worker busy
+        self.batch_size = self.worker_batch_size * self.workers
+
+        backend_options = {
+            "batch_size": self.worker_batch_size,
+            "seed": self.seed,
+            "use_cache": False,
+            "sink": ImageSink("none"),
+        }
+        if profile is not None:
+            backend_options["profile"] = profile
+        self.backend = create_image_generator(
+            backend or IMAGE_CONFIG["render_backend"], **backend_options
+        )
+
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._broken = None
+        self._start()
+
+    def _start(self) -> None:
+        """Load the pipeline once, then fork the workers."""
+        if hasattr(self.backend, "_get_pipeline"):
+            self.backend._get_pipeline()
+
+        context = multiprocessing.get_context("fork")
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(
+                target=_worker_main,
+                args=(
+                    self.backend,
+                    cpus,
+                    self.threads_per_worker,
+                    self._tasks,
+                    self._results,
+                ),
+                name=f"image-render-{index}",
+                daemon=True,
+            )
+            for index, cpus in enumerate(
+                cpu_slices(self.workers, self.threads_per_worker)
+            )
+        ]
+
+        # Keep the collector from writing to inherited object headers
+        gc.collect()
+        gc.freeze()
+        try:
+            for process in self._processes:
+                process.start()
+        finally:
+            gc.unfreeze()
+
+        # Also runs at interpreter exit
+        self._finalizer = weakref.finalize(
+            self, _shutdown, self._processes, self._tasks
+        )
+        logger.info(
+            f"Started {self.workers} render workers with "
+            f"{self.threads_per_worker} threads each"
+        )
+
+    def generation_params(self) -> dict:
+        """Return the wrapped backend's settings.
+
+        Workers render exactly what the wrapped backend renders, so both
+        share cache entries.
+        """
+        return self.backend.generation_params()
+
+    def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
+        """Render one image on a worker."""
+        image = self.generate_images([prompt], [negative_prompt])[0]
+        if isinstance(image, Exception):
+            raise image
+        return image
+
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompts: List[str],
+        seeds: Optional[List[Optional[int]]] = None,
+    ) -> List[Image.Image]:
+        """Render prompts in per-worker batches across all workers.
+
+        A batch that fails in a worker yields an exception in place of
+        each of its images, so only those products get placeholders.
+        ``seeds`` are passed through to the backend.
+
+        Raises:
+            RuntimeError: If a worker process died. The generator stops
+                all workers and fails every later call.
+        """
+        if self._broken:
+            raise RuntimeError(self._broken)
+
+        seeds = self._latent_seeds(prompts, negative_prompts, seeds)
+        step = self.worker_batch_size
+        tasks = {}
+        with self._lock:
+            for offset in range(0, len(prompts), step):
+                task_id = next(self._task_ids)
+                tasks[task_id] = offset
+                self._tasks.put(
+                    (
+                        task_id,
+                        prompts[offset : offset + step],
+                        negative_prompts[offset : offset + step],
+                        seeds[offset : offset + step],
+                    )
+                )
+
+            images = [None] * len(prompts)
+            remaining = set(tasks)
+            while remaining:
+                task_id, payload, error, snapshot = self._next_result()
+                metrics.merge(snapshot)
+                if task_id not in remaining:
+                    continue  # Left over from an earlier failed call
+                remaining.discard(task_id)
+                offset = tasks[task_id]
+                count = len(prompts[offset : offset + step])
+                if error is not None:
+                    images[offset : offset + count] = [
+                        RuntimeError(error)
+                    ] * count
+                else:
+                    images[offset : offset + count] = [
+                        _unpack(item) for item in payload
+                    ]
+        return images
+
+    def _next_result(self) -> tuple:
+        while True:
+            try:
+                return self._results.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    # A worker that died may hold the task queue's lock,
+                    # so the remaining workers cannot be relied on either
+                    self._broken = (
+                        f"Render worker(s) exited: {', '.join(dead)}"
+                    )
+                    for process in self._processes:
+                        process.terminate()
+                    raise RuntimeError(self._broken)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._finalizer()
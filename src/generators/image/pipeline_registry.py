@@ -0,0 +1,184 @@
+"""Process-wide registry of loaded diffusion pipelines.
+
+Loading a pipeline takes seconds to minutes and gigabytes of memory, so
+every generator instance in a process shares the pipelines loaded here.
+Pipelines are keyed by model id, dtype, device and performance profile.
+The first caller for a key loads it while other callers for the same key
+wait; callers for other keys are not blocked.
+
+Diffusers pipelines keep scheduler state between denoising steps and are
+not safe to call from several threads at once. Every key therefore has an
+inference lock (``inference_lock``) that generators hold around pipeline
+calls, so generators sharing a pipeline take turns instead of corrupting
+each other's runs.
+
+With a memory cap (``IMAGE_PIPELINE_MAX_BYTES``) the least recently used
+pipelines are dropped once the loaded weights exceed it. The pipeline
+just loaded is never evicted, so a single model larger than the cap still
+works. Load counts, load times and evictions are available from
+``stats``.
+"""
+
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from utils import metrics
+from .config import IMAGE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pipelines = OrderedDict()
+_key_locks = {}
+_inference_locks = {}
+_stats = {}
+_evictions = 0
+
+
+def pipeline_key(model_id: str, dtype, device: str, profile: dict) -> tuple:
+    """Return the registry key of a pipeline configuration.
+
+    Every profile setting is part of the key, since the scheduler, memory
+    format and compilation are applied to the loaded pipeline.
+    """
+    return (model_id, str(dtype), device, tuple(sorted(profile.items())))
+
+
+def pipeline_nbytes(pipeline) -> int:
+    """Return the size of a pipeline's parameters and buffers in bytes."""
+    total = 0
+    components = getattr(pipeline, "components", None) or {}
+    for component in components.values():
+        for attribute in ("parameters", "buffers"):
+            tensors = getattr(component, attribute, None)
+            if not callable(tensors):
+                continue
+            total += sum(t.element_size() * t.nelement() for t in tensors())
+    return total
+
+
+def inference_lock(key: tuple) -> threading.Lock:
+    """Return the lock to hold while calling the pipeline for ``key``.
+
+    The lock outlives evictions, so a pipeline reloaded under the same key
+    is guarded by the same lock.
+    """
+    with _lock:
+        return _inference_locks.setdefault(key, threading.Lock())
+
+
+def get_pipeline(
+    key: tuple, load: Callable[[], object], max_bytes: Optional[int] = None
+):
+    """Return the pipeline for ``key``, loading it on first use.
+
+    Args:
+        key: Key from ``pipeline_key``.
+        load: Loads and configures the pipeline.
+        max_bytes: Memory cap for all registered pipelines. Defaults to
+            ``IMAGE_CONFIG["pipeline_max_bytes"]``; 0 means no cap.
+
+    Returns:
+        The shared pipeline.
+    """
+    with _lock:
+        entry = _pipelines.get(key)
+        if entry is not None:
+            _pipelines.move_to_end(key)
+            _stats[key]["hits"] += 1
+            return entry[0]
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _lock:
+            entry = _pipelines.get(key)
+            if entry is not None:
+                # Loaded by another thread while this one waited
+                _pipelines.move_to_end(key)
+                _stats[key]["hits"] += 1
+                return entry[0]
+
+        start = time.perf_counter()
+        with metrics.timer("image.pipeline_load"):
+            pipeline = load()
+        seconds = time.perf_counter() - start
+        nbytes = pipeline_nbytes(pipeline)
+        logger.info(
+            f"Loaded pipeline {key[0]} ({key[1]}, {key[2]}) in "
+            f"{seconds:.1f}s, {nbytes / 2**20:.0f} MiB"
+        )
+
+        with _lock:
+            _pipelines[key] = (pipeline, nbytes)
+            stats = _stats.setdefault(
+                key, {"loads": 0, "load_seconds": 0.0, "hits": 0}
+            )
+            stats["loads"] += 1
+            stats["load_seconds"] += seconds
+            stats["size_bytes"] = nbytes
+            evicted = _evict(
+                IMAGE_CONFIG["pipeline_max_bytes"]
+                if max_bytes is None
+                else max_bytes
+            )
+    if evicted:
+        _release_memory()
+    return pipeline
+
+
+def _evict(max_bytes: int) -> int:
+    """Drop least recently used pipelines until under ``max_bytes``."""
+    global _evictions
+    if max_bytes <= 0:
+        return 0
+    evicted = 0
+    total = sum(nbytes for _, nbytes in _pipelines.values())
+    # The most recent entry is the one just loaded and always stays
+    while total > max_bytes and len(_pipelines) > 1:
+        key, (_, nbytes) = _pipelines.popitem(last=False)
+        total -= nbytes
+        evicted += 1
+        logger.info(f"Evicted pipeline {key[0]} ({key[1]}, {key[2]})")
+    _evictions += evicted
+    return evicted
+
+
+def _release_memory() -> None:
+    gc.collect()
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def clear() -> None:
+    """Drop every registered pipeline."""
+    with _lock:
+        _pipelines.clear()
+    _release_memory()
+
+
+def stats() -> dict:
+    """Return registry totals and per-pipeline load statistics."""
+    with _lock:
+        return {
+            "loaded": len(_pipelines),
+            "size_bytes": sum(nbytes for _, nbytes in _pipelines.values()),
+            "evictions": _evictions,
+            "pipelines": [
+                dict(
+                    stats,
+                    model_id=key[0],
+                    dtype=key[1],
+                    device=key[2],
+                    profile=dict(key[3]).get("name"),
+                    loaded=key in _pipelines,
+                )
+                for key, stats in _stats.items()
+            ],
+        }
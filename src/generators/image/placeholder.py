@@ -0,0 +1,130 @@
+"""Local placeholder image rendering.
+
+Placeholders are drawn with Pillow on a pre-rendered blank background, so
+the fallback path for failed generations never touches the network.
+Encoded placeholders are cached by text, which makes repeated fallbacks
+(e.g. while a model is unavailable) essentially free.
+"""
+
+import textwrap
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+
+DEFAULT_SIZE = (1024, 1024)
+BACKGROUND_COLOR = (255, 255, 255)
+TEXT_COLOR = (51, 51, 51)
+
+
+class PlaceholderRenderer:
+    """Render product-name placeholders as JPEG bytes.
+
+    The blank background and font are created once per renderer and the
+    encoded results are kept in a bounded LRU cache keyed by text.
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = DEFAULT_SIZE,
+        background: Tuple[int, int, int] = BACKGROUND_COLOR,
+        color: Tuple[int, int, int] = TEXT_COLOR,
+        quality: int = 95,
+        cache_size: int = 1024,
+    ):
+        """Initialize the renderer.
+
+        Args:
+            size: Width and height of the placeholder.
+            background: Background RGB color.
+            color: Text RGB color.
+            quality: JPEG quality of the encoded placeholder.
+            cache_size: Maximum number of encoded placeholders to keep.
+        """
+        self.size = size
+        self.color = color
+        self.quality = quality
+        self.cache_size = cache_size
+        self._template = Image.new("RGB", size, background)
+        self._font = self._load_font(max(12, min(size) // 16))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_font(font_size: int):
+        try:
+            return ImageFont.load_default(size=font_size)
+        except TypeError:
+            # Pillow < 10.1 only ships a fixed-size bitmap font
+            return ImageFont.load_default()
+
+    def render(self, text: str) -> Image.Image:
+        """Draw ``text`` centered on a copy of the blank template.
+
+        Args:
+            text: Text to draw, usually the product name.
+
+        Returns:
+            PIL.Image: The placeholder image.
+        """
+        image = self._template.copy()
+        draw = ImageDraw.Draw(image)
+        wrapped = "\n".join(textwrap.wrap(text, width=24)) or " "
+        draw.multiline_text(
+            (self.size[0] / 2, self.size[1] / 2),
+            wrapped,
+            fill=self.color,
+            font=self._font,
+            anchor="mm",
+            align="center",
+        )
+        return image
+
+    def render_jpeg(self, text: str) -> bytes:
+        """Return the placeholder for ``text`` as cached JPEG bytes.
+
+        Args:
+            text: Text to draw, usually the product name.
+
+        Returns:
+            bytes: JPEG encoded placeholder.
+        """
+        with self._lock:
+            data = self._cache.get(text)
+            if data is not None:
+                self._cache.move_to_end(text)
+                return data
+
+        buffered = BytesIO()
+        self.render(text).save(buffered, "JPEG", quality=self.quality)
+        data = buffered.getvalue()
+
+        with self._lock:
+            self._cache[text] = data
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data
+
+
+_default_renderer: Optional[PlaceholderRenderer] = None
+
+
+def default_renderer() -> PlaceholderRenderer:
+    """Return the renderer shared by the whole process."""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = PlaceholderRenderer()
+    return _default_renderer
+
+
+def render_placeholder_jpeg(text: str) -> bytes:
+    """Render a placeholder with the shared default renderer.
+
+    Args:
+        text: Text to draw, usually the product name.
+
+    Returns:
+        bytes: JPEG encoded placeholder.
+    """
+    return default_renderer().render_jpeg(text)
@@ -0,0 +1,87 @@
+"""Image generators that do not run a model.
+
+``PlaceholderImageGenerator`` renders a local placeholder for every
+product, which is useful for fast dry runs that still produce image
+files. ``StubImageGenerator`` returns deterministic synthetic images that
+go through the regular encode, cache and sink path, for benchmarks.
+``NullImageGenerator`` skips images entirely.
+"""
+
+import hashlib
+from concurrent.futures import Future
+from typing import List
+import numpy as np
+from PIL import Image
+from .base_image_generator import BaseImageGenerator
+from .placeholder import default_renderer, render_placeholder_jpeg
+from .sinks import ImageSink
+
+
+class PlaceholderImageGenerator(BaseImageGenerator):
+    """Image generator that renders product-name placeholders locally."""
+
+    def __init__(self, **kwargs):
+        # Placeholders are cheaper to render than to look up
+        kwargs.setdefault("use_cache", False)
+        super().__init__(**kwargs)
+
+    def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
+        """Render a placeholder showing the start of the prompt."""
+        return default_renderer().render(prompt.split(",")[0])
+
+    def generate_product_image(
+        self, product_name: str, description: str
+    ) -> dict:
+        """Store a placeholder with the product name."""
+        if not self.sink.enabled:
+            return self.sink.store(None, product_name)
+        return self.sink.store(
+            render_placeholder_jpeg(product_name), product_name
+        )
+
+    def submit_product_images(self, products: List[tuple]) -> List[Future]:
+        """Render and store a placeholder for each product."""
+        return [
+            self.sink.submit(self.generate_product_image, name, description)
+            for name, description in products
+        ]
+
+
+class StubImageGenerator(BaseImageGenerator):
+    """Image generator that returns fixed-size synthetic images.
+
+    Every image is the same noise texture XORed with a colour derived
+    from the prompt, so output is deterministic and JPEG encoding costs
+    about as much as for a detailed photo. No model or network is used.
+    """
+
+    def __init__(self, size: int = 512, **kwargs):
+        kwargs.setdefault("use_cache", False)
+        super().__init__(**kwargs)
+        self.size = size
+        rng = np.random.RandomState(0)
+        self._texture = rng.randint(0, 256, (size, size, 3), dtype=np.uint8)
+
+    def generation_params(self) -> dict:
+        """Return the settings that determine the rendered image."""
+        return {"backend": type(self).__name__, "size": self.size}
+
+    def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
+        """Return the synthetic image for ``prompt``."""
+        color = hashlib.blake2b(prompt.encode(), digest_size=3).digest()
+        return Image.fromarray(
+            self._texture ^ np.frombuffer(color, dtype=np.uint8)
+        )
+
+
+class NullImageGenerator(BaseImageGenerator):
+    """Image generator that produces no images at all."""
+
+    def __init__(self, **kwargs):
+        kwargs["use_cache"] = False
+        kwargs["sink"] = ImageSink("none")
+        super().__init__(**kwargs)
+
+    def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
+        """Always fail; this backend never renders images."""
+        raise RuntimeError("Image generation is disabled")
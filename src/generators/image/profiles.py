@@ -0,0 +1,251 @@
+"""Named CPU performance profiles for the diffusion backends.
+
+A profile trades image fidelity for throughput. It selects the scheduler,
+step count, resolution, weight dtype, torch thread count, memory format
+and whether the denoiser is compiled. Choose one per run with the
+``IMAGE_PROFILE`` environment variable or the backends' ``profile``
+argument:
+
+- ``draft``: fast multistep solver, few steps, half resolution, bf16.
+- ``standard``: multistep solver, moderate steps, 3/4 resolution, bf16.
+- ``hero``: the backend's own scheduler, steps and resolution in fp32.
+
+The scheduler setting only applies to noise-prediction pipelines such as
+Stable Diffusion 1.5. Flow-matching pipelines such as SD3 (the default
+``huggingface`` backend) keep their flow-match Euler scheduler, which is
+already a fast first-order solver; there the step count and resolution
+of ``draft`` and ``standard`` provide the speed-up.
+
+``torch`` is only imported by the functions that need it, so importing
+this module stays cheap.
+"""
+
+import contextlib
+import logging
+import os
+from typing import List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PERFORMANCE_PROFILES = {
+    "draft": {
+        # Ignored by flow-matching pipelines (SD3), which keep their own
+        "scheduler": "dpm_multistep",
+        "num_inference_steps": 12,
+        "resolution_scale": 0.5,
+        "dtype": "bfloat16",
+        "num_threads": None,  # torch default, usually the physical cores
+        "channels_last": True,
+        "compile": False,
+    },
+    "standard": {
+        "scheduler": "dpm_multistep",  # As above
+        "num_inference_steps": 20,
+        "resolution_scale": 0.75,
+        "dtype": "bfloat16",
+        "num_threads": None,
+        "channels_last": True,
+        "compile": False,
+    },
+    "hero": {
+        "scheduler": None,  # Keep the pipeline's own scheduler
+        "num_inference_steps": None,  # Backend default
+        "resolution_scale": 1.0,
+        "dtype": "float32",
+        "num_threads": None,
+        "channels_last": False,
+        "compile": False,
+    },
+}
+
+DEFAULT_PROFILE = "hero"
+
+# Scheduler names accepted in a profile, mapped to diffusers classes
+SCHEDULERS = {
+    "dpm_multistep": "DPMSolverMultistepScheduler",
+    "unipc": "UniPCMultistepScheduler",
+    "euler": "EulerDiscreteScheduler",
+}
+
+# Settings that change the rendered pixels and so belong in cache keys
+_OUTPUT_SETTINGS = ("scheduler", "dtype")
+
+
+def resolve_profile(profile: Union[str, dict, None] = None) -> dict:
+    """Return the settings of a profile.
+
+    Args:
+        profile: Profile name, a dict of settings overriding ``hero``, or
+            None for ``IMAGE_PROFILE`` (default ``hero``). The
+            ``IMAGE_TORCH_THREADS`` and ``IMAGE_TORCH_COMPILE``
+            environment variables override the thread count and compile
+            flag of any profile.
+
+    Returns:
+        dict: Complete profile settings including its ``name``.
+
+    Raises:
+        ValueError: If the profile name is unknown.
+    """
+    if profile is None:
+        profile = os.getenv("IMAGE_PROFILE", DEFAULT_PROFILE)
+    if isinstance(profile, str):
+        if profile not in PERFORMANCE_PROFILES:
+            raise ValueError(
+                f"Unknown image profile {profile!r}, choose from "
+                + ", ".join(PERFORMANCE_PROFILES)
+            )
+        settings = dict(PERFORMANCE_PROFILES[profile], name=profile)
+    else:
+        settings = dict(PERFORMANCE_PROFILES[DEFAULT_PROFILE], name="custom")
+        settings.update(profile)
+
+    if os.getenv("IMAGE_TORCH_THREADS"):
+        settings["num_threads"] = int(os.environ["IMAGE_TORCH_THREADS"])
+    if os.getenv("IMAGE_TORCH_COMPILE"):
+        settings["compile"] = os.environ["IMAGE_TORCH_COMPILE"] == "1"
+    return settings
+
+
+def scaled_resolution(
+    native: Optional[int], profile: dict
+) -> Optional[int]:
+    """Scale a native resolution by the profile, rounded to 64 pixels.
+
+    Returns None when the backend should use its pipeline default.
+    """
+    scale = profile["resolution_scale"]
+    if native is None or scale == 1.0:
+        return native
+    return max(64, int(native * scale) // 64 * 64)
+
+
+def output_params(profile: dict) -> dict:
+    """Return the profile settings that affect the rendered image."""
+    return {key: profile[key] for key in _OUTPUT_SETTINGS}
+
+
+def bf16_supported() -> bool:
+    """Return True if this CPU has native bf16 matrix instructions."""
+    import torch
+
+    check = getattr(torch.ops.mkldnn, "_is_mkldnn_bf16_supported", None)
+    try:
+        return bool(check and check())
+    except RuntimeError:
+        return False
+
+
+def torch_dtype(profile: dict, device: str):
+    """Return the weight dtype for ``device`` under ``profile``."""
+    import torch
+
+    if device == "cuda":
+        return torch.float16
+    if profile["dtype"] == "bfloat16":
+        if bf16_supported():
+            return torch.bfloat16
+        logger.warning("CPU lacks native bf16 support, using float32")
+    return torch.float32
+
+
+def configure_threads(profile: dict) -> None:
+    """Apply the profile's torch intra-op thread count."""
+    if profile["num_threads"]:
+        import torch
+
+        torch.set_num_threads(profile["num_threads"])
+
+
+def _denoiser(pipeline):
+    """Return the UNet or transformer that dominates inference time."""
+    return getattr(pipeline, "unet", None) or getattr(
+        pipeline, "transformer", None
+    )
+
+
+def apply_profile(pipeline, profile: dict):
+    """Configure a loaded pipeline according to ``profile``.
+
+    Swaps in the profile's scheduler when the pipeline supports it (not
+    for flow-matching pipelines, see the module docstring), converts the
+    denoiser and VAE to channels_last and compiles the denoiser if
+    requested.
+
+    Returns:
+        The configured pipeline.
+    """
+    import diffusers
+    import torch
+
+    name = profile["scheduler"]
+    if name:
+        scheduler_cls = getattr(diffusers, SCHEDULERS[name])
+        compatible = getattr(pipeline.scheduler, "compatibles", [])
+        current = type(pipeline.scheduler).__name__
+        if current.startswith("FlowMatch"):
+            logger.info(
+                f"{type(pipeline).__name__} keeps its {current}; the "
+                f"{name} scheduler does not apply to flow matching"
+            )
+        elif scheduler_cls in compatible:
+            pipeline.scheduler = scheduler_cls.from_config(
+                pipeline.scheduler.config
+            )
+        else:
+            logger.warning(
+                f"{type(pipeline).__name__} does not support {name} "
+                "scheduler, keeping its default"
+            )
+
+    denoiser = _denoiser(pipeline)
+    if profile["channels_last"]:
+        for module in (denoiser, getattr(pipeline, "vae", None)):
+            if module is not None:
+                module.to(memory_format=torch.channels_last)
+
+    if profile["compile"] and denoiser is not None:
+        # The default mode: "reduce-overhead" relies on CUDA graphs and
+        # gains nothing on CPU
+        compiled = torch.compile(denoiser)
+        if getattr(pipeline, "unet", None) is not None:
+            pipeline.unet = compiled
+        else:
+            pipeline.transformer = compiled
+
+    return pipeline
+
+
+def inference_context(device: str):
+    """Return the context manager to run pipeline calls in.
+
+    CUDA keeps mixed-precision autocast. On CPU the weights already have
+    the profile's dtype, and autocast would silently downcast fp32
+    profiles to bf16, so no autocast is used.
+    """
+    if device == "cuda":
+        import torch
+
+        return torch.autocast(device)
+    return contextlib.nullcontext()
+
+
+def latent_generators(device: str, seeds: List[Optional[int]]):
+    """Return one ``torch.Generator`` per image, or None if none is seeded.
+
+    Images without a seed get a generator seeded at random, so they still
+    differ from each other.
+    """
+    if all(seed is None for seed in seeds):
+        return None
+    import torch
+
+    generators = []
+    for seed in seeds:
+        generator = torch.Generator(device)
+        if seed is None:
+            generator.seed()
+        else:
+            generator.manual_seed(seed)
+        generators.append(generator)
+    return generators
@@ -0,0 +1,119 @@
+"""LRU cache of text-encoder outputs for diffusion prompts.
+
+Every product prompt ends in the same style boilerplate and every image
+uses the same negative prompt, yet diffusers pipelines run their text
+encoders (for SD3 two CLIP models and T5) on the full text for every
+image. The backends encode each distinct text once through this cache
+and pass ``prompt_embeds``/``negative_prompt_embeds`` to the pipeline
+instead. The negative prompt is therefore encoded once per process, and
+prompts that repeat, e.g. with a text pool, are not encoded again.
+
+Embeddings are large (an SD3 prompt is several MB in fp32), so the cache
+is bounded in bytes and evicts the least recently used texts first.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence
+from utils import metrics
+from .config import IMAGE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def _tensor_bytes(tensors: tuple) -> int:
+    return sum(t.element_size() * t.nelement() for t in tensors)
+
+
+class PromptEmbeddingCache:
+    """Size-bounded LRU cache of per-text embedding tensors."""
+
+    def __init__(self, encode: Callable[[str], tuple], max_bytes: int):
+        """Initialize the cache.
+
+        Args:
+            encode: Returns the embedding tensors of a single text, each
+                with a batch dimension of 1.
+            max_bytes: Maximum total size of cached tensors in bytes.
+        """
+        self.encode = encode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, text: str) -> tuple:
+        """Return the embeddings of ``text``, encoding it on a miss."""
+        with self._lock:
+            entry = self._entries.get(text)
+            if entry is not None:
+                self._entries.move_to_end(text)
+                self.hits += 1
+        if entry is not None:
+            metrics.count("image.embedding_cache_hits")
+            return entry[0]
+
+        metrics.count("image.embedding_cache_misses")
+        start = time.perf_counter()
+        with metrics.timer("image.text_encode"):
+            tensors = tuple(self.encode(text))
+        nbytes = _tensor_bytes(tensors)
+
+        with self._lock:
+            self.misses += 1
+            self.encode_seconds += time.perf_counter() - start
+            if text not in self._entries and nbytes <= self.max_bytes:
+                self._entries[text] = (tensors, nbytes)
+                self._size += nbytes
+                while self._size > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._size -= evicted
+        return tensors
+
+    def embed_batch(self, texts: Sequence[str]) -> List:
+        """Return the embeddings of ``texts`` stacked along the batch axis.
+
+        Returns:
+            list: One tensor per embedding output of ``encode``.
+        """
+        import torch
+
+        entries = [self.get(text) for text in texts]
+        return [torch.cat(parts) for parts in zip(*entries)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Return hit, miss and size statistics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "encode_seconds": self.encode_seconds,
+            }
+
+
+def create_embedding_cache(
+    encode: Callable[[str], tuple],
+) -> Optional[PromptEmbeddingCache]:
+    """Create the embedding cache configured in ``IMAGE_CONFIG``.
+
+    Returns:
+        PromptEmbeddingCache: The cache, or None when disabled.
+    """
+    if IMAGE_CONFIG["embedding_cache_max_bytes"] <= 0:
+        return None
+    return PromptEmbeddingCache(
+        encode, IMAGE_CONFIG["embedding_cache_max_bytes"]
+    )
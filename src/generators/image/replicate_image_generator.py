@@ -5,6 +5,7 @@ from PIL import Image
 from io import BytesIO
 import requests
 import replicate
+from utils import metrics
 from .base_image_generator import BaseImageGenerator
 from .config import IMAGE_CONFIG
 
@@ -18,6 +19,20 @@ class ReplicateImageGenerator(BaseImageGenerator):
     service for Stable Diffusion.
     """
 
+    NUM_INFERENCE_STEPS = 25
+    GUIDANCE_SCALE = 7.0
+
+    def generation_params(self) -> dict:
+        """Return the settings that determine the rendered image."""
+        return {
+            "model_id": IMAGE_CONFIG["replicate_model"],
+            "num_inference_steps": self.NUM_INFERENCE_STEPS,
+            "guidance_scale": self.GUIDANCE_SCALE,
+            "height": None,  # Model default resolution
+            "width": None,
+            "seed": self.seed,
+        }
+
     def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
         """Generate image using Replicate API.
 
@@ -32,19 +47,24 @@ class ReplicateImageGenerator(BaseImageGenerator):
             Exception: If image generation fails.
         """
         try:
-            output = replicate.run(
-                IMAGE_CONFIG["replicate_model"],
-                input={
-                    "prompt": prompt,
-                    "negative_prompt": negative_prompt,
-                    "num_inference_steps": 25,
-                    "guidance_scale": 7.0,
-                },
-            )
+            model_input = {
+                "prompt": prompt,
+                "negative_prompt": negative_prompt,
+                "num_inference_steps": self.NUM_INFERENCE_STEPS,
+                "guidance_scale": self.GUIDANCE_SCALE,
+            }
+            if self.seed is not None:
+                model_input["seed"] = self.seed
+
+            with metrics.timer("image.remote_predict"):
+                output = replicate.run(
+                    IMAGE_CONFIG["replicate_model"], input=model_input
+                )
 
             # Download the generated image
-            response = requests.get(output[0])
-            response.raise_for_status()
+            with metrics.timer("image.download"):
+                response = requests.get(output[0])
+                response.raise_for_status()
             return Image.open(BytesIO(response.content))
 
         except Exception as e:
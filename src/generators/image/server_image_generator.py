@@ -0,0 +1,168 @@
+"""Module for generating images through a running model server.
+
+The model server (see ``model_server``) keeps a diffusion pipeline loaded
+between runs. This thin client submits prompts to it, so a catalog job
+starts producing images immediately instead of loading weights first.
+"""
+
+import logging
+import socket
+import threading
+from typing import List, Optional, Union
+from PIL import Image
+from .base_image_generator import BaseImageGenerator
+from .config import IMAGE_CONFIG
+from .model_server import parse_address, recv_message, send_message
+
+logger = logging.getLogger(__name__)
+
+
+class ServerImageGenerator(BaseImageGenerator):
+    """Image generator that delegates rendering to the model server."""
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        timeout: float = 3600.0,
+        **kwargs,
+    ):
+        """Initialize the client.
+
+        Args:
+            address: Unix socket path or ``host:port`` of the server.
+                Defaults to ``IMAGE_CONFIG["server_address"]``.
+            timeout: Socket timeout in seconds for a single request.
+            **kwargs: Passed to ``BaseImageGenerator``.
+        """
+        super().__init__(**kwargs)
+        self.address = address or IMAGE_CONFIG["server_address"]
+        self.timeout = timeout
+        self._sock = None
+        self._info = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            address = parse_address(self.address)
+            if isinstance(address, tuple):
+                sock = socket.create_connection(address, self.timeout)
+            else:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(address)
+            sock.settimeout(self.timeout)
+            self._sock = sock
+        return self._sock
+
+    def _call(self, header: dict) -> tuple:
+        """Send one request and wait for its reply.
+
+        The socket is dropped after any failure, so a late reply to a
+        timed-out request is never read as the answer to the next one. A
+        connection the server has closed is retried once.
+
+        Raises:
+            OSError: If the server is unreachable or does not reply in
+                time.
+            RuntimeError: If the server reports an error.
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    sock = self._connect()
+                    send_message(sock, header)
+                    reply, payload = recv_message(sock)
+                    break
+                except ConnectionError:
+                    self.close()
+                    if attempt:
+                        raise
+                except BaseException:
+                    self.close()
+                    raise
+
+        if not reply.get("ok"):
+            raise RuntimeError(f"Model server error: {reply.get('error')}")
+        return reply, payload
+
+    def close(self) -> None:
+        """Close the connection to the server."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def generation_params(self) -> dict:
+        """Return the settings of the model the server is running.
+
+        The server is asked once; a failed request is retried on the next
+        call.
+        """
+        if self._info is None:
+            self._info, _ = self._call({"op": "info"})
+        # Images are seeded with this client's seed, not the server's
+        return dict(
+            self._info["generation_params"], seed=self.seed, server=True
+        )
+
+    def generate_image(self, prompt: str, negative_prompt: str) -> Image.Image:
+        """Generate image on the model server.
+
+        Args:
+            prompt: The text prompt describing the desired image.
+            negative_prompt: Text describing what to avoid in the image.
+
+        Returns:
+            PIL.Image: The generated image.
+
+        Raises:
+            Exception: If image generation fails.
+        """
+        result = self.generate_images([prompt], [negative_prompt])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompts: List[str],
+        seeds: Optional[List[Optional[int]]] = None,
+    ) -> List[Union[Image.Image, Exception]]:
+        """Submit prompts to the server and return images in order.
+
+        Every prompt is sent with its latent seed, so an image only
+        depends on this client's seed and the prompt, not on the server's
+        settings or the batch the server renders it in.
+
+        Args:
+            prompts: Text prompts describing the desired images.
+            negative_prompts: Negative prompts, one per prompt.
+            seeds: Latent seed per prompt. Defaults to ``prompt_seed``.
+
+        Returns:
+            list: Images, or exceptions for prompts that failed.
+        """
+        reply, payload = self._call(
+            {
+                "op": "generate",
+                "prompts": list(prompts),
+                "negative_prompts": list(negative_prompts),
+                "seeds": self._latent_seeds(
+                    prompts, negative_prompts, seeds
+                ),
+            }
+        )
+
+        images = []
+        offset = 0
+        for entry in reply["images"]:
+            if "error" in entry:
+                images.append(RuntimeError(entry["error"]))
+                continue
+            end = offset + entry["length"]
+            images.append(
+                Image.frombytes(
+                    entry["mode"], tuple(entry["size"]), payload[offset:end]
+                )
+            )
+            offset = end
+        return images
@@ -0,0 +1,202 @@
+"""Output sinks for generated product images.
+
+A sink encodes an image to JPEG exactly once and reuses those bytes for
+every configured output, so writing a file and embedding a base64 data
+URI no longer costs two encodes. Supported modes:
+
+- ``file``: write the JPEG to disk and reference its path in the record.
+- ``inline``: embed the JPEG as a base64 data URI, write no file.
+- ``both``: do both from the same bytes.
+- ``none``: skip images entirely.
+
+Files are laid out by one of the image stores in ``storage``.
+
+Encoding, writing and base64 can run on a small thread pool through
+``submit``, so the next inference call starts while the previous images
+are still being post-processed. Pillow's JPEG encoder and file writes
+release the GIL, so this overlaps well with diffusion.
+"""
+
+import base64
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional
+from PIL import Image
+from utils import metrics
+from .config import IMAGE_CONFIG
+from .storage import create_image_store
+
+logger = logging.getLogger(__name__)
+
+IMAGE_OUTPUT_MODES = ("file", "inline", "both", "none")
+
+
+class ImageSink:
+    """Encode product images once and deliver them to configured outputs."""
+
+    def __init__(
+        self,
+        mode: str = "both",
+        quality: int = 95,
+        output_dir: str = "products",
+        layout: str = "directory",
+        shard_max_bytes: Optional[int] = None,
+        workers: int = 0,
+        max_pending: Optional[int] = None,
+    ):
+        """Initialize the sink.
+
+        Args:
+            mode: One of ``IMAGE_OUTPUT_MODES``.
+            quality: JPEG quality used for the single encode.
+            output_dir: Root directory for image files.
+            layout: File layout, one of ``storage.STORAGE_LAYOUTS``.
+            shard_max_bytes: Size at which the ``packed`` layout starts a
+                new tar shard.
+            workers: Threads that run work passed to ``submit``. With 0
+                submitted work runs on the calling thread.
+            max_pending: Maximum submitted tasks not yet finished;
+                ``submit`` blocks beyond it. Defaults to four per worker.
+
+        Raises:
+            ValueError: If the mode or layout is not supported.
+        """
+        if mode not in IMAGE_OUTPUT_MODES:
+            raise ValueError(
+                f"Unsupported image output mode: {mode}. "
+                f"Expected one of {', '.join(IMAGE_OUTPUT_MODES)}"
+            )
+        self.mode = mode
+        self.quality = quality
+        self.output_dir = output_dir
+        self.storage = create_image_store(layout, output_dir, shard_max_bytes)
+        self.workers = max(0, workers)
+        self._executor = None
+        self._pending = None
+        if self.workers:
+            self._executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="image-sink"
+            )
+            self._pending = threading.BoundedSemaphore(
+                max(1, max_pending or 4 * self.workers)
+            )
+
+    @classmethod
+    def from_config(cls) -> "ImageSink":
+        """Create a sink from ``IMAGE_CONFIG``."""
+        return cls(
+            mode=IMAGE_CONFIG["output_mode"],
+            quality=IMAGE_CONFIG["jpeg_quality"],
+            layout=IMAGE_CONFIG["storage_layout"],
+            shard_max_bytes=IMAGE_CONFIG["shard_max_bytes"],
+            workers=IMAGE_CONFIG["sink_workers"],
+            max_pending=IMAGE_CONFIG["sink_max_pending"],
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether images should be generated at all."""
+        return self.mode != "none"
+
+    @property
+    def writes_files(self) -> bool:
+        return self.mode in ("file", "both")
+
+    @property
+    def writes_inline(self) -> bool:
+        return self.mode in ("inline", "both")
+
+    def encode(self, image: Image.Image) -> bytes:
+        """Encode an image to JPEG bytes.
+
+        Args:
+            image: The image to encode.
+
+        Returns:
+            bytes: JPEG encoded image.
+        """
+        with metrics.timer("image.encode"):
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            buffered = BytesIO()
+            image.save(buffered, "JPEG", quality=self.quality)
+            return buffered.getvalue()
+
+    def store(
+        self, data: Optional[bytes], product_name: str, inline: bool = True
+    ) -> dict:
+        """Deliver encoded image bytes to the configured outputs.
+
+        Args:
+            data: JPEG bytes, or None when images are disabled.
+            product_name: Name of the product.
+            inline: Set to False to never embed these bytes as base64
+                when a file is also written (used for placeholders).
+
+        Returns:
+            dict: Contains base64 encoded image and file path.
+                Keys:
+                - base64: Data URI, or None if not inlined
+                - file_path: Path of the written file, ``<shard>#<member>``
+                  for packed shards, or None
+                - location: The store's location of the written file,
+                  with its SHA-256 digest, or None
+        """
+        result = {"base64": None, "file_path": None, "location": None}
+        if data is None or not self.enabled:
+            return result
+
+        if self.writes_files:
+            with metrics.timer("image.write"):
+                location = self.storage.put(product_name, data)
+            metrics.count("image.bytes_written", len(data))
+            result["file_path"] = location["file_path"]
+            result["location"] = location
+            logger.info(f"Image saved to {location['file_path']}")
+
+        if self.writes_inline and (inline or not self.writes_files):
+            with metrics.timer("image.base64"):
+                img_str = base64.b64encode(data).decode()
+                result["base64"] = f"data:image/jpeg;base64,{img_str}"
+
+        return result
+
+    def submit(self, fn, *args) -> Future:
+        """Run post-processing work on the sink's thread pool.
+
+        Blocks while ``max_pending`` tasks are unfinished, which bounds
+        the images held in memory when inference outpaces encoding.
+
+        Args:
+            fn: Callable doing the work, e.g. encode and ``store``.
+            *args: Arguments for ``fn``.
+
+        Returns:
+            Future: Resolves to the return value of ``fn``. Without
+                workers the future is already resolved.
+        """
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._pending.acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def close(self) -> None:
+        """Wait for submitted work and finish any open image shard."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.storage.close()
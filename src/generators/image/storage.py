@@ -0,0 +1,326 @@
+"""Storage layouts for generated image files.
+
+One directory per product does not scale: millions of directories and
+small files overwhelm filesystem metadata, ``rsync`` and container layer
+builds. Supported layouts:
+
+- ``directory``: ``<root>/<slug>/<slug>_main.jpg``, the original layout.
+  Products with the same name overwrite each other's image.
+- ``sharded``: ``<root>/ab/cd/<slug>-<digest>.jpg``. The two directory
+  levels and the file name come from the SHA-256 of the image bytes, so
+  directories stay small and products with the same name but different
+  images no longer collide.
+- ``packed``: WebDataset-style tar shards ``<root>/images-<run>-NNNNNN.tar``
+  with members ``<slug>-<digest>.jpg``. A sidecar ``.idx`` file
+  (one JSON object per line) records each member's data offset and size.
+  ``PackedShardReader`` uses those indexes to read single images by SKU
+  through memory maps without scanning the archives.
+
+Records reference packed images as ``<shard path>#<member name>``.
+
+``put`` returns the stored image's location: its ``file_path`` (or packed
+reference) and SHA-256 ``digest``, plus ``shard``, ``offset`` and ``size``
+for packed images. Checkpoint journals record it so a resumed run can
+verify images without the writer hashing them again.
+"""
+
+import glob
+import hashlib
+import io
+import json
+import mmap
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+STORAGE_LAYOUTS = ("directory", "sharded", "packed")
+
+DEFAULT_SHARD_MAX_BYTES = 1 << 30
+
+
+def product_slug(product_name: str) -> str:
+    """Return the SKU-style slug used in image file names."""
+    return product_name.replace(" ", "_").lower()
+
+
+def content_digest(data: bytes) -> str:
+    """Return the hex SHA-256 digest that names and verifies an image."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _member_name(product_name: str, digest: str) -> str:
+    return f"{product_slug(product_name)}-{digest[:12]}.jpg"
+
+
+class DirectoryStore:
+    """One directory per product: ``<root>/<slug>/<slug>_main.jpg``."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, product_name: str) -> str:
+        slug = product_slug(product_name)
+        return os.path.join(self.root, slug, f"{slug}_main.jpg")
+
+    def put(
+        self, product_name: str, data: bytes, digest: Optional[str] = None
+    ) -> dict:
+        """Write an image and return its location.
+
+        Args:
+            product_name: Name of the product.
+            data: JPEG bytes.
+            digest: ``content_digest`` of ``data`` if already known.
+        """
+        path = self.path_for(product_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return {"file_path": path, "sha256": digest or content_digest(data)}
+
+    def close(self) -> None:
+        pass
+
+
+class ShardedDirectoryStore(DirectoryStore):
+    """Two levels of hash directories: ``<root>/ab/cd/<slug>-<d>.jpg``."""
+
+    def put(
+        self, product_name: str, data: bytes, digest: Optional[str] = None
+    ) -> dict:
+        digest = digest or content_digest(data)
+        directory = os.path.join(self.root, digest[:2], digest[2:4])
+        path = os.path.join(directory, _member_name(product_name, digest))
+        location = {"file_path": path, "sha256": digest}
+        if os.path.exists(path):
+            # Same name and same bytes, nothing to do
+            return location
+        os.makedirs(directory, exist_ok=True)
+        # A temp file of its own per writer; sink threads may store the
+        # same image at the same time
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            if not os.path.exists(path):
+                raise
+            # Another writer stored the same bytes first
+        return location
+
+
+class PackedShardStore:
+    """Append images to tar shards with a sidecar offset index.
+
+    Every store instance writes its own shards, named after a random run
+    token, so several processes can pack into the same directory. A new
+    shard is started once the current one reaches ``shard_max_bytes``.
+
+    Each member is followed by a tar end-of-archive marker that the next
+    member overwrites, and is flushed together with its index line. A
+    shard is therefore a complete archive after every image, even when a
+    worker process exits without closing the store.
+    """
+
+    def __init__(
+        self, root: str, shard_max_bytes: int = DEFAULT_SHARD_MAX_BYTES
+    ):
+        self.root = root
+        self.shard_max_bytes = shard_max_bytes
+        self.token = uuid.uuid4().hex[:8]
+        self._shard_number = 0
+        self._tar = None
+        self._index = None
+        self._shard_path = None
+        # Member name -> data offset in the current shard
+        self._written = {}
+        self._lock = threading.Lock()
+
+    def _open_shard(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._shard_path = os.path.join(
+            self.root, f"images-{self.token}-{self._shard_number:06d}.tar"
+        )
+        self._shard_number += 1
+        self._tar = tarfile.open(
+            self._shard_path, "w", format=tarfile.GNU_FORMAT
+        )
+        self._index = open(f"{self._shard_path}.idx", "w", encoding="utf-8")
+        self._written = {}
+
+    def _close_shard(self) -> None:
+        if self._tar is None:
+            return
+        self._tar.close()
+        self._index.close()
+        self._tar = self._index = None
+
+    def put(
+        self, product_name: str, data: bytes, digest: Optional[str] = None
+    ) -> dict:
+        """Append an image to the current shard and return its location."""
+        digest = digest or content_digest(data)
+        name = _member_name(product_name, digest)
+        with self._lock:
+            if self._tar is None:
+                self._open_shard()
+            if name not in self._written:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                self._tar.addfile(info, io.BytesIO(data))
+                # addfile works on a copy of info; the data is the last
+                # block-padded run before the new archive offset
+                blocks, remainder = divmod(len(data), tarfile.BLOCKSIZE)
+                padded = (blocks + bool(remainder)) * tarfile.BLOCKSIZE
+                offset = self._tar.offset - padded
+                fileobj = self._tar.fileobj
+                fileobj.write(tarfile.NUL * (2 * tarfile.BLOCKSIZE))
+                fileobj.flush()
+                fileobj.seek(self._tar.offset)
+                self._index.write(
+                    json.dumps(
+                        {
+                            "key": name,
+                            "sku": product_slug(product_name),
+                            "offset": offset,
+                            "size": len(data),
+                        }
+                    )
+                    + "\n"
+                )
+                self._index.flush()
+                self._written[name] = offset
+            location = {
+                "file_path": f"{self._shard_path}#{name}",
+                "sha256": digest,
+                "shard": self._shard_path,
+                "offset": self._written[name],
+                "size": len(data),
+            }
+            if self._tar.offset >= self.shard_max_bytes:
+                self._close_shard()
+        return location
+
+    def close(self) -> None:
+        """Finish the current shard."""
+        with self._lock:
+            self._close_shard()
+
+
+class PackedShardReader:
+    """Random access to packed images by SKU or member name.
+
+    Loads the ``.idx`` sidecars of all shards in a directory and reads
+    image bytes straight from memory-mapped shard files.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._entries: Dict[str, tuple] = {}
+        self._by_sku: Dict[str, List[str]] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._files = {}
+        for index_path in sorted(glob.glob(os.path.join(root, "*.tar.idx"))):
+            shard_path = index_path[: -len(".idx")]
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Partially written last line
+                    self._entries[entry["key"]] = (
+                        shard_path,
+                        entry["offset"],
+                        entry["size"],
+                    )
+                    self._by_sku.setdefault(entry["sku"], []).append(
+                        entry["key"]
+                    )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._by_sku or sku in self._entries
+
+    def keys(self, sku: str) -> List[str]:
+        """Return the member names stored for a SKU."""
+        return list(self._by_sku.get(sku, ()))
+
+    def _map(self, shard_path: str, end: int) -> mmap.mmap:
+        mapped = self._maps.get(shard_path)
+        if mapped is None or len(mapped) < end:
+            # Map again when the shard has grown since it was mapped
+            if mapped is not None:
+                mapped.close()
+            f = self._files.get(shard_path)
+            if f is None:
+                f = self._files[shard_path] = open(shard_path, "rb")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[shard_path] = mapped
+        return mapped
+
+    def read(self, key: str) -> bytes:
+        """Return the image bytes for a SKU, member name or reference.
+
+        Args:
+            key: A SKU (the first image stored for it is returned), a
+                member name, or a ``<shard>#<member>`` reference.
+
+        Raises:
+            KeyError: If no image is stored under ``key``.
+        """
+        key = key.rpartition("#")[2]
+        if key not in self._entries:
+            keys = self._by_sku.get(product_slug(key))
+            if not keys:
+                raise KeyError(key)
+            key = keys[0]
+        shard_path, offset, size = self._entries[key]
+        return self._map(shard_path, offset + size)[offset : offset + size]
+
+    def close(self) -> None:
+        for mapped in self._maps.values():
+            mapped.close()
+        for f in self._files.values():
+            f.close()
+        self._maps.clear()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def create_image_store(
+    layout: str = "directory",
+    root: str = "products",
+    shard_max_bytes: Optional[int] = None,
+):
+    """Create an image store for one of ``STORAGE_LAYOUTS``.
+
+    Raises:
+        ValueError: If the layout is not supported.
+    """
+    if layout == "directory":
+        return DirectoryStore(root)
+    if layout == "sharded":
+        return ShardedDirectoryStore(root)
+    if layout == "packed":
+        return PackedShardStore(
+            root, shard_max_bytes or DEFAULT_SHARD_MAX_BYTES
+        )
+    raise ValueError(
+        f"Unsupported storage layout: {layout}. "
+        f"Expected one of {', '.join(STORAGE_LAYOUTS)}"
+    )
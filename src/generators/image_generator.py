@@ -8,6 +8,7 @@ import torch
 from diffusers import DiffusionPipeline
 import replicate
 from ..config.image_config import IMAGE_CONFIG
+from .image.placeholder import render_placeholder_jpeg
 
 logger = logging.getLogger(__name__)
 
@@ -124,22 +125,14 @@ class ImageGenerator:
 
         except Exception as e:
             logger.warning(f"Using placeholder due to error: {str(e)}")
-            # Create placeholder
-            name = product_name.replace(" ", "+")
-            placeholder_url = (
-                f"https://placehold.co/1024x1024/FFFFFF/333333/png?" f"text={name}"
-            )
 
             try:
-                # Download placeholder
-                response = requests.get(placeholder_url)
-                response.raise_for_status()
-
+                # Render placeholder locally instead of downloading it
                 filename = f"{product_name.replace(' ', '_').lower()}_main.jpg"
                 image_path = os.path.join(product_dir, filename)
 
-                img = Image.open(BytesIO(response.content))
-                img.save(image_path, "JPEG", quality=95)
+                with open(image_path, "wb") as f:
+                    f.write(render_placeholder_jpeg(product_name))
 
                 logger.info(f"Saved placeholder to {image_path}")
 
@@ -147,4 +140,4 @@ class ImageGenerator:
 
             except Exception as placeholder_error:
                 logger.error(f"Placeholder error: {placeholder_error}")
-                return {"base64": None, "file_path": placeholder_url}
+                return {"base64": None, "file_path": None}
@@ -0,0 +1,198 @@
+"""Sharded, multi-process product generation.
+
+The product id range is split into fixed-size shards. Every shard reseeds
+the generator from ``(seed, shard_index)`` before producing its products,
+so a shard's output only depends on the global seed and its position in
+the id range - never on which process ran it or how many workers there
+were. Results are merged back in id order, which makes an N-worker run
+byte-identical to a single-worker run with the same seed.
+"""
+
+import hashlib
+import itertools
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+from utils import metrics
+from .product_generator import ProductGenerator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_SIZE = 1000
+
+# Per-process generator, created once by the pool initializer
+_worker_generator: Optional[ProductGenerator] = None
+
+
+def shard_ranges(
+    start: int, stop: int, shard_size: int = DEFAULT_SHARD_SIZE
+) -> List[Tuple[int, int, int]]:
+    """Split ``range(start, stop)`` into shards.
+
+    Shard boundaries are aligned to multiples of ``shard_size`` counted
+    from id 1, so the same product id always lands in the same shard.
+
+    Args:
+        start: First product id (inclusive).
+        stop: Last product id (exclusive).
+        shard_size: Number of products per shard.
+
+    Returns:
+        list: ``(shard_index, shard_start, shard_stop)`` tuples.
+    """
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+
+    shards = []
+    product_id = start
+    while product_id < stop:
+        shard_index = (product_id - 1) // shard_size
+        shard_stop = min(stop, (shard_index + 1) * shard_size + 1)
+        shards.append((shard_index, product_id, shard_stop))
+        product_id = shard_stop
+    return shards
+
+
+def shard_seed(seed: int, shard_index: int) -> int:
+    """Derive a stable 64-bit seed for a shard.
+
+    Args:
+        seed: Global run seed.
+        shard_index: Index of the shard within the id range.
+
+    Returns:
+        int: Seed for the shard's Faker and Random instances.
+    """
+    digest = hashlib.blake2b(
+        f"{seed}:{shard_index}".encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _generate_shard(
+    generator: ProductGenerator,
+    seed: int,
+    shard: Tuple[int, int, int],
+    shard_size: int,
+    with_images: bool = True,
+) -> Iterator[dict]:
+    """Generate all products of one shard with a freshly seeded stream.
+
+    Products are produced lazily; consume them before generating the next
+    shard with the same generator, since seeding resets its streams.
+
+    If the shard starts part-way through (e.g. when resuming), the records
+    before ``shard_start`` are generated and discarded to fast-forward the
+    random streams, so the output matches an uninterrupted run. Generators
+    in random-access mode seed each record from its id and skip this.
+    """
+    shard_index, shard_start, shard_stop = shard
+    if generator.random_access:
+        # Every record is seeded from its own id; nothing to replay
+        generator.seed(seed)
+        records = generator.iter_records(range(shard_start, shard_stop))
+    else:
+        generator.seed(shard_seed(seed, shard_index))
+        shard_first = shard_index * shard_size + 1
+        records = itertools.islice(
+            generator.iter_records(range(shard_first, shard_stop)),
+            shard_start - shard_first,
+            None,
+        )
+    if with_images:
+        return generator.render_images(records)
+    return records
+
+
+def _init_worker(generator_options: dict, metrics_options) -> None:
+    global _worker_generator
+    if metrics_options is not None:
+        metrics.enable(**metrics_options)
+    _worker_generator = ProductGenerator(**generator_options)
+
+
+def _run_shard(
+    seed: int, shard: Tuple[int, int, int], shard_size: int, with_images: bool
+) -> tuple:
+    # Results are pickled back to the parent, so materialize the shard
+    products = list(
+        _generate_shard(
+            _worker_generator, seed, shard, shard_size, with_images
+        )
+    )
+    # Metrics live in this worker process; ship them back with the shard
+    return products, metrics.snapshot()
+
+
+def generate_products(
+    start: int,
+    stop: int,
+    seed: int,
+    workers: int = 1,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    with_images: bool = True,
+    generator_options: Optional[dict] = None,
+) -> Iterator[dict]:
+    """Yield products for ``range(start, stop)`` in id order.
+
+    With ``workers > 1`` shards are generated in a process pool. At most
+    ``2 * workers`` shards are in flight at a time so memory stays bounded
+    when the consumer (e.g. a streaming writer) is slower than the pool.
+
+    Args:
+        start: First product id (inclusive).
+        stop: Last product id (exclusive).
+        seed: Global run seed.
+        workers: Number of worker processes.
+        shard_size: Number of products per shard.
+        with_images: Set to False to only generate text and pricing, e.g.
+            when images are rendered by the image pipeline.
+        generator_options: Keyword arguments for each ProductGenerator.
+
+    Yields:
+        dict: Product records in ascending id order.
+    """
+    shards = shard_ranges(start, stop, shard_size)
+    logger.info(
+        f"Generating {stop - start} products in {len(shards)} shards "
+        f"with {workers} worker(s), seed={seed}"
+    )
+
+    generator_options = generator_options or {}
+    if workers <= 1:
+        generator = ProductGenerator(**generator_options)
+        for shard in shards:
+            yield from _generate_shard(
+                generator, seed, shard, shard_size, with_images
+            )
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(generator_options, metrics.worker_options()),
+    ) as executor:
+        pending = deque()
+        shard_iter = iter(shards)
+
+        for shard in shard_iter:
+            pending.append(
+                executor.submit(
+                    _run_shard, seed, shard, shard_size, with_images
+                )
+            )
+            if len(pending) >= 2 * workers:
+                break
+
+        while pending:
+            products, shard_metrics = pending.popleft().result()
+            metrics.merge(shard_metrics)
+            next_shard = next(shard_iter, None)
+            if next_shard is not None:
+                pending.append(
+                    executor.submit(
+                        _run_shard, seed, next_shard, shard_size, with_images
+                    )
+                )
+            yield from products
@@ -0,0 +1,218 @@
+"""Pipelined product generation with overlapping text and images.
+
+Record generation (Faker text, pricing, variations) runs on a producer
+thread and feeds a bounded queue. Image worker threads consume from that
+queue in batches and render images while the producer keeps working, so
+cheap CPU work is no longer serialized behind slow diffusion or remote
+calls. A semaphore caps the number of records between production and
+emission, which bounds memory no matter how far the text side runs ahead.
+Encoding and writing the images is left to each generator's sink threads,
+so a worker moves on to its next batch as soon as inference returns.
+"""
+
+import functools
+import logging
+import queue
+import threading
+from typing import Iterable, Iterator, List
+from .image.base_image_generator import BaseImageGenerator
+from .product_generator import ProductGenerator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+_DONE = object()
+
+
+class _Failure:
+    """Wraps an exception raised on a pipeline thread."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def generate_products_pipelined(
+    records: Iterable[dict],
+    image_generators: List[BaseImageGenerator],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ordered: bool = True,
+) -> Iterator[dict]:
+    """Render images for ``records`` on worker threads as they arrive.
+
+    Each image worker owns one image generator. Diffusers pipelines are
+    not safe to call from several threads at once, so local diffusion
+    generators sharing a pipeline take turns through its inference lock
+    in ``pipeline_registry``. Pass several generators (e.g. several
+    remote clients) to render concurrently.
+
+    Args:
+        records: Product records without images, e.g. from
+            ``ProductGenerator.iter_records``.
+        image_generators: One image generator per worker thread.
+        max_in_flight: Maximum number of records between production and
+            emission.
+        ordered: Emit products in input order. When False they are
+            emitted as soon as their image completes.
+
+    Yields:
+        dict: Products with their image fields filled in.
+    """
+    if not image_generators:
+        raise ValueError("At least one image generator is required")
+
+    pipeline = _Pipeline(records, image_generators, max(1, max_in_flight))
+    pipeline.start()
+    try:
+        yield from pipeline.products(ordered)
+    finally:
+        pipeline.shutdown()
+
+
+class _Pipeline:
+    """Threads and queues of one ``generate_products_pipelined`` run."""
+
+    def __init__(
+        self,
+        records: Iterable[dict],
+        image_generators: List[BaseImageGenerator],
+        max_in_flight: int,
+    ):
+        self.records = records
+        self.image_generators = image_generators
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        # Unbounded on purpose: the slots semaphore already caps its size
+        self.work = queue.Queue()
+        self.results = queue.Queue()
+        self.stop = threading.Event()
+
+    def start(self) -> None:
+        threads = [threading.Thread(target=self._produce, daemon=True)]
+        threads.extend(
+            threading.Thread(
+                target=self._render, args=(image_generator,), daemon=True
+            )
+            for image_generator in self.image_generators
+        )
+        for thread in threads:
+            thread.start()
+
+    def shutdown(self) -> None:
+        self.stop.set()
+        # Unblock workers waiting on the queue so they can exit
+        for _ in self.image_generators:
+            self.work.put(_DONE)
+
+    def _acquire_slot(self) -> bool:
+        """Wait for a free slot; return False once the pipeline stops."""
+        # Block while max_in_flight records are waiting for output
+        while not self.slots.acquire(timeout=0.1):
+            if self.stop.is_set():
+                return False
+        return not self.stop.is_set()
+
+    def _produce(self) -> None:
+        try:
+            for seq, record in enumerate(self.records):
+                if not self._acquire_slot():
+                    return
+                self.work.put((seq, record))
+        except BaseException as e:
+            self.results.put(_Failure(e))
+        finally:
+            for _ in self.image_generators:
+                self.work.put(_DONE)
+
+    def _emit(self, seq: int, record: dict, future) -> None:
+        try:
+            ProductGenerator.attach_image(record, future.result())
+            self.results.put((seq, record))
+        except BaseException as e:
+            self.results.put(_Failure(e))
+
+    def _next_batch(self, batch_size: int) -> list:
+        """Take the next item and whatever is already queued after it.
+
+        Returns:
+            list: Up to ``batch_size`` ``(seq, record)`` items; empty once
+                the worker should stop.
+        """
+        item = self.work.get()
+        if item is _DONE:
+            return []
+        batch = [item]
+        while len(batch) < batch_size:
+            try:
+                item = self.work.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                self.work.put(_DONE)
+                break
+            batch.append(item)
+        return batch
+
+    def _render(self, image_generator: BaseImageGenerator) -> None:
+        # Results of this worker's records not yet on the results queue.
+        # Futures wake their waiters before running done callbacks, so
+        # waiting on the futures themselves is not enough.
+        outstanding = 0
+        emitted = threading.Condition()
+
+        def done(seq, record, future):
+            nonlocal outstanding
+            self._emit(seq, record, future)
+            with emitted:
+                outstanding -= 1
+                emitted.notify_all()
+
+        try:
+            while not self.stop.is_set():
+                batch = self._next_batch(image_generator.batch_size)
+                if not batch:
+                    break
+                futures = image_generator.submit_product_images(
+                    [
+                        (record["product_name"], record["description"])
+                        for _, record in batch
+                    ]
+                )
+                with emitted:
+                    outstanding += len(futures)
+                for (seq, record), future in zip(batch, futures):
+                    future.add_done_callback(
+                        functools.partial(done, seq, record)
+                    )
+        except BaseException as e:
+            self.results.put(_Failure(e))
+        finally:
+            # Every result must be queued before this worker reports done
+            with emitted:
+                emitted.wait_for(lambda: not outstanding)
+            self.results.put(_DONE)
+
+    def products(self, ordered: bool) -> Iterator[dict]:
+        """Yield finished products until every worker is done."""
+        pending = {}
+        next_seq = 0
+        running = len(self.image_generators)
+        while running:
+            item = self.results.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            if isinstance(item, _Failure):
+                raise item.error
+
+            seq, product = item
+            if not ordered:
+                self.slots.release()
+                yield product
+                continue
+
+            # Reorder buffer; bounded by max_in_flight through the slots
+            pending[seq] = product
+            while next_seq in pending:
+                self.slots.release()
+                yield pending.pop(next_seq)
+                next_seq += 1
@@ -4,57 +4,339 @@ This module provides functionality to generate realistic product data
 including names, descriptions, prices, and images.
 """
 
+import hashlib
+import itertools
 import random
+from typing import Iterable, Iterator, Optional, Sequence
+import numpy as np
 from faker import Faker
+from utils import metrics
 from .image.image_generator_factory import create_image_generator
+from .taxonomy import get_taxonomy
+from .text_pool import get_text_pool
+from .vectorized import (
+    DEFAULT_BLOCK_SIZE,
+    assemble_records,
+    generate_numeric_columns,
+)
 
-fake = Faker()
+# Record key holding the stored image's location for checkpoint journals.
+# It is not part of the catalog; pop it before writing a record.
+IMAGE_LOCATION_KEY = "_image_location"
+
+
+def record_seed(seed: int, product_id: int) -> int:
+    """Derive the 64-bit seed of a single product.
+
+    Args:
+        seed: Global run seed.
+        product_id: Id of the product.
+
+    Returns:
+        int: Seed for the product's text and numeric random streams.
+    """
+    digest = hashlib.blake2b(
+        f"{seed}:product:{product_id}".encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def image_seed(seed: int) -> int:
+    """Derive the latent seed of a run's images from its global seed."""
+    digest = hashlib.blake2b(f"{seed}:image".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
 
 
 class ProductGenerator:
-    def __init__(self):
-        self.image_generator = create_image_generator()
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        vectorized: bool = False,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        text_pool_size: int = 0,
+        image_backend: Optional[str] = None,
+        category_fanout: Optional[Sequence[int]] = None,
+        random_access: bool = False,
+        image_seed: Optional[int] = None,
+    ):
+        """Initialize the generator.
+
+        Args:
+            seed: Optional seed for reproducible products.
+            vectorized: Draw numeric and categorical fields for blocks of
+                products at once with NumPy instead of per product.
+            block_size: Products per block in vectorized mode.
+            text_pool_size: Draw names and descriptions from a precomputed
+                text pool of this size instead of calling Faker per
+                product. 0 disables the pool.
+            image_backend: Image generator backend name. Defaults to
+                ``IMAGE_CONFIG["generator_type"]``.
+            category_fanout: Fan-out per level of the category taxonomy
+                products are assigned to, see ``taxonomy.Taxonomy``.
+            random_access: Reseed the random streams for every product
+                from ``record_seed(seed, product_id)``, so any product can
+                be regenerated on its own, in any order or partitioning.
+                Not compatible with ``vectorized``.
+            image_seed: Latent seed for the image generator. Defaults to
+                ``IMAGE_CONFIG["seed"]``.
+
+        Raises:
+            ValueError: If ``random_access`` is combined with
+                ``vectorized``.
+        """
+        if random_access and vectorized:
+            raise ValueError(
+                "Random access generation draws every product from its own "
+                "seed and cannot be combined with vectorized generation"
+            )
+        image_options = {}
+        if image_seed is not None:
+            image_options["seed"] = image_seed
+        self.image_generator = create_image_generator(
+            image_backend, **image_options
+        )
+        self.random_access = random_access
+        self.run_seed = None
+        self.taxonomy = get_taxonomy(category_fanout)
+        self.vectorized = vectorized
+        self.block_size = max(1, block_size)
+        self.text_pool = (
+            get_text_pool(text_pool_size) if text_pool_size > 0 else None
+        )
+        # Each generator owns its Faker and Random instances so that
+        # independently seeded generators can run side by side (e.g. one
+        # per worker process) without sharing global state.
+        self.fake = Faker()
+        self.random = random.Random()
+        self.np_random = np.random.default_rng()
+        if seed is not None:
+            self.seed(seed)
+
+    def seed(self, seed: int) -> None:
+        """Reset the text and numeric random streams from ``seed``.
+
+        In random-access mode ``seed`` is the run seed that every
+        product's own streams are derived from.
+        """
+        self.run_seed = seed
+        self.fake.seed_instance(seed)
+        self.random.seed(seed)
+        self.np_random = np.random.default_rng(seed)
 
     def generate_product(self, product_id: int) -> dict:
-        product_name = fake.sentence(nb_words=3).strip(".")
-        product_sku = product_name.replace(" ", "_").lower()
-        description = fake.paragraph(nb_sentences=5)
+        product_data = self.generate_record(product_id)
 
         # Generate image using the appropriate generator
         image_result = self.image_generator.generate_product_image(
-            product_name, description
+            product_data["product_name"], product_data["description"]
         )
+        self.attach_image(product_data, image_result)
+
+        return product_data
+
+    def generate_products(self, product_ids: Iterable[int]) -> list:
+        """Generate several products, rendering their images in batches.
+
+        Text and pricing for the whole block are generated first, then all
+        prompts are handed to the image generator, which runs them through
+        the pipeline ``batch_size`` at a time.
+
+        Args:
+            product_ids: Ids of the products to generate.
+
+        Returns:
+            list: Product dictionaries in the order of ``product_ids``.
+        """
+        products = self.generate_records(product_ids)
+        self.add_images(products)
+        return products
+
+    def iter_products(self, product_ids: Iterable[int]) -> Iterator[dict]:
+        """Yield products, generating one image batch at a time.
+
+        Only one image batch (or, in vectorized mode, one block) of
+        records is held in memory, which keeps streaming output flat
+        regardless of catalog size.
+
+        Args:
+            product_ids: Ids of the products to generate.
+
+        Yields:
+            dict: Product dictionaries in the order of ``product_ids``.
+        """
+        return self.render_images(self.iter_records(product_ids))
+
+    def render_images(self, records: Iterable[dict]) -> Iterator[dict]:
+        """Add images to a stream of records, one image batch at a time.
+
+        Rendering of each batch overlaps with post-processing of the
+        previous one on the image sink's threads; records still come out
+        in input order.
+
+        Args:
+            records: Records without images, e.g. from ``iter_records``.
+
+        Yields:
+            dict: The same records with their image fields filled in.
+        """
+        batch_size = self.image_generator.batch_size
+        records = iter(records)
+        previous = None
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            futures = None
+            if batch:
+                # The previous batch is still being encoded and written
+                # while this one renders
+                futures = self.image_generator.submit_product_images(
+                    [(p["product_name"], p["description"]) for p in batch]
+                )
+            if previous is not None:
+                for product_data, future in zip(*previous):
+                    self.attach_image(product_data, future.result())
+                yield from previous[0]
+            if not batch:
+                return
+            previous = (batch, futures)
+
+    def add_images(self, products: list) -> None:
+        """Render and attach images for a list of records in place."""
+        image_results = self.image_generator.generate_product_images(
+            [(p["product_name"], p["description"]) for p in products]
+        )
+        for product_data, image_result in zip(products, image_results):
+            self.attach_image(product_data, image_result)
+
+    def iter_records(self, product_ids: Iterable[int]) -> Iterator[dict]:
+        """Yield products without images.
+
+        The ``image_url`` and ``image_base64`` fields are left as None so
+        images can be rendered separately, e.g. by the image pipeline.
+
+        Args:
+            product_ids: Ids of the products to generate.
+
+        Yields:
+            dict: Product dictionaries in the order of ``product_ids``.
+        """
+        if not self.vectorized:
+            for product_id in product_ids:
+                yield self.generate_record(product_id)
+            return
+
+        product_ids = iter(product_ids)
+        while True:
+            block = list(itertools.islice(product_ids, self.block_size))
+            if not block:
+                return
+            yield from self.generate_records(block)
+
+    def generate_records(self, product_ids: Iterable[int]) -> list:
+        """Generate the text and pricing fields of several products.
+
+        In vectorized mode the numeric and categorical fields of the whole
+        block are drawn with a handful of NumPy calls.
+
+        Args:
+            product_ids: Ids of the products to generate.
+
+        Returns:
+            list: Product dictionaries without images.
+        """
+        product_ids = list(product_ids)
+        if not self.vectorized:
+            return [
+                self.generate_record(product_id) for product_id in product_ids
+            ]
+
+        with metrics.timer("product.text"):
+            if self.text_pool is not None:
+                texts = self.text_pool.sample_texts(
+                    len(product_ids), self.np_random
+                )
+            else:
+                texts = [self._generate_text() for _ in product_ids]
+        with metrics.timer("product.fields"):
+            columns = generate_numeric_columns(
+                len(product_ids), self.np_random, self.taxonomy
+            )
+            records = assemble_records(product_ids, texts, columns)
+        metrics.count("products.records", len(records))
+        return records
+
+    def _generate_text(self) -> tuple:
+        """Return a ``(product_name, description)`` pair."""
+        if self.text_pool is not None:
+            return (
+                self.text_pool.name(self.random),
+                self.text_pool.description(self.random),
+            )
+        product_name = self.fake.sentence(nb_words=3).strip(".")
+        description = self.fake.paragraph(nb_sentences=5)
+        return product_name, description
+
+    def generate_record(self, product_id: int) -> dict:
+        """Generate the text and pricing fields of a product.
+
+        Raises:
+            ValueError: In random-access mode without a seed.
+        """
+        if self.random_access:
+            if self.run_seed is None:
+                raise ValueError("Random access generation requires a seed")
+            product_seed = record_seed(self.run_seed, product_id)
+            self.fake.seed_instance(product_seed)
+            self.random.seed(product_seed)
+        rng = self.random
+        with metrics.timer("product.text"):
+            product_name, description = self._generate_text()
+        product_sku = product_name.replace(" ", "_").lower()
 
         product_data = {
             "product_id": product_id,
             "product_name": product_name,
             "product_sku": product_sku,
-            "category": random.sample(range(1, 30), random.randint(1, 3)),
+            "category": self.taxonomy.sample_leaves(rng, rng.randint(1, 3)),
             "description": description,
             "short_description": description[:100],
-            "price": random.randint(10, 1000) * 1000,
+            "price": rng.randint(10, 1000) * 1000,
             "special_price": 0,  # Will be updated below
-            "image_url": image_result["file_path"],
-            "image_base64": image_result["base64"],
-            "product_type": random.choice(["SIMPLE", "CONFIGURABLE"]),
+            "image_url": None,  # Filled in by attach_image
+            "image_base64": None,
+            "product_type": rng.choice(["SIMPLE", "CONFIGURABLE"]),
             "variations": [],
         }
 
         # Set special price
-        product_data["special_price"] = random.choice(
-            [0, product_data["price"] - random.randint(1000, 5000)]
+        product_data["special_price"] = rng.choice(
+            [0, product_data["price"] - rng.randint(1000, 5000)]
         )
 
         # Add variations if configurable
         if product_data["product_type"] == "CONFIGURABLE":
             product_data["variations"] = ProductGenerator._generate_variations(
-                product_sku, product_data["price"]
+                product_sku, product_data["price"], rng
             )
 
+        metrics.count("products.records")
         return product_data
 
     @staticmethod
-    def _generate_variations(product_sku: str, base_price: int) -> list:
+    def attach_image(product_data: dict, image_result: dict) -> None:
+        """Copy an image result into the product's image fields.
+
+        The location of a written image file, digest included, is kept
+        under ``IMAGE_LOCATION_KEY``.
+        """
+        product_data["image_url"] = image_result["file_path"]
+        product_data["image_base64"] = image_result["base64"]
+        if image_result.get("location"):
+            product_data[IMAGE_LOCATION_KEY] = image_result["location"]
+
+    @staticmethod
+    def _generate_variations(
+        product_sku: str, base_price: int, rng: random.Random = random
+    ) -> list:
         return [
             {
                 "attribute_code": "option",
@@ -63,7 +345,7 @@ class ProductGenerator:
                     {
                         "attribute_option_code": f"{product_sku}_v{n}",
                         "attribute_option_price": base_price
-                        - random.randint(1000, 5000),
+                        - rng.randint(1000, 5000),
                     }
                     for n in range(1, 6)
                 ],
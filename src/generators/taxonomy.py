@@ -0,0 +1,175 @@
+"""Compact category taxonomy index.
+
+A taxonomy is described by its fan-out per level: ``(10, 3)`` is 10 root
+categories with 3 children each. Ids are assigned level by level starting
+at 1, so every level, and in particular the set of leaves, is a
+contiguous id range and a node's children are a contiguous range of the
+next level. The index keeps the parent id and depth of every node in
+flat NumPy arrays (a few bytes per node), which is enough to stream the
+tree and to sample leaf categories in O(1) without building nested
+dictionaries, even for trees with millions of nodes.
+"""
+
+import functools
+import random
+from typing import Optional, Sequence
+import numpy as np
+
+# 10 root categories with 3 subcategories each
+DEFAULT_FANOUT = (10, 3)
+
+# Guard against fan-outs that would not fit in memory
+MAX_NODES = 100_000_000
+
+
+def taxonomy_fanout(
+    fanout: Optional[Sequence[int]] = None, depth: Optional[int] = None
+) -> tuple:
+    """Normalize a fan-out specification.
+
+    Args:
+        fanout: Children per node for each level, roots first. Defaults
+            to ``DEFAULT_FANOUT``.
+        depth: Number of levels. Missing levels repeat the last fan-out
+            value; extra values are dropped.
+
+    Returns:
+        tuple: Fan-out per level.
+    """
+    fanout = list(fanout or DEFAULT_FANOUT)
+    if depth is not None:
+        if depth < 1:
+            raise ValueError("Taxonomy depth must be at least 1")
+        fanout = (fanout + [fanout[-1]] * depth)[:depth]
+    return tuple(int(f) for f in fanout)
+
+
+class Taxonomy:
+    """Id, parent and depth index of a uniform category tree."""
+
+    def __init__(self, fanout: Sequence[int] = DEFAULT_FANOUT):
+        """Build the index level by level.
+
+        Args:
+            fanout: Children per node for each level, roots first.
+
+        Raises:
+            ValueError: If the fan-out is empty, not positive or the tree
+                would exceed ``MAX_NODES``.
+        """
+        self.fanout = tuple(int(f) for f in fanout)
+        if not self.fanout or min(self.fanout) < 1:
+            raise ValueError("Taxonomy fan-out values must be at least 1")
+
+        level_sizes = []
+        size = 1
+        for f in self.fanout:
+            size *= f
+            level_sizes.append(size)
+        self.level_sizes = tuple(level_sizes)
+        self.size = sum(level_sizes)
+        if self.size > MAX_NODES:
+            raise ValueError(
+                f"Taxonomy {self.fanout} has {self.size:,} nodes, "
+                f"more than the limit of {MAX_NODES:,}"
+            )
+
+        # First id of every level, plus one past the last node
+        self.level_starts = tuple(
+            int(s) for s in np.cumsum((1,) + self.level_sizes)
+        )
+
+        # parent[id - 1] is the parent id, 0 for roots
+        self.parent = np.zeros(self.size, dtype=np.int32)
+        for level in range(1, len(self.fanout)):
+            parents = np.arange(
+                self.level_starts[level - 1],
+                self.level_starts[level],
+                dtype=np.int32,
+            )
+            start = self.level_starts[level] - 1
+            self.parent[start : start + self.level_sizes[level]] = np.repeat(
+                parents, self.fanout[level]
+            )
+        self.depth = np.repeat(
+            np.arange(len(self.fanout), dtype=np.int8), self.level_sizes
+        )
+
+        self.leaf_start = self.level_starts[-2]
+        self.leaf_count = self.level_sizes[-1]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def parent_of(self, category_id: int) -> Optional[int]:
+        """Return the parent id of a category, None for roots."""
+        parent = int(self.parent[category_id - 1])
+        return parent or None
+
+    def children(self, category_id: int) -> range:
+        """Return the ids of a category's children."""
+        level = int(self.depth[category_id - 1])
+        if level + 1 >= len(self.fanout):
+            return range(0)
+        fanout = self.fanout[level + 1]
+        offset = (category_id - self.level_starts[level]) * fanout
+        start = self.level_starts[level + 1] + offset
+        return range(start, start + fanout)
+
+    def is_leaf(self, category_id: int) -> bool:
+        return category_id >= self.leaf_start
+
+    def sample_leaves(self, rng: random.Random, count: int) -> list:
+        """Draw up to ``count`` distinct leaf ids in random order.
+
+        Args:
+            rng: Random stream to draw from.
+            count: Number of leaves; capped at the number of leaves.
+
+        Returns:
+            list: Leaf category ids.
+        """
+        count = min(count, self.leaf_count)
+        return [
+            self.leaf_start + index
+            for index in rng.sample(range(self.leaf_count), count)
+        ]
+
+    def sample_leaf_block(
+        self, rng: np.random.Generator, rows: int, count: int
+    ) -> np.ndarray:
+        """Draw ``count`` distinct leaf ids for each of ``rows`` products.
+
+        Rows with repeated ids are redrawn until all ids in a row differ,
+        which yields a uniform random ordered subset per row. With many
+        leaves repeats are rare, so this costs O(rows * count).
+
+        Returns:
+            np.ndarray: ``(rows, min(count, leaf_count))`` int64 ids.
+        """
+        count = min(count, self.leaf_count)
+        picks = rng.integers(0, self.leaf_count, (rows, count))
+        while True:
+            ordered = np.sort(picks, axis=1)
+            repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+            redraw = np.flatnonzero(repeated)
+            if not len(redraw):
+                break
+            picks[redraw] = rng.integers(
+                0, self.leaf_count, (len(redraw), count)
+            )
+        return picks + self.leaf_start
+
+
+def get_taxonomy(fanout: Optional[Sequence[int]] = None) -> Taxonomy:
+    """Return the shared taxonomy index for a fan-out.
+
+    The index only depends on the fan-out, so each process builds it
+    once per fan-out.
+    """
+    return _cached_taxonomy(taxonomy_fanout(fanout))
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_taxonomy(fanout: tuple) -> Taxonomy:
+    return Taxonomy(fanout)
@@ -0,0 +1,219 @@
+"""Precomputed text corpus for fast product and category text.
+
+Faker's provider machinery costs several microseconds per call, which
+dominates text-only catalog generation. A ``TextPool`` generates a large
+corpus of product names, sentences, words and URLs once (or loads it from
+a cached file) and then serves records by seeded integer indices.
+Descriptions are assembled from pooled sentences, so the number of
+distinct descriptions grows combinatorially with the pool size.
+"""
+
+import gzip
+import json
+import logging
+import os
+import random
+import tempfile
+from typing import List, Optional
+import numpy as np
+from faker import Faker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv("TEXT_POOL_CACHE_DIR", ".text_pool")
+POOL_VERSION = 1
+
+# Faker's paragraph(nb_sentences=5) varies the count by +/-40%
+MIN_SENTENCES = 3
+MAX_SENTENCES = 7
+
+_pools = {}
+
+
+class TextPool:
+    """Corpus of pooled text values sampled by index."""
+
+    def __init__(
+        self,
+        names: List[str],
+        sentences: List[str],
+        words: List[str],
+        urls: List[str],
+    ):
+        """Initialize the pool from prebuilt value lists.
+
+        Args:
+            names: Product names.
+            sentences: Sentences used to assemble descriptions.
+            words: Single words, e.g. for category names.
+            urls: URLs, e.g. for categories.
+        """
+        self.names = names
+        self.sentences = sentences
+        self.words = words
+        self.urls = urls
+
+    @classmethod
+    def build(
+        cls, size: int, seed: int = 0, locale: Optional[str] = None
+    ) -> "TextPool":
+        """Generate a new pool with Faker.
+
+        Args:
+            size: Number of names and sentences. Words and URLs get a
+                quarter of that each.
+            seed: Seed for the corpus, so equal arguments give equal pools.
+            locale: Optional Faker locale.
+
+        Returns:
+            TextPool: The generated pool.
+        """
+        fake = Faker(locale)
+        fake.seed_instance(seed)
+        small = max(1, size // 4)
+        return cls(
+            names=[fake.sentence(nb_words=3).strip(".") for _ in range(size)],
+            sentences=[fake.sentence() for _ in range(size)],
+            words=[fake.word() for _ in range(small)],
+            urls=[fake.url() for _ in range(small)],
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "TextPool":
+        """Load a pool saved with ``save``."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != POOL_VERSION:
+            raise ValueError(f"Unsupported text pool version in {path}")
+        return cls(
+            data["names"], data["sentences"], data["words"], data["urls"]
+        )
+
+    def save(self, path: str) -> None:
+        """Save the pool as gzipped JSON, atomically."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Worker processes may build and save the same pool at once
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(
+                raw, "wt", encoding="utf-8"
+            ) as f:
+                json.dump(
+                    {
+                        "version": POOL_VERSION,
+                        "names": self.names,
+                        "sentences": self.sentences,
+                        "words": self.words,
+                        "urls": self.urls,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def capacity(self) -> dict:
+        """Report how many distinct values the pool can produce.
+
+        Returns:
+            dict: Distinct counts per field. ``descriptions`` counts the
+                ordered sentence combinations, not deduplicated strings.
+        """
+        sentence_count = len(self.sentences)
+        return {
+            "names": len(self.names),
+            "sentences": sentence_count,
+            "descriptions": sum(
+                sentence_count**k
+                for k in range(MIN_SENTENCES, MAX_SENTENCES + 1)
+            ),
+            "words": len(self.words),
+            "urls": len(self.urls),
+        }
+
+    def name(self, rng: random.Random) -> str:
+        """Return a product name drawn with ``rng``."""
+        return self.names[rng.randrange(len(self.names))]
+
+    def description(self, rng: random.Random) -> str:
+        """Assemble a description from pooled sentences drawn with ``rng``."""
+        count = rng.randint(MIN_SENTENCES, MAX_SENTENCES)
+        sentences = self.sentences
+        return " ".join(
+            sentences[rng.randrange(len(sentences))] for _ in range(count)
+        )
+
+    def word(self, rng: random.Random) -> str:
+        """Return a word drawn with ``rng``."""
+        return self.words[rng.randrange(len(self.words))]
+
+    def url(self, rng: random.Random) -> str:
+        """Return a URL drawn with ``rng``."""
+        return self.urls[rng.randrange(len(self.urls))]
+
+    def sample_texts(self, n: int, rng: np.random.Generator) -> list:
+        """Draw ``n`` ``(product_name, description)`` pairs at once.
+
+        Args:
+            n: Number of pairs.
+            rng: NumPy random generator.
+
+        Returns:
+            list: ``(product_name, description)`` tuples.
+        """
+        names = self.names
+        sentences = self.sentences
+        name_idx = rng.integers(0, len(names), n).tolist()
+        counts = rng.integers(MIN_SENTENCES, MAX_SENTENCES + 1, n).tolist()
+        sentence_idx = rng.integers(0, len(sentences), sum(counts)).tolist()
+
+        texts = []
+        offset = 0
+        for i, count in zip(name_idx, counts):
+            description = " ".join(
+                sentences[j] for j in sentence_idx[offset : offset + count]
+            )
+            offset += count
+            texts.append((names[i], description))
+        return texts
+
+
+def get_text_pool(
+    size: int, seed: int = 0, cache_dir: Optional[str] = DEFAULT_CACHE_DIR
+) -> TextPool:
+    """Return a pool of the given size, building it at most once.
+
+    Pools are memoized per process and cached on disk under ``cache_dir``,
+    so later runs (and forked workers) skip the Faker build entirely.
+
+    Args:
+        size: Pool size passed to ``TextPool.build``.
+        seed: Corpus seed.
+        cache_dir: Directory for cached pools, or None to disable.
+
+    Returns:
+        TextPool: The pool.
+    """
+    key = (size, seed)
+    if key in _pools:
+        return _pools[key]
+
+    path = None
+    pool = None
+    if cache_dir:
+        filename = f"pool_v{POOL_VERSION}_{size}_{seed}.json.gz"
+        path = os.path.join(cache_dir, filename)
+        if os.path.exists(path):
+            pool = TextPool.load(path)
+
+    if pool is None:
+        logger.info(f"Building text pool of size {size}")
+        pool = TextPool.build(size, seed)
+        if path:
+            pool.save(path)
+
+    logger.info(f"Text pool capacity: {pool.capacity()}")
+    _pools[key] = pool
+    return pool
@@ -0,0 +1,137 @@
+"""Vectorized generation of numeric and categorical product fields.
+
+Generating prices, discounts, category ids, product types and variation
+prices with scalar ``random`` calls costs several Python-level calls per
+product. This module draws those columns for a whole block of products at
+once with NumPy, keeping the distributions of
+``ProductGenerator.generate_record``:
+
+- category: 1-3 distinct leaf category ids of the taxonomy
+- price: uniform integer in [10, 1000], times 1000
+- special_price: 0 or price minus a uniform [1000, 5000] discount, 50/50
+- product_type: SIMPLE or CONFIGURABLE, 50/50
+- variation option prices: price minus a uniform [1000, 5000] delta
+"""
+
+from typing import List, Sequence, Tuple
+import numpy as np
+from .taxonomy import Taxonomy
+
+MAX_CATEGORIES = 3
+VARIATION_COUNT = 5
+PRODUCT_TYPES = np.array(["SIMPLE", "CONFIGURABLE"])
+
+# Products per block when iterating; bounds the size of temporary arrays
+DEFAULT_BLOCK_SIZE = 4096
+
+
+def generate_numeric_columns(
+    n: int, rng: np.random.Generator, taxonomy: Taxonomy
+) -> dict:
+    """Draw the numeric and categorical fields for ``n`` products.
+
+    Args:
+        n: Number of products.
+        rng: NumPy random generator.
+        taxonomy: Category index products are assigned to.
+
+    Returns:
+        dict: Column arrays of length ``n``:
+            - price: int64 prices
+            - special_price: int64 special prices (0 = no discount)
+            - category_count: number of categories per product
+            - categories: (n, MAX_CATEGORIES) leaf category ids, only the
+              first ``category_count`` of each row are used
+            - configurable: bool mask of configurable products
+            - variation_prices: (n, VARIATION_COUNT) option prices
+    """
+    price = rng.integers(10, 1001, n, dtype=np.int64) * 1000
+    discount = rng.integers(1000, 5001, n, dtype=np.int64)
+    discounted = rng.random(n) < 0.5
+    special_price = np.where(discounted, price - discount, 0)
+
+    categories = taxonomy.sample_leaf_block(rng, n, MAX_CATEGORIES)
+    category_count = np.minimum(
+        rng.integers(1, MAX_CATEGORIES + 1, n), categories.shape[1]
+    )
+
+    configurable = rng.random(n) < 0.5
+    variation_prices = price[:, None] - rng.integers(
+        1000, 5001, (n, VARIATION_COUNT), dtype=np.int64
+    )
+
+    return {
+        "price": price,
+        "special_price": special_price,
+        "category_count": category_count,
+        "categories": categories,
+        "configurable": configurable,
+        "variation_prices": variation_prices,
+    }
+
+
+def assemble_records(
+    product_ids: Sequence[int],
+    texts: List[Tuple[str, str]],
+    columns: dict,
+) -> list:
+    """Build product records from per-product text and column arrays.
+
+    Args:
+        product_ids: Product ids of the block.
+        texts: ``(product_name, description)`` per product.
+        columns: Output of ``generate_numeric_columns`` for the block.
+
+    Returns:
+        list: Product dictionaries shaped like
+            ``ProductGenerator.generate_record`` output.
+    """
+    # Convert to Python scalars once per column rather than per element
+    prices = columns["price"].tolist()
+    special_prices = columns["special_price"].tolist()
+    category_counts = columns["category_count"].tolist()
+    categories = columns["categories"].tolist()
+    product_types = PRODUCT_TYPES[columns["configurable"].astype(int)]
+    product_types = product_types.tolist()
+    variation_prices = columns["variation_prices"].tolist()
+
+    records = []
+    for i, (product_id, (product_name, description)) in enumerate(
+        zip(product_ids, texts)
+    ):
+        product_sku = product_name.replace(" ", "_").lower()
+        variations = []
+        if product_types[i] == "CONFIGURABLE":
+            variations = [
+                {
+                    "attribute_code": "option",
+                    "attribute_name": "Options",
+                    "options": [
+                        {
+                            "attribute_option_code": f"{product_sku}_v{n}",
+                            "attribute_option_price": option_price,
+                        }
+                        for n, option_price in enumerate(
+                            variation_prices[i], start=1
+                        )
+                    ],
+                }
+            ]
+
+        records.append(
+            {
+                "product_id": product_id,
+                "product_name": product_name,
+                "product_sku": product_sku,
+                "category": categories[i][: category_counts[i]],
+                "description": description,
+                "short_description": description[:100],
+                "price": prices[i],
+                "special_price": special_prices[i],
+                "image_url": None,
+                "image_base64": None,
+                "product_type": product_types[i],
+                "variations": variations,
+            }
+        )
+    return records
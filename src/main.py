@@ -1,58 +1,774 @@
 """Main module for generating e-commerce data.
 
 This module handles the generation of product and category data,
-combining them into a JSON file for use in an e-commerce system.
+streaming them to a JSON or NDJSON file, or to normalized CSV, Parquet or
+Arrow tables, for use in an e-commerce system.
 """
 
+import argparse
 import json
 import logging
 import os
-from generators.product_generator import ProductGenerator
+import random
+from typing import Iterable, Iterator, Optional, Sequence
+from generators.product_generator import (
+    IMAGE_LOCATION_KEY,
+    ProductGenerator,
+    image_seed,
+)
 from generators.category_generator import CategoryGenerator
+from generators import parallel
+from generators.image import pipeline_registry
+from generators.image.config import IMAGE_CONFIG
+from generators.image.image_generator_factory import (
+    available_backends,
+    create_image_generator,
+)
+from generators.taxonomy import get_taxonomy, taxonomy_fanout
+from generators.text_pool import get_text_pool
+from generators.pipeline import (
+    DEFAULT_MAX_IN_FLIGHT,
+    generate_products_pipelined,
+)
+from utils import metrics
+from utils.checkpoint import CheckpointManifest, manifest_path_for
+from writers.compression import COMPRESSION_SUFFIXES, COMPRESSIONS
+from writers.json_writer import (
+    OUTPUT_FORMATS,
+    RESUMABLE_FORMATS,
+    create_writer,
+    output_compression,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
-def generate_data() -> None:
-    """Generate product and category data and save to JSON file.
+def generate_data(
+    num_products: int = 3,
+    output_path: str = "ecommerce_data.json",
+    output_format: str = "json",
+    seed: Optional[int] = None,
+    workers: int = 1,
+    shard_size: int = parallel.DEFAULT_SHARD_SIZE,
+    pipelined: bool = False,
+    image_workers: int = 1,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    checkpoint_every: int = 0,
+    resume: bool = False,
+    verify_images: bool = False,
+    vectorized: bool = False,
+    text_pool_size: int = 0,
+    image_backend: Optional[str] = None,
+    category_fanout: Optional[Sequence[int]] = None,
+    category_depth: Optional[int] = None,
+    metrics_path: Optional[str] = None,
+    prometheus_path: Optional[str] = None,
+    trace_memory: bool = False,
+    random_access: bool = False,
+    compact: bool = False,
+    compression: Optional[str] = None,
+    compression_level: Optional[int] = None,
+    compression_threads: int = 1,
+) -> None:
+    """Generate product and category data and stream it to a file.
 
     This function:
-    1. Creates product data using ProductGenerator
-    2. Creates category data using CategoryGenerator
-    3. Combines the data and saves it to a JSON file
+    1. Creates category data using CategoryGenerator
+    2. Creates product data using ProductGenerator
+    3. Writes each record to the output file as soon as it is generated
+
+    Args:
+        num_products: Number of products to generate.
+        output_path: Path of the output file, or output directory for
+            the columnar formats.
+        output_format: One of ``OUTPUT_FORMATS``. ``csv``, ``parquet``
+            and ``arrow`` write normalized tables into a directory.
+        seed: Seed for reproducible output. When set, or when more than
+            one worker is used, products are generated in deterministic
+            shards so any worker count yields identical output.
+        workers: Number of worker processes for product generation.
+        shard_size: Number of products per shard in sharded mode.
+        pipelined: Render images on worker threads while text generation
+            runs ahead, instead of one batch after another.
+        image_workers: Number of image worker threads in pipelined mode.
+        max_in_flight: Maximum number of records buffered between text
+            generation and output in pipelined mode.
+        checkpoint_every: Save a checkpoint manifest every N products.
+            Checkpointing implies sharded generation with a fixed seed so
+            a resumed run reproduces the same records.
+        resume: Continue from the checkpoint manifest of ``output_path``,
+            skipping finished products and appending to the output.
+        verify_images: When resuming, check journaled images against
+            their content hashes and report damaged ones. They are not
+            re-rendered; see ``CheckpointManifest.verify_images``.
+        vectorized: Draw numeric and categorical product fields in blocks
+            with NumPy instead of per product.
+        text_pool_size: Draw product and category text from a precomputed
+            pool of this size instead of calling Faker per record.
+        image_backend: Image generator backend name, e.g. ``none`` for
+            text-only catalogs. Defaults to ``IMAGE_GENERATOR_TYPE``.
+        category_fanout: Children per category for each taxonomy level,
+            roots first. Defaults to 10 roots with 3 children each.
+        category_depth: Number of taxonomy levels; missing levels repeat
+            the last fan-out value.
+        metrics_path: Write per-stage timings and counters to this JSON
+            file. Instrumentation is only enabled when an export path is
+            given.
+        prometheus_path: Write the same metrics as a Prometheus textfile.
+        trace_memory: Also record allocated and peak memory per stage
+            with tracemalloc.
+        random_access: Seed every product from the run seed and its id,
+            so any product can later be regenerated on its own with
+            ``regenerate_products``. Implies a fixed seed; a random one
+            is chosen and logged when none is given.
+        compact: Write JSON without indentation or separator spaces.
+        compression: ``gzip`` or ``zstd`` to compress JSON and NDJSON
+            output while it is written. Inferred from a ``.gz`` or
+            ``.zst`` suffix of ``output_path`` when not given.
+        compression_level: gzip or zstd compression level.
+        compression_threads: Threads compressing the output, so
+            compression does not stall generation.
     """
-    # Log API key (masked for security)
+    if metrics_path or prometheus_path:
+        metrics.enable(trace_memory)
+    _log_api_key()
+
+    generator_options = _generator_options(
+        vectorized,
+        text_pool_size,
+        image_backend,
+        category_fanout,
+        category_depth,
+        random_access,
+    )
+    compression = output_compression(output_path, output_format, compression)
+
+    manifest = None
+    if resume or checkpoint_every:
+        manifest = _open_checkpoint(
+            output_path,
+            output_format,
+            compression,
+            num_products,
+            seed,
+            shard_size,
+            generator_options,
+            compact,
+            checkpoint_every,
+            resume,
+            verify_images,
+        )
+        if manifest.state["finished"]:
+            logger.info(f"{output_path} is already complete")
+            manifest.close()
+            return
+        seed = manifest.state["seed"]
+
+    seed = _run_seed(seed, workers, random_access)
+    first_id, resume_offset = _resume_position(manifest, num_products)
+    products, image_generators = _product_stream(
+        first_id,
+        num_products,
+        seed,
+        workers,
+        shard_size,
+        pipelined,
+        image_workers,
+        max_in_flight,
+        _stream_options(generator_options, seed, random_access),
+    )
+
+    with create_writer(
+        output_path,
+        output_format,
+        resume_offset=resume_offset,
+        resume_count=manifest.state["products_written"] if manifest else 0,
+        compact=compact,
+        compression=compression,
+        compression_level=compression_level,
+        compression_threads=compression_threads,
+    ) as writer:
+        if not writer.resumed:
+            _write_categories(writer, seed, generator_options)
+        _write_products(writer, products, manifest, seed, shard_size)
+
+    if manifest:
+        manifest.save(os.path.getsize(output_path), finished=True)
+        manifest.close()
+
+    logger.info(f"Data saved to {output_path}")
+    _log_image_stats(image_generators)
+    _export_metrics(metrics_path, prometheus_path)
+
+
+def _log_api_key() -> None:
+    """Log the Gemini API key, masked for security."""
     api_key = os.getenv("GEMINI_API_KEY", "")
     masked_key = (
         f"{api_key[:4]}...{api_key[-4:]}" if len(api_key) > 8 else "Not found"
     )
     logger.debug(f"Using Gemini API Key: {masked_key}")
 
-    # Create product generator instance
-    product_generator = ProductGenerator()
 
-    # Generate only 3 products for testing
-    products = [
-        product_generator.generate_product(product_id)
-        for product_id in range(1, 4)
-    ]
+def _generator_options(
+    vectorized: bool,
+    text_pool_size: int,
+    image_backend: Optional[str],
+    category_fanout: Optional[Sequence[int]],
+    category_depth: Optional[int],
+    random_access: bool,
+) -> dict:
+    """Return the ProductGenerator options of a run."""
+    generator_options = {
+        "vectorized": vectorized,
+        "text_pool_size": text_pool_size,
+        "image_backend": image_backend,
+        "category_fanout": list(
+            taxonomy_fanout(category_fanout, category_depth)
+        ),
+    }
+    if random_access:
+        generator_options["random_access"] = True
+    return generator_options
+
+
+def _open_checkpoint(
+    output_path: str,
+    output_format: str,
+    compression: str,
+    num_products: int,
+    seed: Optional[int],
+    shard_size: int,
+    generator_options: dict,
+    compact: bool,
+    checkpoint_every: int,
+    resume: bool,
+    verify_images: bool,
+) -> CheckpointManifest:
+    """Check that the output can be resumed and open its manifest.
+
+    Raises:
+        ValueError: If the output format or compression cannot be resumed,
+            or the manifest does not match this run.
+    """
+    if output_format not in RESUMABLE_FORMATS:
+        raise ValueError(
+            f"Checkpointing requires one of {', '.join(RESUMABLE_FORMATS)} "
+            f"output, not {output_format}"
+        )
+    if compression != "none":
+        raise ValueError("Checkpointing requires uncompressed output")
+
+    manifest = _open_manifest(
+        output_path,
+        output_format,
+        num_products,
+        seed,
+        shard_size,
+        generator_options,
+        compact,
+        checkpoint_every or 1000,
+        resume,
+    )
+    if (
+        verify_images
+        and not manifest.state["finished"]
+        and manifest.state["output_offset"] is not None
+    ):
+        damaged = manifest.verify_images()
+        if damaged:
+            logger.warning(
+                f"{len(damaged)} completed product image(s) are missing "
+                f"or changed and will not be re-rendered, e.g. product "
+                f"ids {damaged[:10]}"
+            )
+    return manifest
+
+
+def _run_seed(seed: Optional[int], workers: int, random_access: bool):
+    """Choose a seed when sharding or random access needs one."""
+    if seed is None and (workers > 1 or random_access):
+        seed = random.randrange(2**32)
+        if random_access:
+            logger.info(f"Random access catalog seed: {seed}")
+    return seed
+
+
+def _stream_options(
+    generator_options: dict, seed: Optional[int], random_access: bool
+) -> dict:
+    """Return the generator options of the product stream."""
+    if not random_access:
+        return generator_options
+    # Image latents follow the run seed too, unless IMAGE_SEED is set
+    return dict(
+        generator_options, image_seed=_random_access_image_seed(seed)
+    )
 
-    # Generate categories
-    categories = CategoryGenerator.generate_categories()
 
-    # Combine data
-    data = {
-        "products": products,
-        "categories": categories,
+def _resume_position(
+    manifest: Optional[CheckpointManifest], num_products: int
+) -> tuple:
+    """Return ``(first_id, resume_offset)`` for a new or resumed run."""
+    if manifest is None or manifest.state["output_offset"] is None:
+        return 1, None
+    first_id = manifest.next_product_id
+    logger.info(
+        f"Resuming at product {first_id} of {num_products} "
+        f"from {manifest.path}"
+    )
+    return first_id, manifest.state["output_offset"]
+
+
+def _write_categories(writer, seed: Optional[int], generator_options: dict):
+    """Write the category taxonomy ahead of the products."""
+    # Categories are small and go first so products can be streamed
+    text_pool_size = generator_options["text_pool_size"]
+    text_pool = get_text_pool(text_pool_size) if text_pool_size else None
+    taxonomy = get_taxonomy(generator_options["category_fanout"])
+    logger.info(f"Writing {len(taxonomy)} categories")
+    with metrics.timer("categories.generate"):
+        writer.write_categories(
+            CategoryGenerator.iter_categories(seed, text_pool, taxonomy)
+        )
+
+
+def _write_products(
+    writer,
+    products: Iterable[dict],
+    manifest: Optional[CheckpointManifest],
+    seed: Optional[int],
+    shard_size: int,
+) -> None:
+    """Write products, recording each in the checkpoint manifest."""
+    for product in products:
+        image_location = product.pop(IMAGE_LOCATION_KEY, None)
+        writer.write_product(product)
+
+        if manifest:
+            manifest.record_product(product, image_location)
+            if manifest.due:
+                with metrics.timer("output.checkpoint"):
+                    manifest.save(
+                        writer.checkpoint(),
+                        _shard_state(
+                            seed, shard_size, product["product_id"] + 1
+                        ),
+                    )
+
+
+def _log_image_stats(image_generators: list) -> None:
+    """Close image sinks and log cache and pipeline registry stats."""
+    caches = []
+    for image_generator in image_generators:
+        image_generator.sink.close()
+        # Generators of a process share their cache
+        if image_generator.cache and image_generator.cache not in caches:
+            caches.append(image_generator.cache)
+    for cache in caches:
+        logger.info(f"Image cache stats: {cache.stats()}")
+
+    registry_stats = pipeline_registry.stats()
+    if registry_stats["pipelines"]:
+        logger.info(f"Pipeline registry stats: {registry_stats}")
+
+
+def _export_metrics(
+    metrics_path: Optional[str], prometheus_path: Optional[str]
+) -> None:
+    """Export the collected metrics and stop collecting them."""
+    if not metrics.is_enabled():
+        return
+    if metrics_path:
+        metrics.export_json(metrics_path)
+        logger.info(f"Metrics saved to {metrics_path}")
+    if prometheus_path:
+        metrics.export_prometheus(prometheus_path)
+    metrics.disable()
+
+
+def _random_access_image_seed(seed: int) -> int:
+    if IMAGE_CONFIG["seed"] is not None:
+        return IMAGE_CONFIG["seed"]
+    return image_seed(seed)
+
+
+def regenerate_products(
+    product_ids: Iterable[int],
+    seed: int,
+    text_pool_size: int = 0,
+    image_backend: Optional[str] = None,
+    category_fanout: Optional[Sequence[int]] = None,
+    category_depth: Optional[int] = None,
+) -> Iterator[dict]:
+    """Regenerate single products of a random-access catalog.
+
+    Each product is derived from ``(seed, product_id)`` alone, so this
+    costs the same for product 1 and product 4,512,337 and returns the
+    records ``generate_data(..., random_access=True)`` wrote, provided
+    the same seed, text pool, taxonomy and image settings are used.
+
+    Args:
+        product_ids: Ids of the products to regenerate, in any order.
+        seed: Seed of the catalog.
+        text_pool_size: Text pool size the catalog was generated with.
+        image_backend: Image generator backend name.
+        category_fanout: Taxonomy fan-out of the catalog.
+        category_depth: Taxonomy depth of the catalog.
+
+    Yields:
+        dict: Complete product records, images included.
+    """
+    product_generator = ProductGenerator(
+        text_pool_size=text_pool_size,
+        image_backend=image_backend,
+        category_fanout=taxonomy_fanout(category_fanout, category_depth),
+        random_access=True,
+        image_seed=_random_access_image_seed(seed),
+    )
+    product_generator.seed(seed)
+    for product_id in product_ids:
+        product = product_generator.generate_product(product_id)
+        product.pop(IMAGE_LOCATION_KEY, None)
+        yield product
+
+
+def _open_manifest(
+    output_path: str,
+    output_format: str,
+    num_products: int,
+    seed: Optional[int],
+    shard_size: int,
+    generator_options: dict,
+    compact: bool,
+    every: int,
+    resume: bool,
+) -> CheckpointManifest:
+    """Load the checkpoint manifest for a resumed run or start a new one."""
+    path = manifest_path_for(output_path)
+    run_params = {
+        "output_path": output_path,
+        "output_format": output_format,
+        "num_products": num_products,
+        "seed": seed,
+        "shard_size": shard_size,
+        "generator_options": generator_options,
+        "compact": compact,
     }
 
-    # Save to file
-    with open("ecommerce_data.json", "w") as f:
-        json.dump(data, f, indent=4)
-    logger.info("Data saved to ecommerce_data.json")
+    if resume and os.path.exists(path):
+        return CheckpointManifest.load(path, every, **run_params)
+    if resume:
+        logger.warning(f"No checkpoint at {path}, starting from scratch")
+
+    if run_params["seed"] is None:
+        # Resuming must replay the same random streams
+        run_params["seed"] = random.randrange(2**32)
+    return CheckpointManifest.create(path, every, **run_params)
+
+
+def _shard_state(seed: int, shard_size: int, next_product_id: int) -> dict:
+    """Describe the RNG state of the shard holding ``next_product_id``.
+
+    A shard's random streams are fully determined by its seed and the
+    number of records already drawn from them.
+    """
+    shard_index = (next_product_id - 1) // shard_size
+    return {
+        "shard_index": shard_index,
+        "shard_seed": parallel.shard_seed(seed, shard_index),
+        "next_product_id": next_product_id,
+        "records_consumed": next_product_id - 1 - shard_index * shard_size,
+    }
+
+
+def _product_stream(
+    first_id: int,
+    num_products: int,
+    seed: Optional[int],
+    workers: int,
+    shard_size: int,
+    pipelined: bool,
+    image_workers: int,
+    max_in_flight: int,
+    generator_options: dict,
+) -> tuple:
+    """Build the product iterator for the requested generation mode.
+
+    Returns:
+        tuple: ``(products, image_generators)`` where ``image_generators``
+            lists the in-process image generators, for reporting.
+    """
+    product_ids = range(first_id, num_products + 1)
+    image_options = {}
+    if generator_options.get("image_seed") is not None:
+        image_options["seed"] = generator_options["image_seed"]
+
+    if not pipelined:
+        if seed is None:
+            # Create product generator instance
+            product_generator = ProductGenerator(**generator_options)
+            products = product_generator.iter_products(product_ids)
+            return products, [product_generator.image_generator]
+
+        products = parallel.generate_products(
+            first_id,
+            num_products + 1,
+            seed,
+            workers,
+            shard_size,
+            generator_options=generator_options,
+        )
+        return products, []
+
+    if seed is None:
+        product_generator = ProductGenerator(**generator_options)
+        records = product_generator.iter_records(product_ids)
+        image_generators = [product_generator.image_generator]
+    else:
+        records = parallel.generate_products(
+            first_id,
+            num_products + 1,
+            seed,
+            workers,
+            shard_size,
+            with_images=False,
+            generator_options=generator_options,
+        )
+        image_generators = [
+            create_image_generator(
+                generator_options["image_backend"], **image_options
+            )
+        ]
+
+    image_generators.extend(
+        create_image_generator(
+            generator_options["image_backend"], **image_options
+        )
+        for _ in range(1, image_workers)
+    )
+    products = generate_products_pipelined(
+        records, image_generators, max_in_flight
+    )
+    return products, image_generators
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv: Optional argument list, defaults to ``sys.argv``.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-n",
+        "--num-products",
+        type=int,
+        default=3,
+        help="Number of products to generate",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Output file, or directory for csv/parquet/arrow "
+        "(defaults to ecommerce_data.<format>)",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="json",
+        help="Output format",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for reproducible output",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for product generation",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=parallel.DEFAULT_SHARD_SIZE,
+        help="Number of products per deterministic shard",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap text generation and image rendering",
+    )
+    parser.add_argument(
+        "--image-workers",
+        type=int,
+        default=1,
+        help="Number of image worker threads in pipelined mode",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=DEFAULT_MAX_IN_FLIGHT,
+        help="Maximum records buffered between text and output stages",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=0,
+        help="Save a resumable checkpoint every N products (0 disables)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the checkpoint of the output file",
+    )
+    parser.add_argument(
+        "--verify-images",
+        action="store_true",
+        help="Verify image hashes of completed products when resuming",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="Generate numeric product fields in NumPy blocks",
+    )
+    parser.add_argument(
+        "--text-pool",
+        type=int,
+        default=0,
+        metavar="SIZE",
+        help="Sample text from a cached pool of SIZE names and sentences",
+    )
+    parser.add_argument(
+        "--image-backend",
+        choices=available_backends(),
+        default=None,
+        help="Image generator backend (defaults to IMAGE_GENERATOR_TYPE)",
+    )
+    parser.add_argument(
+        "--category-fanout",
+        type=int,
+        nargs="+",
+        default=None,
+        metavar="N",
+        help="Children per category for each taxonomy level (default 10 3)",
+    )
+    parser.add_argument(
+        "--category-depth",
+        type=int,
+        default=None,
+        help="Taxonomy levels; extra levels repeat the last fan-out",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="Write per-stage timings and counters to a JSON file",
+    )
+    parser.add_argument(
+        "--metrics-prometheus",
+        metavar="PATH",
+        help="Write per-stage metrics as a Prometheus textfile",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Record per-stage memory with tracemalloc (slow)",
+    )
+    parser.add_argument(
+        "--random-access",
+        action="store_true",
+        help="Seed every product from the seed and its id",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON without indentation",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSIONS,
+        default=None,
+        help="Compress json/ndjson output while writing it "
+        "(defaults to the .gz/.zst suffix of the output file)",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        default=None,
+        help="gzip or zstd compression level",
+    )
+    parser.add_argument(
+        "--compression-threads",
+        type=int,
+        default=1,
+        help="Threads compressing the output",
+    )
+    parser.add_argument(
+        "--product-id",
+        type=int,
+        nargs="+",
+        metavar="ID",
+        help="Print these products of a --random-access catalog as JSON "
+        "lines instead of generating a catalog (requires --seed)",
+    )
+    args = parser.parse_args(argv)
+    if args.product_id and args.seed is None:
+        parser.error("--product-id requires --seed")
+    if args.output is None:
+        args.output = f"ecommerce_data.{args.format}"
+        if args.format in RESUMABLE_FORMATS:
+            args.output += COMPRESSION_SUFFIXES.get(args.compression, "")
+    return args
 
 
 if __name__ == "__main__":
-    generate_data()
+    args = parse_args()
+    if args.product_id:
+        for product in regenerate_products(
+            args.product_id,
+            args.seed,
+            text_pool_size=args.text_pool,
+            image_backend=args.image_backend,
+            category_fanout=args.category_fanout,
+            category_depth=args.category_depth,
+        ):
+            print(json.dumps(product))
+        raise SystemExit(0)
+    generate_data(
+        num_products=args.num_products,
+        output_path=args.output,
+        output_format=args.format,
+        seed=args.seed,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        pipelined=args.pipeline,
+        image_workers=args.image_workers,
+        max_in_flight=args.max_in_flight,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        verify_images=args.verify_images,
+        vectorized=args.vectorized,
+        text_pool_size=args.text_pool,
+        image_backend=args.image_backend,
+        category_fanout=args.category_fanout,
+        category_depth=args.category_depth,
+        metrics_path=args.metrics,
+        prometheus_path=args.metrics_prometheus,
+        trace_memory=args.trace_memory,
+        random_access=args.random_access,
+        compact=args.compact,
+        compression=args.compression,
+        compression_level=args.compression_level,
+        compression_threads=args.compression_threads,
+    )
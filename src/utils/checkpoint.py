@@ -0,0 +1,286 @@
+"""Checkpoint manifest for resumable catalog generation.
+
+A manifest records how far a run got so that a crashed or preempted run
+can pick up where it left off instead of starting over. It consists of:
+
+- ``<output>.checkpoint.json``: run parameters, completed product id
+  ranges, the output byte offset and the RNG state of the shard in
+  progress. It is replaced atomically on every save.
+- ``<output>.checkpoint.images.ndjson``: an append-only journal of image
+  paths and SHA-256 content hashes for completed products. Images in
+  packed tar shards also record their shard, data offset and size.
+
+The output and the journal are fsynced before the manifest that points
+into them, so a manifest never references data that is not on disk.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Run parameters that must match for a resume to produce the same output
+RUN_PARAMETERS = (
+    "output_path",
+    "output_format",
+    "num_products",
+    "seed",
+    "shard_size",
+    "generator_options",
+    # Appending differently formatted JSON would corrupt the output
+    "compact",
+)
+
+
+def manifest_path_for(output_path: str) -> str:
+    """Return the default manifest path for an output file."""
+    return f"{output_path}.checkpoint.json"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _journaled_sha256(entry: dict) -> Optional[str]:
+    """Hash the image a journal entry points to, None if it is missing."""
+    if "shard" not in entry:
+        if not os.path.isfile(entry["file_path"]):
+            return None
+        return _file_sha256(entry["file_path"])
+    try:
+        with open(entry["shard"], "rb") as f:
+            f.seek(entry["offset"])
+            data = f.read(entry["size"])
+    except OSError:
+        return None
+    if len(data) != entry["size"]:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+class CheckpointManifest:
+    """Track completed products and periodically persist a manifest."""
+
+    def __init__(self, path: str, state: dict, every: int = 1000):
+        """Initialize the manifest.
+
+        Use ``create`` or ``load`` instead of calling this directly.
+
+        Args:
+            path: Path of the manifest JSON file.
+            state: Manifest contents.
+            every: Number of products between automatic saves.
+        """
+        self.path = path
+        self.state = state
+        self.every = max(1, every)
+        self.journal_path = f"{os.path.splitext(path)[0]}.images.ndjson"
+        self._since_save = 0
+        self._journal = None
+
+    @classmethod
+    def create(cls, path: str, every: int = 1000, **run_params):
+        """Start a new manifest, discarding any previous journal.
+
+        Args:
+            path: Path of the manifest JSON file.
+            every: Number of products between automatic saves.
+            **run_params: Values for every name in ``RUN_PARAMETERS``.
+
+        Returns:
+            CheckpointManifest: The new manifest.
+        """
+        state = {name: run_params[name] for name in RUN_PARAMETERS}
+        state.update(
+            {
+                "version": MANIFEST_VERSION,
+                "completed": [],
+                "products_written": 0,
+                "output_offset": None,
+                "journal_offset": 0,
+                "shard_state": None,
+                "finished": False,
+                "updated_at": None,
+            }
+        )
+        manifest = cls(path, state, every)
+        manifest._open_journal(truncate_to=0)
+        return manifest
+
+    @classmethod
+    def load(cls, path: str, every: int = 1000, **run_params):
+        """Load a manifest to resume a run.
+
+        Args:
+            path: Path of the manifest JSON file.
+            every: Number of products between automatic saves.
+            **run_params: Parameters of the resuming run; they must match
+                the ones the manifest was created with.
+
+        Returns:
+            CheckpointManifest: The loaded manifest.
+
+        Raises:
+            FileNotFoundError: If the manifest does not exist.
+            ValueError: If the manifest is incompatible with this run.
+        """
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+
+        if state.get("version") != MANIFEST_VERSION:
+            raise ValueError(
+                f"Unsupported checkpoint version: {state.get('version')}"
+            )
+        mismatched = [
+            name
+            for name in RUN_PARAMETERS
+            if run_params.get(name) is not None
+            and run_params[name] != state.get(name)
+        ]
+        if mismatched:
+            raise ValueError(
+                "Checkpoint does not match this run: "
+                + ", ".join(
+                    f"{name}={state.get(name)!r} (got {run_params[name]!r})"
+                    for name in mismatched
+                )
+            )
+
+        manifest = cls(path, state, every)
+        # Drop journal entries written after the last saved manifest
+        manifest._open_journal(truncate_to=state["journal_offset"])
+        return manifest
+
+    def _open_journal(self, truncate_to: int) -> None:
+        mode = "a" if os.path.exists(self.journal_path) else "w"
+        self._journal = open(self.journal_path, mode, encoding="utf-8")
+        self._journal.truncate(truncate_to)
+        self._journal.seek(truncate_to)
+
+    @property
+    def next_product_id(self) -> int:
+        """First product id that still has to be generated."""
+        completed = self.state["completed"]
+        return completed[0][1] if completed and completed[0][0] == 1 else 1
+
+    def is_completed(self, product_id: int) -> bool:
+        """Return whether ``product_id`` is in a completed range."""
+        return any(
+            start <= product_id < stop
+            for start, stop in self.state["completed"]
+        )
+
+    def record_product(
+        self, product: dict, image_location: Optional[dict] = None
+    ) -> None:
+        """Mark a product as written and journal its image.
+
+        Args:
+            product: Product record that was just written to the output.
+            image_location: Location and digest of the product's image
+                from the image store, as kept by
+                ``ProductGenerator.attach_image``. The image is only
+                journaled when given, so it is never read back here.
+        """
+        product_id = product["product_id"]
+        self._add_completed(product_id)
+        self.state["products_written"] += 1
+
+        if image_location:
+            entry = dict(image_location, product_id=product_id)
+            self._journal.write(json.dumps(entry) + "\n")
+
+        self._since_save += 1
+
+    def _add_completed(self, product_id: int) -> None:
+        """Add an id to the sorted list of half-open completed ranges."""
+        completed = self.state["completed"]
+        for completed_range in reversed(completed):
+            if completed_range[1] == product_id:
+                completed_range[1] += 1
+                return
+            if completed_range[0] <= product_id < completed_range[1]:
+                return
+        completed.append([product_id, product_id + 1])
+        completed.sort()
+
+    @property
+    def due(self) -> bool:
+        """Whether ``every`` products were recorded since the last save."""
+        return self._since_save >= self.every
+
+    def save(
+        self,
+        output_offset: int,
+        shard_state: Optional[dict] = None,
+        finished: bool = False,
+    ) -> None:
+        """Atomically persist the manifest.
+
+        Args:
+            output_offset: Output byte offset right after the last
+                recorded product, from the writer's ``checkpoint``.
+            shard_state: RNG state of the shard in progress.
+            finished: Whether the run completed.
+        """
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+        self.state.update(
+            {
+                "output_offset": output_offset,
+                "journal_offset": self._journal.tell(),
+                "shard_state": shard_state,
+                "finished": finished,
+                "updated_at": time.time(),
+            }
+        )
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._since_save = 0
+        logger.debug(
+            f"Checkpoint saved: {self.state['products_written']} products"
+        )
+
+    def verify_images(self) -> list:
+        """Check journaled images against their recorded hashes.
+
+        Damaged images are only reported. They are not re-rendered, since
+        the output already points at their old location; regenerate the
+        products of a random-access catalog with
+        ``main.regenerate_products`` to repair them.
+
+        Returns:
+            list: Ids of products whose image is missing or changed.
+        """
+        self._journal.flush()
+        damaged = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if _journaled_sha256(entry) != entry["sha256"]:
+                    damaged.append(entry["product_id"])
+        return damaged
+
+    def close(self) -> None:
+        """Close the image journal."""
+        if self._journal and not self._journal.closed:
+            self._journal.close()
@@ -0,0 +1,323 @@
+"""Per-stage timing, counters and memory instrumentation.
+
+Wrap a stage in ``timer`` and count events with ``count``:
+
+    from utils import metrics
+
+    with metrics.timer("image.encode"):
+        data = sink.encode(image)
+    metrics.count("image.cache_hits")
+
+Instrumentation is off by default. While disabled ``timer`` returns a
+shared no-op context manager and ``count`` returns immediately, so the
+calls can stay in hot loops. ``enable`` turns collection on, optionally
+with ``tracemalloc`` so every stage also reports the memory it allocated
+and its peak. Results are exported as a JSON summary or a Prometheus
+textfile for the node exporter's textfile collector.
+
+Metrics are per process. Worker processes send theirs back with
+``snapshot`` and the parent folds them in with ``merge``.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+_NULL_TIMER = contextlib.nullcontext()
+
+_enabled = False
+_trace_memory = False
+_lock = threading.Lock()
+_started = None
+_timers = {}
+_counters = {}
+_memory_stack = threading.local()
+
+
+def enable(trace_memory: bool = False) -> None:
+    """Start collecting metrics, discarding anything collected so far.
+
+    Args:
+        trace_memory: Also trace allocations per stage with tracemalloc.
+            This slows Python code down noticeably.
+    """
+    global _enabled, _trace_memory, _started
+    reset()
+    _enabled = True
+    _trace_memory = trace_memory
+    _started = time.perf_counter()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    """Stop collecting metrics; collected values are kept for export."""
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def worker_options() -> Optional[dict]:
+    """Return ``enable`` arguments for worker processes, None if disabled."""
+    if not _enabled:
+        return None
+    return {"trace_memory": _trace_memory}
+
+
+def reset() -> None:
+    """Discard all collected metrics."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add ``value`` to the counter ``name``."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def timer(name: str):
+    """Return a context manager that times the stage ``name``."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+class _Timer:
+    __slots__ = ("name", "start", "memory")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        if _trace_memory:
+            self.memory = _memory_enter()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        allocated = peak = None
+        if _trace_memory:
+            allocated, peak = _memory_exit(self.memory)
+        _record(self.name, 1, elapsed, elapsed, allocated, peak)
+        return False
+
+
+def _memory_enter() -> list:
+    # tracemalloc has a single process-wide peak, so nested stages save
+    # the enclosing stage's peak before resetting it for themselves
+    stack = getattr(_memory_stack, "frames", None)
+    if stack is None:
+        stack = _memory_stack.frames = []
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    frame = [current, current]
+    stack.append(frame)
+    return frame
+
+
+def _memory_exit(frame: list) -> tuple:
+    stack = _memory_stack.frames
+    current, peak = tracemalloc.get_traced_memory()
+    stack.pop()
+    peak = max(frame[1], peak)
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    return current - frame[0], peak - frame[0]
+
+
+def _record(
+    name: str,
+    calls: int,
+    seconds: float,
+    max_seconds: float,
+    allocated: Optional[int] = None,
+    peak: Optional[int] = None,
+) -> None:
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            stats = _timers[name] = {
+                "calls": 0,
+                "seconds": 0.0,
+                "max_seconds": 0.0,
+            }
+        stats["calls"] += calls
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], max_seconds)
+        if allocated is not None:
+            stats["allocated_bytes"] = (
+                stats.get("allocated_bytes", 0) + allocated
+            )
+            stats["peak_bytes"] = max(stats.get("peak_bytes", 0), peak)
+
+
+def snapshot() -> Optional[dict]:
+    """Return and clear this process's metrics, or None when disabled."""
+    if not _enabled:
+        return None
+    with _lock:
+        data = {"timers": dict(_timers), "counters": dict(_counters)}
+        _timers.clear()
+        _counters.clear()
+    return data
+
+
+def merge(data: Optional[dict]) -> None:
+    """Add metrics from ``snapshot`` in another process to this one."""
+    if not data or not _enabled:
+        return
+    for name, stats in data["timers"].items():
+        _record(
+            name,
+            stats["calls"],
+            stats["seconds"],
+            stats["max_seconds"],
+            stats.get("allocated_bytes"),
+            stats.get("peak_bytes"),
+        )
+    for name, value in data["counters"].items():
+        count(name, value)
+
+
+def summary(top_allocations: int = 10) -> dict:
+    """Return all collected metrics.
+
+    Args:
+        top_allocations: With memory tracing, include this many source
+            lines holding the most memory right now.
+
+    Returns:
+        dict: Wall time, per-stage timers sorted by total time, counters
+            and optionally the top allocation sites.
+    """
+    with _lock:
+        timers = {
+            name: dict(stats, mean_seconds=stats["seconds"] / stats["calls"])
+            for name, stats in sorted(
+                _timers.items(), key=lambda item: -item[1]["seconds"]
+            )
+        }
+        counters = dict(sorted(_counters.items()))
+
+    result = {
+        "wall_seconds": (
+            time.perf_counter() - _started if _started is not None else None
+        ),
+        "timers": timers,
+        "counters": counters,
+    }
+    if _trace_memory and tracemalloc.is_tracing():
+        stats = tracemalloc.take_snapshot().statistics("lineno")
+        result["top_allocations"] = [
+            {"location": str(stat.traceback), "bytes": stat.size}
+            for stat in stats[:top_allocations]
+        ]
+    return result
+
+
+def _atomic_write(path: str, text: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def export_json(path: str) -> None:
+    """Write the metrics summary as JSON."""
+    _atomic_write(path, json.dumps(summary(), indent=4) + "\n")
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def export_prometheus(path: str, prefix: str = "ecommerce") -> None:
+    """Write the metrics in Prometheus text exposition format.
+
+    The file is replaced atomically, as the textfile collector requires.
+    """
+    data = summary(top_allocations=0)
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{prefix}_{name}{labels} {value}")
+
+    def stage_samples(key):
+        return [
+            (f'{{stage="{stage}"}}', stats[key])
+            for stage, stats in data["timers"].items()
+            if key in stats
+        ]
+
+    metric(
+        "stage_seconds_total",
+        "counter",
+        "Time spent in each stage.",
+        stage_samples("seconds"),
+    )
+    metric(
+        "stage_calls_total",
+        "counter",
+        "Number of times each stage ran.",
+        stage_samples("calls"),
+    )
+    metric(
+        "stage_max_seconds",
+        "gauge",
+        "Longest single run of each stage.",
+        stage_samples("max_seconds"),
+    )
+    if _trace_memory:
+        metric(
+            "stage_allocated_bytes_total",
+            "counter",
+            "Net memory allocated by each stage.",
+            stage_samples("allocated_bytes"),
+        )
+        metric(
+            "stage_peak_bytes",
+            "gauge",
+            "Peak traced memory above the stage's starting point.",
+            stage_samples("peak_bytes"),
+        )
+    for name, value in data["counters"].items():
+        metric(
+            f"{_metric_name(name)}_total",
+            "counter",
+            f"Count of {name}.",
+            [("", value)],
+        )
+    if data["wall_seconds"] is not None:
+        metric(
+            "run_wall_seconds",
+            "gauge",
+            "Wall time since metrics were enabled.",
+            [("", data["wall_seconds"])],
+        )
+    _atomic_write(path, "\n".join(lines) + "\n")
@@ -0,0 +1,451 @@
+"""Columnar catalog output with normalized tables.
+
+Nested product records are split into four flat tables:
+
+- ``products``: one row per product.
+- ``product_categories``: product to category links.
+- ``variation_options``: one row per variation option.
+- ``categories``: the category tree, one row per node with its parent.
+
+Each table goes to its own file in the output directory. Rows are
+buffered per table and flushed as a row group (Parquet), record batch
+(Arrow IPC) or chunk of lines (CSV) once ``chunk_rows`` rows or roughly
+``chunk_bytes`` bytes of text are buffered, so memory stays flat however
+large the catalog grows.
+
+Parquet and Arrow files carry the table name, schema version, keys and
+column descriptions in their schema metadata. CSV tables get the same
+information in a ``<table>.schema.json`` sidecar. ``pyarrow`` is only
+needed for the Parquet and Arrow formats.
+"""
+
+import abc
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Iterable, Optional
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMATS = ("csv", "parquet", "arrow")
+
+SCHEMA_VERSION = 1
+
+DEFAULT_CHUNK_ROWS = 10_000
+DEFAULT_CHUNK_BYTES = 64 * 2**20
+
+# Table -> (columns, metadata). Columns are (name, type, description).
+TABLES = {
+    "products": (
+        (
+            ("product_id", "int64", "Product id"),
+            ("product_name", "string", "Display name"),
+            ("product_sku", "string", "Stock keeping unit"),
+            ("description", "string", "Long description"),
+            ("short_description", "string", "First 100 characters"),
+            ("price", "int64", "Price in minor currency units"),
+            ("special_price", "int64", "Discounted price, 0 if none"),
+            ("product_type", "string", "SIMPLE or CONFIGURABLE"),
+            ("image_url", "string", "Path of the main image file"),
+            ("image_base64", "string", "Main image as a data URI"),
+        ),
+        {"primary_key": ["product_id"]},
+    ),
+    "product_categories": (
+        (
+            ("product_id", "int64", "Product id"),
+            ("category_id", "int64", "Category id"),
+            ("position", "int32", "Order of the category on the product"),
+        ),
+        {
+            "primary_key": ["product_id", "category_id"],
+            "foreign_keys": {
+                "product_id": "products.product_id",
+                "category_id": "categories.id",
+            },
+        },
+    ),
+    "variation_options": (
+        (
+            ("product_id", "int64", "Product id"),
+            ("attribute_code", "string", "Variation attribute code"),
+            ("attribute_name", "string", "Variation attribute label"),
+            ("option_code", "string", "Option code"),
+            ("option_price", "int64", "Option price in minor units"),
+            ("position", "int32", "Order of the option in its attribute"),
+        ),
+        {
+            # Option codes derive from SKUs, which repeat across products
+            "primary_key": ["product_id", "attribute_code", "position"],
+            "foreign_keys": {"product_id": "products.product_id"},
+        },
+    ),
+    "categories": (
+        (
+            ("id", "int64", "Category id"),
+            ("parent_id", "int64", "Parent category id, null for roots"),
+            ("depth", "int32", "Distance from the root, roots are 0"),
+            ("name", "string", "Category name"),
+            ("url", "string", "Category URL"),
+        ),
+        {
+            "primary_key": ["id"],
+            "foreign_keys": {"parent_id": "categories.id"},
+        },
+    ),
+}
+
+
+def product_rows(product: dict) -> dict:
+    """Split a product record into rows of the normalized tables.
+
+    Returns:
+        dict: Table name -> list of row tuples in column order.
+    """
+    product_id = product["product_id"]
+    options = []
+    for variation in product["variations"]:
+        for position, option in enumerate(variation["options"]):
+            options.append(
+                (
+                    product_id,
+                    variation["attribute_code"],
+                    variation["attribute_name"],
+                    option["attribute_option_code"],
+                    option["attribute_option_price"],
+                    position,
+                )
+            )
+    return {
+        "products": [
+            (
+                product_id,
+                product["product_name"],
+                product["product_sku"],
+                product["description"],
+                product["short_description"],
+                product["price"],
+                product["special_price"],
+                product["product_type"],
+                product["image_url"],
+                product["image_base64"],
+            )
+        ],
+        "product_categories": [
+            (product_id, category_id, position)
+            for position, category_id in enumerate(product["category"])
+        ],
+        "variation_options": options,
+    }
+
+
+def category_rows(categories):
+    """Turn categories into ``categories`` rows.
+
+    Accepts the flat records of ``CategoryGenerator.iter_categories``,
+    which are passed through in order, or a nested tree, which is walked
+    iteratively so depth is not limited by the recursion limit.
+
+    Yields:
+        tuple: ``(id, parent_id, depth, name, url)``.
+    """
+    categories = iter(categories)
+    first = next(categories, None)
+    if first is None:
+        return
+    if "parent_id" in first:
+        for category in itertools.chain([first], categories):
+            yield (
+                category["id"],
+                category["parent_id"],
+                category["depth"],
+                category["name"],
+                category["url"],
+            )
+        return
+
+    roots = [first, *categories]
+    stack = [(category, None, 0) for category in reversed(roots)]
+    while stack:
+        category, parent_id, depth = stack.pop()
+        yield (
+            category["id"],
+            parent_id,
+            depth,
+            category["name"],
+            category["url"],
+        )
+        stack.extend(
+            (child, category["id"], depth + 1)
+            for child in reversed(category.get("children", ()))
+        )
+
+
+def table_metadata(table: str) -> dict:
+    """Return the descriptive metadata stored with a table."""
+    columns, extra = TABLES[table]
+    return {
+        "table": table,
+        "schema_version": SCHEMA_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "columns": [
+            {"name": name, "type": kind, "description": description}
+            for name, kind, description in columns
+        ],
+        **extra,
+    }
+
+
+class _TableBuffer:
+    """Rows of one table waiting to be written as a chunk."""
+
+    __slots__ = ("rows", "nbytes")
+
+    def __init__(self):
+        self.rows = []
+        self.nbytes = 0
+
+    def append(self, row: tuple) -> None:
+        self.rows.append(row)
+        self.nbytes += sum(len(value) for value in row if type(value) is str)
+
+    def take(self) -> list:
+        rows = self.rows
+        self.rows = []
+        self.nbytes = 0
+        return rows
+
+
+class ColumnarWriter(abc.ABC):
+    """Base class for writers that emit the normalized tables.
+
+    Subclasses implement ``_open_table``, ``_write_chunk`` and
+    ``_close_table`` for their file format.
+    """
+
+    extension = None
+
+    def __init__(
+        self,
+        path: str,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    ):
+        """Initialize the writer.
+
+        Args:
+            path: Output directory; one file per table is created in it.
+            chunk_rows: Maximum rows per row group or chunk.
+            chunk_bytes: Flush a chunk early once its string columns hold
+                about this many bytes, e.g. with inline base64 images.
+        """
+        self.path = path
+        self.chunk_rows = max(1, chunk_rows)
+        self.chunk_bytes = chunk_bytes
+        self.count = 0
+        # Columnar files cannot be reopened for appending
+        self.resumed = False
+        os.makedirs(path, exist_ok=True)
+        self._buffers = {table: _TableBuffer() for table in TABLES}
+        self._handles = {
+            table: self._open_table(table, self.table_path(table))
+            for table in TABLES
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def table_path(self, table: str) -> str:
+        return os.path.join(self.path, f"{table}.{self.extension}")
+
+    def _append(self, table: str, rows) -> None:
+        buffer = self._buffers[table]
+        for row in rows:
+            buffer.append(row)
+        if (
+            len(buffer.rows) >= self.chunk_rows
+            or buffer.nbytes >= self.chunk_bytes
+        ):
+            self._flush(table)
+
+    def _flush(self, table: str) -> None:
+        rows = self._buffers[table].take()
+        if rows:
+            with metrics.timer("output.write"):
+                self._write_chunk(table, self._handles[table], rows)
+
+    def write_categories(self, categories: Iterable[dict]) -> None:
+        """Write the category tree as flat rows.
+
+        Args:
+            categories: Flat category records or a nested category tree.
+        """
+        buffer = self._buffers["categories"]
+        for row in category_rows(categories):
+            buffer.append(row)
+            if len(buffer.rows) >= self.chunk_rows:
+                self._flush("categories")
+
+    def write_product(self, product: dict) -> None:
+        """Split a product into table rows and buffer them.
+
+        Args:
+            product: Product dictionary as returned by ProductGenerator.
+        """
+        with metrics.timer("output.serialize"):
+            tables = product_rows(product)
+        for table, rows in tables.items():
+            self._append(table, rows)
+        self.count += 1
+
+    def close(self) -> None:
+        """Flush all buffered rows and finalize every table file."""
+        if self._handles is None:
+            return
+        for table, handle in self._handles.items():
+            self._flush(table)
+            self._close_table(table, handle)
+        self._handles = None
+        logger.info(f"Wrote {self.count} products to {self.path}")
+
+    @abc.abstractmethod
+    def _open_table(self, table: str, path: str):
+        """Create the file for ``table`` and return its handle."""
+
+    @abc.abstractmethod
+    def _write_chunk(self, table: str, handle, rows: list) -> None:
+        """Append a chunk of rows to an open table."""
+
+    @abc.abstractmethod
+    def _close_table(self, table: str, handle) -> None:
+        """Finish and close a table file."""
+
+
+class CSVWriter(ColumnarWriter):
+    """Write each table as a CSV file with a header row.
+
+    Null values are written as empty fields. The schema and metadata of
+    each table are written to ``<table>.schema.json`` next to it.
+    """
+
+    extension = "csv"
+
+    def _open_table(self, table: str, path: str):
+        with open(
+            os.path.join(self.path, f"{table}.schema.json"), "w"
+        ) as f:
+            json.dump(table_metadata(table), f, indent=4)
+
+        f = open(path, "w", encoding="utf-8", newline="")
+        writer = csv.writer(f)
+        writer.writerow([name for name, _, _ in TABLES[table][0]])
+        return f, writer
+
+    def _write_chunk(self, table: str, handle, rows: list) -> None:
+        handle[1].writerows(rows)
+
+    def _close_table(self, table: str, handle) -> None:
+        handle[0].close()
+
+
+def arrow_schema(table: str):
+    """Return the pyarrow schema of ``table`` including its metadata."""
+    import pyarrow as pa
+
+    types = {"int64": pa.int64(), "int32": pa.int32(), "string": pa.string()}
+    columns, _ = TABLES[table]
+    return pa.schema(
+        [
+            pa.field(name, types[kind], metadata={"description": text})
+            for name, kind, text in columns
+        ],
+        metadata={"ecommerce": json.dumps(table_metadata(table))},
+    )
+
+
+def _record_batch(table: str, schema, rows: list):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(column, type=field.type)
+            for column, field in zip(columns, schema)
+        ],
+        schema=schema,
+    )
+
+
+class ParquetWriter(ColumnarWriter):
+    """Write each table as a Parquet file, one row group per chunk."""
+
+    extension = "parquet"
+
+    def __init__(self, path: str, compression: str = "zstd", **kwargs):
+        """Initialize the writer.
+
+        Args:
+            path: Output directory.
+            compression: Parquet column compression codec.
+            **kwargs: Passed to ``ColumnarWriter``.
+        """
+        self.compression = compression
+        super().__init__(path, **kwargs)
+
+    def _open_table(self, table: str, path: str):
+        import pyarrow.parquet as pq
+
+        schema = arrow_schema(table)
+        return schema, pq.ParquetWriter(
+            path, schema, compression=self.compression
+        )
+
+    def _write_chunk(self, table: str, handle, rows: list) -> None:
+        schema, writer = handle
+        writer.write_batch(
+            _record_batch(table, schema, rows), row_group_size=len(rows)
+        )
+
+    def _close_table(self, table: str, handle) -> None:
+        handle[1].close()
+
+
+class ArrowWriter(ColumnarWriter):
+    """Write each table as an Arrow IPC file, one record batch per chunk."""
+
+    extension = "arrow"
+
+    def _open_table(self, table: str, path: str):
+        import pyarrow as pa
+
+        schema = arrow_schema(table)
+        sink = pa.OSFile(path, "wb")
+        return schema, sink, pa.ipc.new_file(sink, schema)
+
+    def _write_chunk(self, table: str, handle, rows: list) -> None:
+        schema, _, writer = handle
+        writer.write_batch(_record_batch(table, schema, rows))
+
+    def _close_table(self, table: str, handle) -> None:
+        _, sink, writer = handle
+        writer.close()
+        sink.close()
+
+
+def create_columnar_writer(
+    path: str, output_format: str, chunk_rows: Optional[int] = None
+) -> ColumnarWriter:
+    """Create a columnar writer for one of ``COLUMNAR_FORMATS``."""
+    writer_cls = {
+        "csv": CSVWriter,
+        "parquet": ParquetWriter,
+        "arrow": ArrowWriter,
+    }[output_format]
+    return writer_cls(path, chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS)
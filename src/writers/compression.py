@@ -0,0 +1,230 @@
+"""Streamed gzip and zstd compression for catalog output.
+
+Pretty-printed catalogs are several times larger than their content, and
+moving them to artifact stores soon costs more than generating them. The
+JSON and NDJSON writers can therefore compress their output as it is
+written. Text goes through a 1 MiB buffer, and every full buffer is
+compressed on background threads while the generator carries on; the
+caller only waits when ``max_pending`` chunks are still being compressed.
+
+- ``gzip`` with one thread streams through a single deflate stream. With
+  more threads each chunk becomes its own gzip member, compressed in
+  parallel the way ``pigz`` does. Multi-member files are valid gzip and
+  are read by ``gzip``, ``zcat`` and Python's ``gzip`` module; the ratio
+  is marginally lower because the window restarts at each chunk.
+- ``zstd`` uses the multi-threaded compressor of the ``zstandard``
+  package, which is only needed for this format.
+
+zlib and zstandard release the GIL while compressing, so the background
+threads run in parallel with record generation.
+"""
+
+import collections
+import io
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TextIO
+from utils import metrics
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+
+DEFAULT_CHUNK_BYTES = 1 << 20
+DEFAULT_MAX_PENDING = 8
+
+
+def compression_for_path(path: str) -> str:
+    """Return the compression implied by a ``.gz`` or ``.zst`` suffix."""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return compression
+    return "none"
+
+
+def split_compression_suffix(path: str) -> tuple:
+    """Split off a compression suffix: ``("catalog.ndjson", ".gz")``."""
+    suffix = COMPRESSION_SUFFIXES.get(compression_for_path(path), "")
+    return path[: len(path) - len(suffix)], suffix
+
+
+def _zstd_compressor(level: int, threads: int):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd output requires the zstandard package"
+        ) from None
+    return zstandard.ZstdCompressor(
+        level=level, threads=threads if threads > 1 else 0
+    ).compressobj()
+
+
+def _gzip_compressor(level: int):
+    # wbits 16 + 15 selects the gzip container
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+class CompressedStream(io.RawIOBase):
+    """Binary file that compresses written chunks on worker threads.
+
+    Compressed chunks are written to the file in order as they complete.
+    Errors raised while compressing surface on a later ``write`` or on
+    ``close``.
+    """
+
+    _file = None
+
+    def __init__(
+        self,
+        path: str,
+        compression: str,
+        level: Optional[int] = None,
+        threads: int = 1,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        """Open ``path`` for compressed writing.
+
+        Args:
+            path: Output file path.
+            compression: ``gzip`` or ``zstd``.
+            level: Compression level. Defaults to ``DEFAULT_LEVELS``.
+            threads: Compression threads.
+            max_pending: Chunks that may be queued for compression before
+                ``write`` waits for the oldest one.
+
+        Raises:
+            ValueError: If the compression is not supported.
+        """
+        super().__init__()
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(
+                f"Unsupported compression: {compression}. "
+                f"Expected one of {', '.join(COMPRESSIONS)}"
+            )
+        self.path = path
+        self.compression = compression
+        self.level = DEFAULT_LEVELS[compression] if level is None else level
+        self.threads = max(1, threads)
+        self.max_pending = max(1, max_pending)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        # A stream compressor keeps state between chunks, so it gets a
+        # single worker that runs its chunks in order
+        self._compressor = None
+        workers = self.threads
+        if compression == "zstd":
+            self._compressor = _zstd_compressor(self.level, self.threads)
+            workers = 1
+        elif self.threads == 1:
+            self._compressor = _gzip_compressor(self.level)
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="output-compress"
+        )
+        self._pending = collections.deque()
+        self._file = open(path, "wb")
+
+    def writable(self) -> bool:
+        return True
+
+    def _compress(self, data: bytes) -> bytes:
+        with metrics.timer("output.compress"):
+            if self._compressor is not None:
+                return self._compressor.compress(data)
+            # One complete gzip member per chunk
+            compressor = _gzip_compressor(self.level)
+            return compressor.compress(data) + compressor.flush()
+
+    def _write_next(self) -> None:
+        future = self._pending.popleft()
+        if future.done():
+            data = future.result()
+        else:
+            with metrics.timer("output.compress_wait"):
+                data = future.result()
+        self._file.write(data)
+        self.bytes_out += len(data)
+
+    def write(self, b) -> int:
+        """Queue a chunk for compression and return its length."""
+        data = bytes(b)
+        self._pending.append(self._pool.submit(self._compress, data))
+        self.bytes_in += len(data)
+        while len(self._pending) > self.max_pending or (
+            self._pending and self._pending[0].done()
+        ):
+            self._write_next()
+        return len(data)
+
+    def close(self) -> None:
+        """Compress the remaining chunks and close the file."""
+        if self.closed:
+            return
+        if self._file is None:
+            # __init__ failed before the file was opened
+            super().close()
+            return
+        try:
+            if self._compressor is not None:
+                self._pending.append(
+                    self._pool.submit(self._compressor.flush)
+                )
+            while self._pending:
+                self._write_next()
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+            self._file.close()
+            super().close()
+
+
+def open_output(
+    path: str,
+    compression: str = "none",
+    level: Optional[int] = None,
+    threads: int = 1,
+) -> TextIO:
+    """Open a UTF-8 text file for writing, compressed if requested.
+
+    Args:
+        path: Output file path.
+        compression: One of ``COMPRESSIONS``.
+        level: Compression level.
+        threads: Compression threads.
+
+    Returns:
+        TextIO: A text file; ``close`` finishes the compressed stream.
+    """
+    if compression == "none":
+        return open(path, "w", encoding="utf-8")
+    stream = CompressedStream(path, compression, level, threads)
+    return io.TextIOWrapper(
+        io.BufferedWriter(stream, buffer_size=DEFAULT_CHUNK_BYTES),
+        encoding="utf-8",
+    )
+
+
+def open_input(path: str, compression: Optional[str] = None):
+    """Open a possibly compressed catalog file for binary reading.
+
+    Args:
+        path: File path.
+        compression: One of ``COMPRESSIONS``. Inferred from the file name
+            when not given.
+    """
+    compression = compression or compression_for_path(path)
+    if compression == "gzip":
+        import gzip
+
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                "zstd input requires the zstandard package"
+            ) from None
+        return zstandard.open(path, "rb")
+    return open(path, "rb")
@@ -0,0 +1,360 @@
+"""Streaming writers for catalog output.
+
+This module provides writers that emit records to disk as soon as they
+are generated, so memory stays constant regardless of catalog size.
+Two formats are supported:
+
+- ``ndjson``: one product per line, categories in a sidecar file.
+- ``json``: a single valid JSON document with categories emitted first
+  and products streamed into a JSON array.
+
+Both can be written compactly, without indentation or spaces after
+separators, and compressed with gzip or zstd while they are written (see
+``compression``). Compressed output cannot be resumed from a checkpoint.
+
+The columnar formats in ``columnar_writer`` (``csv``, ``parquet`` and
+``arrow``) are created through the same ``create_writer`` function.
+"""
+
+import json
+import logging
+import os
+import textwrap
+from typing import Iterable, Optional
+from utils import metrics
+from .columnar_writer import COLUMNAR_FORMATS, create_columnar_writer
+from .compression import (
+    COMPRESSIONS,
+    compression_for_path,
+    open_output,
+    split_compression_suffix,
+)
+
+logger = logging.getLogger(__name__)
+
+# Formats a checkpointed run can be resumed in
+RESUMABLE_FORMATS = ("json", "ndjson")
+OUTPUT_FORMATS = RESUMABLE_FORMATS + COLUMNAR_FORMATS
+
+# Separators of compact output
+COMPACT_SEPARATORS = (",", ":")
+
+
+class NDJSONWriter:
+    """Write products as newline-delimited JSON.
+
+    Products are appended to ``path`` one per line. Categories are written
+    to a sidecar file next to it (``<name>.categories.ndjson``), compressed
+    like the products file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume_offset: Optional[int] = None,
+        resume_count: int = 0,
+        compact: bool = False,
+        compression: str = "none",
+        compression_level: Optional[int] = None,
+        compression_threads: int = 1,
+    ):
+        """Initialize the writer.
+
+        Args:
+            path: Path of the products NDJSON file.
+            resume_offset: Byte offset from a checkpoint. The file is
+                truncated there and appended to instead of overwritten.
+            resume_count: Number of products already in the file.
+            compact: Leave out the spaces after separators.
+            compression: One of ``COMPRESSIONS``.
+            compression_level: gzip or zstd compression level.
+            compression_threads: Threads compressing the output.
+        """
+        self.path = path
+        base, suffix = split_compression_suffix(path)
+        root, _ = os.path.splitext(base)
+        self.categories_path = f"{root}.categories.ndjson{suffix}"
+        self.separators = COMPACT_SEPARATORS if compact else None
+        self.compression = compression
+        self._compression_options = (compression_level, compression_threads)
+        self.count = 0
+        self.resumed = resume_offset is not None
+        if self.resumed:
+            _truncate(path, resume_offset)
+            self.count = resume_count
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open_output(
+                path, compression, *self._compression_options
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_categories(self, categories: Iterable[dict]) -> None:
+        """Write categories to the sidecar file, one per line.
+
+        Args:
+            categories: Category dictionaries, e.g. a stream from
+                ``CategoryGenerator.iter_categories``.
+        """
+        with open_output(
+            self.categories_path,
+            self.compression,
+            *self._compression_options,
+        ) as f:
+            for category in categories:
+                f.write(json.dumps(category, separators=self.separators))
+                f.write("\n")
+
+    def write_product(self, product: dict) -> None:
+        """Append a single product record.
+
+        Args:
+            product: Product dictionary as returned by ProductGenerator.
+        """
+        with metrics.timer("output.serialize"):
+            line = json.dumps(product, separators=self.separators)
+        with metrics.timer("output.write"):
+            self._file.write(line)
+            self._file.write("\n")
+        self.count += 1
+
+    def checkpoint(self) -> int:
+        """Flush to disk and return the offset after the last product."""
+        return _sync(self._file)
+
+    def close(self) -> None:
+        """Flush and close the output file."""
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Wrote {self.count} products to {self.path}")
+
+
+class JSONArrayWriter:
+    """Write a single JSON document with products streamed into an array.
+
+    The document has the form ``{"categories": [...], "products": [...]}``.
+    Categories must be written before the first product; products are
+    then serialized one at a time so only one record is held in memory.
+
+    Without an indent every category and product is written compactly on
+    a line of its own. This is also much faster, since ``json`` only uses
+    its C encoder when no indent is set.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        indent: Optional[int] = 4,
+        resume_offset: Optional[int] = None,
+        resume_count: int = 0,
+        compression: str = "none",
+        compression_level: Optional[int] = None,
+        compression_threads: int = 1,
+    ):
+        """Initialize the writer.
+
+        Args:
+            path: Path of the output JSON file.
+            indent: Indentation used for the pretty-printed document, or
+                None for compact output.
+            resume_offset: Byte offset from a checkpoint, taken right after
+                a product. The unterminated document is truncated there and
+                products are appended to the open array.
+            resume_count: Number of products already in the file.
+            compression: One of ``COMPRESSIONS``.
+            compression_level: gzip or zstd compression level.
+            compression_threads: Threads compressing the output.
+        """
+        self.path = path
+        self.indent = indent or None
+        self.count = 0
+        self.resumed = resume_offset is not None
+        if self.resumed:
+            _truncate(path, resume_offset)
+            self.count = resume_count
+            self._categories_written = True
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._categories_written = False
+            self._file = open_output(
+                path, compression, compression_level, compression_threads
+            )
+            self._file.write("{")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _dump(self, obj, level: int) -> str:
+        """Serialize ``obj`` indented to the given nesting level."""
+        if self.indent is None:
+            return json.dumps(obj, separators=COMPACT_SEPARATORS)
+        text = json.dumps(obj, indent=self.indent)
+        return textwrap.indent(text, " " * self.indent * level)
+
+    def _newline(self, level: int) -> str:
+        return "\n" + " " * (self.indent or 0) * level
+
+    def write_categories(self, categories: Iterable[dict]) -> None:
+        """Write the categories array, one category at a time.
+
+        Args:
+            categories: Category dictionaries, e.g. a stream from
+                ``CategoryGenerator.iter_categories``.
+
+        Raises:
+            RuntimeError: If categories were already written.
+        """
+        if self._categories_written:
+            raise RuntimeError("Categories have already been written")
+
+        self._file.write(self._newline(1) + '"categories": [')
+        written = False
+        for category in categories:
+            if written:
+                self._file.write(",")
+            self._file.write("\n" + self._dump(category, 2))
+            written = True
+        if written:
+            self._file.write(self._newline(1))
+        self._file.write("],")
+        self._file.write(self._newline(1) + '"products": [')
+        self._categories_written = True
+
+    def write_product(self, product: dict) -> None:
+        """Append a single product to the products array.
+
+        Args:
+            product: Product dictionary as returned by ProductGenerator.
+        """
+        if not self._categories_written:
+            self.write_categories([])
+
+        with metrics.timer("output.serialize"):
+            text = self._dump(product, 2)
+        with metrics.timer("output.write"):
+            if self.count:
+                self._file.write(",")
+            self._file.write("\n" + text)
+        self.count += 1
+
+    def checkpoint(self) -> int:
+        """Flush to disk and return the offset after the last product."""
+        if not self._categories_written:
+            self.write_categories([])
+        return _sync(self._file)
+
+    def close(self) -> None:
+        """Terminate the JSON document and close the file."""
+        if self._file.closed:
+            return
+        if not self._categories_written:
+            self.write_categories([])
+        if self.count:
+            self._file.write(self._newline(1))
+        self._file.write("]\n}\n")
+        self._file.close()
+        logger.info(f"Wrote {self.count} products to {self.path}")
+
+
+def _truncate(path: str, offset: int) -> None:
+    """Cut a partially written file back to a checkpointed offset."""
+    with open(path, "r+b") as f:
+        f.truncate(offset)
+
+
+def _sync(f) -> int:
+    """Flush ``f`` to stable storage and return its current offset."""
+    f.flush()
+    os.fsync(f.fileno())
+    return f.tell()
+
+
+def create_writer(
+    path: str,
+    output_format: str = "json",
+    resume_offset: Optional[int] = None,
+    resume_count: int = 0,
+    compact: bool = False,
+    compression: Optional[str] = None,
+    compression_level: Optional[int] = None,
+    compression_threads: int = 1,
+):
+    """Create a streaming writer for the requested format.
+
+    Args:
+        path: Output file path, or output directory for columnar formats.
+        output_format: One of ``OUTPUT_FORMATS``.
+        resume_offset: Checkpointed byte offset to resume writing from.
+        resume_count: Number of products already written before it.
+        compact: Write JSON without indentation or separator spaces.
+        compression: One of ``COMPRESSIONS`` for the JSON formats.
+            Inferred from a ``.gz`` or ``.zst`` suffix when not given.
+        compression_level: gzip or zstd compression level.
+        compression_threads: Threads compressing the output.
+
+    Returns:
+        NDJSONWriter | JSONArrayWriter | ColumnarWriter: Writer instance.
+
+    Raises:
+        ValueError: If the format or compression is not supported, or the
+            output cannot be resumed and ``resume_offset`` is given.
+    """
+    if output_format in RESUMABLE_FORMATS:
+        compression = output_compression(path, output_format, compression)
+        if resume_offset is not None and compression != "none":
+            raise ValueError("Compressed output cannot be resumed")
+        options = {
+            "resume_offset": resume_offset,
+            "resume_count": resume_count,
+            "compression": compression,
+            "compression_level": compression_level,
+            "compression_threads": compression_threads,
+        }
+        if output_format == "ndjson":
+            return NDJSONWriter(path, compact=compact, **options)
+        return JSONArrayWriter(
+            path, indent=None if compact else 4, **options
+        )
+    if output_format in COLUMNAR_FORMATS:
+        output_compression(path, output_format, compression)
+        if resume_offset is not None:
+            raise ValueError(f"{output_format} output cannot be resumed")
+        return create_columnar_writer(path, output_format)
+    raise ValueError(
+        f"Unsupported output format: {output_format}. "
+        f"Expected one of {', '.join(OUTPUT_FORMATS)}"
+    )
+
+
+def output_compression(
+    path: str, output_format: str, compression: Optional[str] = None
+) -> str:
+    """Return the compression an output will be written with.
+
+    Raises:
+        ValueError: If the compression is not supported, or is given for
+            a columnar format, which compresses its own columns.
+    """
+    if output_format not in RESUMABLE_FORMATS:
+        if compression not in (None, "none"):
+            raise ValueError(
+                f"{output_format} output does not support {compression} "
+                "compression"
+            )
+        return "none"
+    if compression is None:
+        return compression_for_path(path)
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Unsupported compression: {compression}. "
+            f"Expected one of {', '.join(COMPRESSIONS)}"
+        )
+    return compression
@@ -0,0 +1,142 @@
+"""Shared test fixtures."""
+
+import io
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from PIL import Image, PngImagePlugin
+
+
+class PredictionServer:
+    """Local stand-in for the Replicate prediction API.
+
+    Implements ``POST /v1/predictions``, polling through the prediction's
+    ``urls.get`` and downloading the output image. A prediction succeeds
+    after ``polls`` status requests, unless its prompt contains ``fail``.
+    The output PNG carries its prompt in a ``prompt`` text chunk, so a
+    client can check that results come back in prompt order.
+
+    A prediction is active from its creation until its image has been
+    downloaded or it has failed; ``peak_active`` is the largest number of
+    predictions that were active at once.
+    """
+
+    def __init__(self, polls: int = 3):
+        self.polls = polls
+        self.inputs = []
+        self.active = 0
+        self.peak_active = 0
+        self._predictions = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _create(self, body: dict) -> dict:
+        with self._lock:
+            prediction_id = str(len(self._predictions))
+            self._predictions[prediction_id] = {
+                "prompt": body["input"]["prompt"],
+                "polls": 0,
+            }
+            self.inputs.append(body["input"])
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        return self._status(prediction_id, "starting")
+
+    def _poll(self, prediction_id: str) -> dict:
+        with self._lock:
+            prediction = self._predictions[prediction_id]
+            prediction["polls"] += 1
+            if prediction["polls"] < self.polls:
+                return self._status(prediction_id, "processing")
+            if "fail" in prediction["prompt"]:
+                self.active -= 1
+                return self._status(prediction_id, "failed")
+        return self._status(prediction_id, "succeeded")
+
+    def _download(self, prediction_id: str) -> bytes:
+        with self._lock:
+            prompt = self._predictions[prediction_id]["prompt"]
+            self.active -= 1
+        info = PngImagePlugin.PngInfo()
+        info.add_text("prompt", prompt)
+        buffer = io.BytesIO()
+        Image.new("RGB", (32, 32), "white").save(
+            buffer, format="PNG", pnginfo=info
+        )
+        return buffer.getvalue()
+
+    def _status(self, prediction_id: str, status: str) -> dict:
+        prediction = {
+            "id": prediction_id,
+            "status": status,
+            "urls": {"get": f"{self.url}/v1/predictions/{prediction_id}"},
+        }
+        if status == "succeeded":
+            prediction["output"] = [f"{self.url}/files/{prediction_id}.png"]
+        if status == "failed":
+            prediction["error"] = "stand-in failure"
+        return prediction
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/v1/predictions":
+                    return self.send_error(404)
+                length = int(self.headers["Content-Length"])
+                body = json.loads(self.rfile.read(length))
+                self._send(
+                    201, "application/json", server._create(body)
+                )
+
+            def do_GET(self):
+                match = re.fullmatch(r"/v1/predictions/(\d+)", self.path)
+                if match:
+                    return self._send(
+                        200, "application/json", server._poll(match[1])
+                    )
+                match = re.fullmatch(r"/files/(\d+)\.png", self.path)
+                if match:
+                    return self._send(
+                        200, "image/png", server._download(match[1])
+                    )
+                self.send_error(404)
+
+            def _send(self, code: int, content_type: str, body) -> None:
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def prediction_server():
+    """Run a ``PredictionServer`` for the duration of a test."""
+    server = PredictionServer()
+    server.start()
+    yield server
+    server.stop()
@@ -0,0 +1,78 @@
+"""Tests for the asyncio Replicate backend against a stand-in server."""
+
+import threading
+from generators.image.async_replicate_image_generator import (
+    AsyncReplicateImageGenerator,
+)
+from generators.image.placeholder import render_placeholder_jpeg
+from generators.image.sinks import ImageSink
+
+
+class RecordingSink(ImageSink):
+    """Sink that records the threads images are stored from."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.threads = []
+
+    def store(self, data, product_name, **kwargs):
+        self.threads.append(threading.current_thread().name)
+        return super().store(data, product_name, **kwargs)
+
+
+def _generator(server, sink=None, max_in_flight=4):
+    return AsyncReplicateImageGenerator(
+        max_in_flight=max_in_flight,
+        api_base=server.url,
+        api_token="test",
+        poll_interval=0.01,
+        timeout=10.0,
+        seed=1234,
+        use_cache=False,
+        sink=sink or ImageSink(mode="none"),
+    )
+
+
+def test_results_in_prompt_order_within_in_flight_bound(prediction_server):
+    prompts = [f"product {index}" for index in range(12)]
+    generator = _generator(prediction_server)
+    try:
+        images = generator.generate_images(prompts, ["negative"] * 12)
+    finally:
+        generator.close()
+
+    assert [image.info["prompt"] for image in images] == prompts
+    assert prediction_server.peak_active == 4
+    seeds = {model_input["seed"] for model_input in prediction_server.inputs}
+    assert len(seeds) == 12
+
+
+def test_failed_prediction_falls_back_to_placeholder(
+    prediction_server, tmp_path
+):
+    sink = RecordingSink(mode="file", output_dir=str(tmp_path), workers=0)
+    products = [
+        ("good_one", "a chair"),
+        ("will_fail", "a table"),
+        ("good_two", "a lamp"),
+    ]
+    generator = _generator(prediction_server, sink)
+    try:
+        images = generator.generate_images(
+            ["product", "product fail"], ["negative"] * 2
+        )
+        results = generator.generate_product_images(products)
+    finally:
+        generator.close()
+
+    assert images[0].info["prompt"] == "product"
+    assert isinstance(images[1], RuntimeError)
+
+    with open(results[1]["file_path"], "rb") as f:
+        assert f.read() == render_placeholder_jpeg("will_fail")
+    for (name, _), result in zip(products[::2], results[::2]):
+        with open(result["file_path"], "rb") as f:
+            assert f.read() != render_placeholder_jpeg(name)
+    # Inline sink work must not run on, and stall, the polling loop
+    assert len(sink.threads) == 3
+    assert "replicate-loop" not in sink.threads